@@ -0,0 +1,132 @@
+"""
+Description: Measures SiriClient end to end against a local stand-in server answering with agency wide
+VehicleMonitoring and StopMonitoring responses and full timetables: requests per second, median and 99th percentile
+latency, client CPU time per request and peak memory allocated while a request is handled, for several payload sizes
+and numbers of concurrent threads sharing one client.
+
+Usage: python benchmarks/bench_client.py [--payloads NAME ...] [--sizes N ...] [--concurrency N ...]
+    [--requests N] [--json-decoder NAME] [--recorded NAME=PATH ...]
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import argparse
+import concurrent.futures
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import payloads  # noqa: E402
+from stand_in_server import StandInServer  # noqa: E402
+from siri_transit_api_client import SiriClient  # noqa: E402
+
+# endpoint path and query of each payload
+ENDPOINTS = {
+    "vehicle_monitoring": ("VehicleMonitoring", lambda client: client.vehicle_monitoring("SF")),
+    "stop_monitoring": ("StopMonitoring", lambda client: client.stop_monitoring("SF")),
+    "timetable": ("timetable", lambda client: client.timetable("SF", "14")),
+}
+
+_STOPS_PER_JOURNEY = 40
+
+
+def build_payload(name: str, records: int) -> bytes:
+    """
+    Content of a synthetic payload holding about the given number of records, counting each stop of a timetable.
+    """
+    if name == "timetable":
+        return payloads.encode(payloads.timetable(max(1, records // _STOPS_PER_JOURNEY), _STOPS_PER_JOURNEY))
+    return payloads.encode(payloads.PAYLOADS[name](records))
+
+
+def make_client(base_url: str, concurrency: int, json_decoder: str) -> SiriClient:
+    session = requests.Session()
+    # one pooled connection per thread, so that no connection is discarded
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(10, concurrency))
+    session.mount("http://", adapter)
+    return SiriClient(api_key="benchmark", base_url=base_url, queries_per_second=10 ** 9, requests_session=session,
+                      json_decoder=json_decoder)
+
+
+def run(client: SiriClient, query, concurrency: int, count: int) -> dict:
+    """
+    Send count queries from concurrency threads and return the throughput, latency and CPU figures.
+    """
+    def timed_query(_):
+        start = time.perf_counter()
+        query(client)
+        return time.perf_counter() - start
+
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+        # warm up the connections of every thread
+        list(executor.map(timed_query, range(concurrency)))
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        latencies = sorted(executor.map(timed_query, range(count)))
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+
+    return {
+        "rps": count / wall,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(count - 1, int(count * 0.99))],
+        "cpu": cpu / count,
+    }
+
+
+def peak_memory(client: SiriClient, query, repeat: int = 3) -> int:
+    """
+    Largest number of bytes allocated at once while a single query is handled, including the parsed body.
+    """
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        body = query(client)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        del body
+    return peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--payloads", nargs="+", default=sorted(ENDPOINTS), choices=sorted(ENDPOINTS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100, 1000, 5000],
+                        help="records per synthetic payload")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="requests per measurement")
+    parser.add_argument("--json-decoder", default="json")
+    parser.add_argument("--recorded", nargs="*", default=[], metavar="NAME=PATH",
+                        help="benchmark a recorded response instead of the synthetic payloads of NAME")
+    args = parser.parse_args(argv)
+
+    recorded = dict(item.split("=", 1) for item in args.recorded)
+    scenarios = []
+    for name in args.payloads:
+        if name in recorded:
+            scenarios.append((name, os.path.basename(recorded[name]), payloads.load(recorded[name])))
+        else:
+            scenarios.extend((name, str(size), build_payload(name, size)) for size in args.sizes)
+
+    print("%-20s %8s %10s %5s %9s %9s %9s %10s %10s" % (
+        "payload", "records", "bytes", "thr", "req/s", "p50 ms", "p99 ms", "cpu ms/req", "peak MB"))
+    for name, label, content in scenarios:
+        path, query = ENDPOINTS[name]
+        with StandInServer({path: content}) as server:
+            memory = peak_memory(make_client(server.base_url, 1, args.json_decoder), query)
+            for concurrency in args.concurrency:
+                client = make_client(server.base_url, concurrency, args.json_decoder)
+                result = run(client, query, concurrency, args.requests)
+                client.session.close()
+                print("%-20s %8s %10d %5d %9.1f %9.2f %9.2f %10.2f %10.2f" % (
+                    name, label, len(content), concurrency, result["rps"], result["p50"] * 1e3,
+                    result["p99"] * 1e3, result["cpu"] * 1e3, memory / 1e6))
+
+
+if __name__ == "__main__":
+    main()
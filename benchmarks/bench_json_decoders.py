@@ -0,0 +1,59 @@
+"""
+Description: Compares the JSON decoders available to SiriClient on 511.org shaped payloads. Recorded responses can be
+benchmarked by passing their paths.
+
+Usage: python benchmarks/bench_json_decoders.py [payload name or path ...] [--repeat N]
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import payloads  # noqa: E402
+from siri_transit_api_client.decoders import available_decoders, get_decoder, strip_bom  # noqa: E402
+
+
+def _baseline(content: bytes):
+    # the decoding done by SiriClient._get_body before the decoders were pluggable
+    import json
+    return json.loads(content.decode("utf-8-sig"))
+
+
+def bench(content: bytes, loads, repeat: int) -> float:
+    """
+    Best time in seconds to strip the byte order mark and parse content.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loads(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("payloads", nargs="*", default=sorted(payloads.PAYLOADS))
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    candidates = [("decode + json.loads", _baseline)]
+    for name in available_decoders():
+        decoder = get_decoder(name)
+        candidates.append((name, lambda content, decoder=decoder: decoder(strip_bom(content))))
+
+    print("%-20s %10s %-22s %10s %8s" % ("payload", "bytes", "decoder", "best ms", "MB/s"))
+    for payload in args.payloads:
+        content = payloads.load(payload)
+        for name, loads in candidates:
+            seconds = bench(content, loads, args.repeat)
+            print("%-20s %10d %-22s %10.2f %8.1f" % (
+                os.path.basename(payload), len(content), name, seconds * 1e3, len(content) / seconds / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Description: Compares the memory held by the parsed dicts of StopMonitoring and VehicleMonitoring responses with the
+memory held by the typed records built from them.
+
+Usage: python benchmarks/bench_models_memory.py [--records N]
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import payloads  # noqa: E402
+from siri_transit_api_client import models  # noqa: E402
+
+
+def measure(build, *args) -> int:
+    """
+    Bytes still allocated by the object that build returns.
+    """
+    tracemalloc.start()
+    result = build(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--records", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    print("%-20s %14s %14s %8s" % ("payload", "dict B/record", "model B/record", "ratio"))
+    for name, to_models in (("stop_monitoring", models.stop_visits),
+                            ("vehicle_monitoring", models.vehicle_activities)):
+        content = payloads.encode(payloads.PAYLOADS[name](args.records), bom=False)
+        body = json.loads(content)
+        dict_size = measure(json.loads, content)
+        model_size = measure(to_models, body)
+        print("%-20s %14.0f %14.0f %7.1fx" % (
+            name, dict_size / args.records, model_size / args.records, dict_size / model_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Description: Measures the time of nearest stop, radius and bounding box queries against a StopIndex of stops spread
+over the Bay Area, compared with scanning every stop.
+
+Usage: python benchmarks/bench_spatial.py [--stops N] [--queries N] [--cell-size M]
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import argparse
+import dataclasses
+import random
+import time
+
+from siri_transit_api_client.models import Stop
+from siri_transit_api_client.spatial import StopIndex, haversine
+
+
+def bay_area_stops(count: int, generator: random.Random) -> list:
+    """
+    Stops clustered around the centers of the Bay Area, as the stops of the 511.org operators are.
+    """
+    centers = [(37.78, -122.42), (37.80, -122.27), (37.34, -121.89), (37.55, -122.30), (38.00, -122.50)]
+    stops = []
+    for index in range(count):
+        latitude, longitude = generator.choice(centers)
+        stops.append(Stop(id=str(index), name="Stop %d" % index, latitude=generator.gauss(latitude, 0.08),
+                          longitude=generator.gauss(longitude, 0.08), stop_type=None))
+    return stops
+
+
+def per_query(function, points) -> float:
+    start = time.perf_counter()
+    for latitude, longitude in points:
+        function(latitude, longitude)
+    return (time.perf_counter() - start) / len(points) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--stops", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--cell-size", type=float, default=500)
+    args = parser.parse_args(argv)
+
+    generator = random.Random(0)
+    stops = bay_area_stops(args.stops, generator)
+    points = [(stop.latitude + generator.uniform(-0.01, 0.01), stop.longitude + generator.uniform(-0.01, 0.01))
+              for stop in generator.sample(stops, min(args.queries, len(stops)))]
+
+    start = time.perf_counter()
+    index = StopIndex(stops, cell_size=args.cell_size)
+    print("built index of %d stops in %.1f ms" % (len(index), (time.perf_counter() - start) * 1000))
+
+    print("%-24s %12s" % ("query", "us/query"))
+    print("%-24s %12.1f" % ("nearest k=1", per_query(lambda lat, lon: index.nearest(lat, lon), points)))
+    print("%-24s %12.1f" % ("nearest k=10", per_query(lambda lat, lon: index.nearest(lat, lon, k=10), points)))
+    print("%-24s %12.1f" % ("within 400 m", per_query(lambda lat, lon: index.within(lat, lon, 400), points)))
+    print("%-24s %12.1f" % ("within bounds 1 km", per_query(
+        lambda lat, lon: index.within_bounds(lat - 0.0045, lon - 0.0057, lat + 0.0045, lon + 0.0057), points)))
+    print("%-24s %12.1f" % ("scan nearest k=1", per_query(
+        lambda lat, lon: min(stops, key=lambda stop: haversine(lat, lon, stop.latitude, stop.longitude)),
+        points[:50])))
+
+    changed = [dataclasses.replace(stop, latitude=stop.latitude + 0.001) for stop in stops[:100]]
+    start = time.perf_counter()
+    index.refresh(changed + stops[100:])
+    print("refresh with 100 stops moved in %.1f ms" % ((time.perf_counter() - start) * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Description: Compares the transports SiriClient can send its requests with: the default requests adapter, with its
+pool of 10 connections per host, PooledHTTPAdapter and HTTPXAdapter over HTTP/1.1 and HTTP/2. For several numbers of
+concurrent threads sharing one client it reports the requests per second and the connections opened and TLS
+handshakes made per 1000 requests. The local stand-in server only speaks plain HTTP/1.1; pass --base-url and --api-key
+to measure TLS handshakes and HTTP/2 against 511.org or another HTTPS server.
+
+Usage: python benchmarks/bench_transport.py [--backends NAME ...] [--concurrency N ...] [--requests N]
+    [--records N] [--base-url URL --api-key KEY]
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import payloads  # noqa: E402
+from stand_in_server import StandInServer  # noqa: E402
+from siri_transit_api_client import SiriClient  # noqa: E402
+from siri_transit_api_client.transport import HTTPXAdapter, PooledHTTPAdapter  # noqa: E402
+
+BACKENDS = {
+    # the pool size and lack of keep-alive of a plain requests.Session
+    "requests-default": lambda concurrency: PooledHTTPAdapter(pool_maxsize=requests.adapters.DEFAULT_POOLSIZE,
+                                                              keep_alive=None),
+    "pooled": lambda concurrency: PooledHTTPAdapter(pool_maxsize=max(32, concurrency)),
+    "httpx-http1": lambda concurrency: HTTPXAdapter(http2=False, max_keepalive_connections=max(20, concurrency)),
+    "httpx-http2": lambda concurrency: HTTPXAdapter(http2=True, max_keepalive_connections=max(20, concurrency)),
+}
+
+
+def run(client: SiriClient, concurrency: int, count: int) -> float:
+    """
+    Send count stop monitoring queries from concurrency threads and return the requests per second.
+    """
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda _: client.stop_monitoring("SF"), range(count)))
+        return count / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=1000, help="requests per measurement")
+    parser.add_argument("--records", type=int, default=200, help="monitored stop visits per stand-in response")
+    parser.add_argument("--base-url", help="server to query instead of the local stand-in server")
+    parser.add_argument("--api-key", default="benchmark")
+    args = parser.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        base_url = args.base_url
+        if base_url is None:
+            content = payloads.encode(payloads.PAYLOADS["stop_monitoring"](args.records))
+            base_url = stack.enter_context(StandInServer({"StopMonitoring": content})).base_url
+
+        print("%-18s %5s %9s %12s %12s" % ("backend", "thr", "req/s", "conn/1000", "tls/1000"))
+        for name in args.backends:
+            for concurrency in args.concurrency:
+                transport = BACKENDS[name](concurrency)
+                client = SiriClient(api_key=args.api_key, base_url=base_url, queries_per_second=10 ** 9,
+                                    transport=transport)
+                rps = run(client, concurrency, args.requests)
+                stats = transport.stats()
+                transport.close()
+                print("%-18s %5d %9.1f %12.1f %12.1f" % (
+                    name, concurrency, rps, stats.connections * 1000 / stats.requests,
+                    stats.tls_handshakes * 1000 / stats.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Description: This file builds payloads shaped like the responses of 511.org for the benchmarks. Recorded responses can
+be used instead by passing the path of a file holding the raw content of a response.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import codecs
+import datetime as dt
+import json
+import random
+
+_START = dt.datetime(2022, 5, 20, 22, 0, 0)
+
+
+def _timestamp(seconds: float) -> str:
+    return (_START + dt.timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _vehicle_journey(rng: random.Random, index: int, operator: str) -> dict:
+    line = str(rng.randint(1, 120))
+    stop = str(rng.randint(10000, 19999))
+    aimed = rng.randint(0, 3600)
+    expected = aimed + rng.randint(-60, 600)
+    return {
+        "LineRef": line,
+        "DirectionRef": rng.choice(["IB", "OB"]),
+        "FramedVehicleJourneyRef": {"DataFrameRef": "2022-05-20", "DatedVehicleJourneyRef": str(11000000 + index)},
+        "PublishedLineName": "LINE %s" % line,
+        "OperatorRef": operator,
+        "OriginRef": str(rng.randint(10000, 19999)),
+        "OriginName": "Origin Stop %d" % rng.randint(1, 500),
+        "DestinationRef": str(rng.randint(10000, 19999)),
+        "DestinationName": "Destination Stop %d" % rng.randint(1, 500),
+        "Monitored": True,
+        "InCongestion": None,
+        "VehicleLocation": {
+            "Longitude": "%.6f" % rng.uniform(-122.52, -122.35),
+            "Latitude": "%.6f" % rng.uniform(37.70, 37.81),
+        },
+        "Bearing": "%.1f" % rng.uniform(0, 360),
+        "Occupancy": rng.choice(["seatsAvailable", "standingAvailable", "full"]),
+        "VehicleRef": str(1000 + index),
+        "MonitoredCall": {
+            "StopPointRef": stop,
+            "StopPointName": "Stop %s" % stop,
+            "VehicleLocationAtStop": "",
+            "VehicleAtStop": "",
+            "DestinationDisplay": "Destination %s" % line,
+            "AimedArrivalTime": _timestamp(aimed),
+            "ExpectedArrivalTime": _timestamp(expected),
+            "AimedDepartureTime": _timestamp(aimed),
+            "ExpectedDepartureTime": _timestamp(expected),
+            "Distances": "",
+        },
+    }
+
+
+def vehicle_monitoring(vehicles: int = 1000, operator: str = "SF", seed: int = 0) -> dict:
+    """
+    Body of an agency wide VehicleMonitoring response.
+
+    :param vehicles: Number of VehicleActivity records
+    :type vehicles: int
+
+    :rtype: dict
+    """
+    rng = random.Random(seed)
+    activity = [
+        {
+            "RecordedAtTime": _timestamp(rng.randint(0, 60)),
+            "ValidUntilTime": "",
+            "MonitoredVehicleJourney": _vehicle_journey(rng, index, operator),
+        }
+        for index in range(vehicles)
+    ]
+    return {
+        "Siri": {
+            "ServiceDelivery": {
+                "ResponseTimestamp": _timestamp(60),
+                "ProducerRef": operator,
+                "Status": True,
+                "VehicleMonitoringDelivery": {
+                    "version": "1.4",
+                    "ResponseTimestamp": _timestamp(60),
+                    "Status": True,
+                    "VehicleActivity": activity,
+                },
+            }
+        }
+    }
+
+
+def stop_monitoring(visits: int = 5000, operator: str = "SF", seed: int = 0) -> dict:
+    """
+    Body of an agency wide StopMonitoring response.
+
+    :param visits: Number of MonitoredStopVisit records
+    :type visits: int
+
+    :rtype: dict
+    """
+    rng = random.Random(seed)
+    stop_visits = []
+    for index in range(visits):
+        journey = _vehicle_journey(rng, index, operator)
+        stop_visits.append(
+            {
+                "RecordedAtTime": _timestamp(rng.randint(0, 60)),
+                "MonitoringRef": journey["MonitoredCall"]["StopPointRef"],
+                "MonitoredVehicleJourney": journey,
+            }
+        )
+    return {
+        "ServiceDelivery": {
+            "ResponseTimestamp": _timestamp(60),
+            "ProducerRef": operator,
+            "Status": True,
+            "StopMonitoringDelivery": {
+                "version": "1.4",
+                "ResponseTimestamp": _timestamp(60),
+                "Status": True,
+                "MonitoredStopVisit": stop_visits,
+            },
+        }
+    }
+
+
+def timetable(journeys: int = 500, stops_per_journey: int = 40, operator: str = "SF", seed: int = 0) -> dict:
+    """
+    Body of a timetable response for one line.
+
+    :param journeys: Number of ServiceJourney records
+    :type journeys: int
+
+    :param stops_per_journey: Number of calls of each journey
+    :type stops_per_journey: int
+
+    :rtype: dict
+    """
+    rng = random.Random(seed)
+    service_journeys = []
+    for index in range(journeys):
+        start = rng.randint(5 * 3600, 23 * 3600)
+        calls = []
+        for order in range(stops_per_journey):
+            time_of_day = (_START.replace(hour=0) + dt.timedelta(seconds=start + 90 * order)).strftime("%H:%M:%S")
+            calls.append(
+                {
+                    "ScheduledStopPointRef": str(10000 + order),
+                    "Order": str(order + 1),
+                    "Arrival": {"Time": time_of_day, "DaysOffset": "0"},
+                    "Departure": {"Time": time_of_day, "DaysOffset": "0"},
+                }
+            )
+        service_journeys.append(
+            {
+                "id": str(11000000 + index),
+                "SiriVehicleJourneyRef": str(11000000 + index),
+                "JourneyPatternView": {"RouteRef": "1", "DirectionRef": rng.choice(["IB", "OB"])},
+                "calls": {"Call": calls},
+            }
+        )
+    return {
+        "Content": {
+            "TimetableFrame": [
+                {
+                    "id": "%s:1:Weekday" % operator,
+                    "Name": "Weekday",
+                    "frameValidityConditions": {"AvailabilityCondition": {"FromDate": "2022-05-01"}},
+                    "vehicleJourneys": {"ServiceJourney": service_journeys},
+                }
+            ]
+        }
+    }
+
+
+PAYLOADS = {
+    "vehicle_monitoring": vehicle_monitoring,
+    "stop_monitoring": stop_monitoring,
+    "timetable": timetable,
+}
+
+
+def encode(body, bom: bool = True) -> bytes:
+    """
+    Encode a body the way 511.org sends it: compact UTF-8 JSON that starts with a byte order mark.
+
+    :rtype: bytes
+    """
+    content = json.dumps(body, separators=(",", ":")).encode("utf-8")
+    return codecs.BOM_UTF8 + content if bom else content
+
+
+def load(name_or_path: str) -> bytes:
+    """
+    Raw content of a synthetic payload given its name, or of a recorded response given its path.
+
+    :rtype: bytes
+    """
+    if name_or_path in PAYLOADS:
+        return encode(PAYLOADS[name_or_path]())
+    with open(name_or_path, "rb") as recorded:
+        return recorded.read()
@@ -0,0 +1,67 @@
+"""
+Description: Local HTTP server standing in for 511.org in the benchmarks. It runs in a child process, so that its CPU
+time and memory are not counted against the client, and answers each endpoint path with a fixed response content.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import http.server
+import multiprocessing
+import urllib.parse
+
+
+def _serve(routes: dict, ready) -> None:
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            content = routes.get(urllib.parse.urlsplit(self.path).path)
+            if content is None:
+                self.send_response(404)
+                content = b"Not Found"
+            else:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    ready.send(httpd.server_address[1])
+    httpd.serve_forever()
+
+
+class StandInServer:
+    def __init__(self, routes: dict):
+        """
+        Serve routes from a child process until the server is closed.
+
+        :param routes: Endpoint path, e.g. "VehicleMonitoring", mapped to the response content
+        :type routes: dict
+        """
+        self.routes = {"/Transit/" + path: content for path, content in routes.items()}
+        self.base_url = None
+        self._process = None
+
+    def start(self) -> "StandInServer":
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(target=_serve, args=(self.routes, sender), daemon=True)
+        self._process.start()
+        self.base_url = "http://127.0.0.1:%d/Transit/" % receiver.recv()
+        return self
+
+    def close(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -5,7 +5,8 @@ __email__ = 'robertghennessy@gmail.com'
 __version__ = '0.2.1'
 
 from siri_transit_api_client.siri_client import SiriClient
+from siri_transit_api_client.async_client import AsyncSiriClient
 from siri_transit_api_client import exceptions
 
-__all__ = ["SiriClient", "exceptions"]
+__all__ = ["SiriClient", "AsyncSiriClient", "exceptions"]
 
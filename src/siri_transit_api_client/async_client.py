@@ -0,0 +1,408 @@
+"""
+Description: This file contains an asyncio class to query Siri data from 511.org. It mirrors the endpoints of
+SiriClient, but the requests are sent with httpx so that a single event loop can keep many requests in flight.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import asyncio
+import collections
+import datetime as dt
+import time
+
+import siri_transit_api_client
+from siri_transit_api_client.decoders import get_decoder
+from siri_transit_api_client.retry import RetryBudget, RetryPolicy, parse_retry_after
+from siri_transit_api_client.singleflight import AsyncSingleFlight
+from siri_transit_api_client.siri_client import SiriClient, _DEFAULT_BASE_URL
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - exercised only when the optional dependency is missing
+    httpx = None
+
+
+class AsyncRateLimiter:
+    def __init__(self, queries_per_second: int = 10):
+        """
+        Limits the number of queries sent per second from an event loop.
+
+        :param queries_per_second: Number of queries per second permitted.
+        :type queries_per_second: int
+        """
+        self.queries_per_second = queries_per_second
+        self.sent_times = collections.deque(maxlen=queries_per_second)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Wait until a query can be sent without exceeding the rate limit and reserve a slot for it.
+        """
+        async with self._lock:
+            # Check if the time of the nth previous query (where n is
+            # queries_per_second) is under a second ago - if so, sleep for
+            # the difference.
+            if len(self.sent_times) == self.queries_per_second:
+                elapsed_since_earliest = time.monotonic() - self.sent_times[0]
+                if elapsed_since_earliest < 1:
+                    await asyncio.sleep(1 - elapsed_since_earliest)
+            self.sent_times.append(time.monotonic())
+
+
+class AsyncSiriClient:
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = _DEFAULT_BASE_URL,
+        retry_timeout: int = 60,
+        queries_per_second: int = 10,
+        retry_over_query_limit: bool = True,
+        http_client: "httpx.AsyncClient" = None,
+        requests_kwargs: dict = None,
+        json_decoder="json",
+        coalesce_requests: bool = False,
+        retry_policy: RetryPolicy = None,
+        endpoint_retry_policies: dict = None,
+        retry_budget: RetryBudget = None,
+    ):
+        """
+        Create an asyncio session to query the SIRI transit data from 511.org
+
+        :param api_key: string that contains the api key for 511.org
+        :type api_key: str
+
+        :param base_url: weblink to 511 api
+        :type base_url: str
+
+        :param retry_timeout: Timeout across multiple retriable requests, in
+            seconds.
+        :type retry_timeout: int
+
+        :param queries_per_second: Number of queries per second permitted.
+            If the rate limit is reached, the client will wait for the
+            appropriate amount of time before it sends the current query.
+        :type queries_per_second: int
+
+        :param retry_over_query_limit: If True, requests that result in a
+            response indicating the query rate limit was exceeded will be
+            retried. Defaults to True.
+        :type retry_over_query_limit: bool
+
+        :param http_client: Reused persistent httpx client for flexibility.
+        :type http_client: httpx.AsyncClient
+
+        :param requests_kwargs: Extra keyword arguments for the httpx get call
+        :type requests_kwargs: dict
+
+        :param json_decoder: Decoder used to parse the responses: "json", "orjson", "msgspec", "auto" or a function.
+        :type json_decoder: str or function
+
+        :param coalesce_requests: If True, a request identical to one in flight waits for that request and shares its
+            result or exception instead of being sent again. See SiriClient. Defaults to False.
+        :type coalesce_requests: bool
+
+        :param retry_policy: Decides whether and when failed requests are retried. See SiriClient.
+        :type retry_policy: RetryPolicy, optional
+
+        :param endpoint_retry_policies: Retry policies of specific endpoints, keyed on the endpoint path.
+        :type endpoint_retry_policies: dict, optional
+
+        :param retry_budget: Budget shared by the retries of all the requests. See SiriClient.
+        :type retry_budget: RetryBudget, optional
+        """
+        if not api_key:
+            raise ValueError("Must provide transit api key.")
+        if httpx is None:
+            raise ImportError("AsyncSiriClient requires httpx: pip install siri-transit-api-client[async]")
+        self.base_url = base_url
+        self.api_key = api_key
+        self.http_client = http_client or httpx.AsyncClient()
+        self.retry_timeout = dt.timedelta(seconds=retry_timeout)
+        self.queries_per_second = queries_per_second
+        self.retry_over_query_limit = retry_over_query_limit
+        self.rate_limiter = AsyncRateLimiter(queries_per_second)
+        self.json_loads = get_decoder(json_decoder)
+        self.single_flight = AsyncSingleFlight() if coalesce_requests else None
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.endpoint_retry_policies = dict(endpoint_retry_policies or {})
+        self.retry_budget = retry_budget or RetryBudget()
+        self.requests_kwargs = requests_kwargs or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Close the underlying httpx client and release its connections.
+        """
+        await self.http_client.aclose()
+
+    # the body is extracted exactly as the synchronous client does it
+    _get_body = SiriClient._get_body
+    _generate_auth_url = SiriClient._generate_auth_url
+    _retry_policy = SiriClient._retry_policy
+
+    async def _request(
+        self,
+        url: str,
+        params: dict,
+        base_url: str = None,
+        extract_body=None,
+        requests_kwargs: dict = None,
+    ) -> dict:
+        """
+        Performs HTTP GET with credentials, returning the body as JSON. Failed requests are retried as the retry
+        policy of the endpoint permits.
+
+        :param url: URL path for the request.
+        :type url: string
+
+        :param params: HTTP GET parameters.
+        :type params: dict
+
+        :param base_url: The base URL for the request. Defaults to the client base url.
+        :type base_url: string
+
+        :param extract_body: A function that extracts the body from the response.
+        :type extract_body: function
+
+        :param requests_kwargs: Same extra keywords arg for httpx as per __init__, but provided here to allow
+            overriding internally on a per-request basis.
+        :type requests_kwargs: dict
+
+        :raises ApiError: when the API returns an error.
+        :raises OverQueryLimit: when the API answers 429 Too Many Requests and the request is not retried.
+        :raises Timeout: if the request timed out.
+        :raises TransportError: when something went wrong while trying to
+            execute a request.
+        """
+        if base_url is None:
+            base_url = self.base_url
+
+        authed_url = self._generate_auth_url(url, params)
+        if self.single_flight is not None and not extract_body and not requests_kwargs:
+            return await self.single_flight.do(base_url + authed_url, self._send_request, url, base_url, authed_url)
+        return await self._send_request(url, base_url, authed_url, extract_body, requests_kwargs)
+
+    async def _send_request(
+        self, url: str, base_url: str, authed_url: str, extract_body=None, requests_kwargs: dict = None
+    ) -> dict:
+        requests_kwargs = requests_kwargs or {}
+        final_requests_kwargs = dict(self.requests_kwargs, **requests_kwargs)
+
+        policy = self._retry_policy(url)
+        timeout = self.retry_timeout.total_seconds() if policy.deadline is None else policy.deadline
+        deadline = time.monotonic() + timeout
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            if attempt > 0 and time.monotonic() > deadline:
+                raise siri_transit_api_client.exceptions.Timeout()
+            attempt += 1
+
+            await self.rate_limiter.acquire()
+            try:
+                response = await self.http_client.get(base_url + authed_url, **final_requests_kwargs)
+            except httpx.TimeoutException:
+                raise siri_transit_api_client.exceptions.Timeout()
+            except Exception as e:
+                raise siri_transit_api_client.exceptions.TransportError(e)
+
+            retry_after = None
+            if response.status_code in policy.retry_statuses:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    error = siri_transit_api_client.exceptions.OverQueryLimit(429, response.text)
+                    if not self.retry_over_query_limit:
+                        raise error
+                else:
+                    error = siri_transit_api_client.exceptions.HTTPError(response.status_code)
+            else:
+                try:
+                    if extract_body:
+                        return extract_body(response)
+                    return self._get_body(response)
+                except siri_transit_api_client.exceptions.RetriableRequest as e:
+                    error = e
+
+            delay = policy.next_delay(attempt, deadline - time.monotonic(), retry_after)
+            if delay is None or not self.retry_budget.withdraw():
+                raise error
+            await asyncio.sleep(delay)
+
+    async def holidays(self, operator_id: str, accept_language: str = None) -> dict:
+        """
+        Query the 511 api to get the holidays for a transit operator. See :meth:`SiriClient.holidays`.
+
+        :rtype: dict
+        """
+        params = {"Operator_id": operator_id}
+        if accept_language:
+            params["accept_language"] = accept_language
+        return await self._request("holidays", params)
+
+    async def lines(self, operator_id: str, accept_language: str = None, line_id: str = None) -> dict:
+        """
+        Query the 511 api to get the routes covered by transit operators. See :meth:`SiriClient.lines`.
+
+        :rtype: dict
+        """
+        params = {"Operator_id": operator_id}
+        if accept_language:
+            params["accept_language"] = accept_language
+        if line_id:
+            params["Line_id"] = line_id
+        return await self._request("lines", params)
+
+    async def operators(self, accept_language: str = None, operator_id: str = None) -> dict:
+        """
+        Query api to collect list of all the public transit operators. See :meth:`SiriClient.operators`.
+
+        :rtype: dict
+        """
+        params = {}
+        if accept_language:
+            params["accept_language"] = accept_language
+        if operator_id:
+            params["Operator_id"] = operator_id
+        return await self._request("Operators", params)
+
+    async def patterns(
+        self,
+        operator_id: str,
+        line_id: str,
+        accept_language: str = None,
+        pattern_id: str = None,
+    ) -> dict:
+        """
+        Query api to get the pattern of a Line. See :meth:`SiriClient.patterns`.
+
+        :rtype: dict
+        """
+        params = {"Operator_id": operator_id, "Line_id": line_id}
+        if accept_language:
+            params["accept_language"] = accept_language
+        if pattern_id:
+            params["Pattern_id"] = pattern_id
+        return await self._request("patterns", params)
+
+    async def shapes(self, operator_id: str, trip_id: str, accept_language: str = None) -> dict:
+        """
+        Query api to get the path that a vehicle travels along a trip. See :meth:`SiriClient.shapes`.
+
+        :rtype: dict
+        """
+        params = {"Operator_id": operator_id, "trip_id": trip_id}
+        if accept_language:
+            params["accept_language"] = accept_language
+        return await self._request("shapes", params)
+
+    async def stop_monitoring(self, agency: str, stop_code: str = None) -> dict:
+        """
+        Collect stop monitoring information for a stop. See :meth:`SiriClient.stop_monitoring`.
+
+        :rtype: dict
+        """
+        params = {"agency": agency}
+        if stop_code:
+            params["stopCode"] = stop_code
+        return await self._request("StopMonitoring", params)
+
+    async def stop_places(self, operator_id: str, accept_language: str = None, stop_id: str = None) -> dict:
+        """
+        Query to get a named place or the physical stop. See :meth:`SiriClient.stop_places`.
+
+        :rtype: dict
+        """
+        params = {"Operator_id": operator_id}
+        if accept_language:
+            params["accept_language"] = accept_language
+        if stop_id:
+            params["Stop_id"] = stop_id
+        return await self._request("stopPlaces", params)
+
+    async def stop_timetable(
+        self,
+        operator_id: str,
+        stop_code: str,
+        line_id: str = None,
+        start_time: str = None,
+        end_time: str = None,
+    ) -> dict:
+        """
+        Query the api stop timetables for a particular stop. See :meth:`SiriClient.stop_timetable`.
+
+        :rtype: dict
+        """
+        params = {"OperatorRef": operator_id, "MonitoringRef": stop_code}
+        if line_id:
+            params["Line_id"] = line_id
+        if start_time:
+            params["StartTime"] = start_time
+        if end_time:
+            params["EndTime"] = end_time
+        return await self._request("stoptimetable", params)
+
+    async def stops(
+        self,
+        operator_id: str,
+        accept_language: str = None,
+        line_id: str = None,
+        include_stop_areas: bool = False,
+        direction_id: str = None,
+        pattern_id: str = None,
+    ) -> dict:
+        """
+        Query api to get locations where passengers can board or leave vehicles. See :meth:`SiriClient.stops`.
+
+        :rtype: dict
+        """
+        params = {"Operator_id": operator_id}
+        if accept_language:
+            params["accept_language"] = accept_language
+        if line_id:
+            params["Line_id"] = line_id
+        if include_stop_areas:
+            params["include_stop_areas"] = "true"
+        if direction_id:
+            params["Direction_id"] = direction_id
+        if pattern_id:
+            params["Pattern_id"] = pattern_id
+        return await self._request("stops", params)
+
+    async def timetable(
+        self,
+        operator_id: str,
+        line_id: str,
+        accept_language: str = None,
+        include_day_type_assignments: bool = None,
+        include_special_service: bool = False,
+        exception_date: dt.date = None,
+    ) -> dict:
+        """
+        Query api to get the timetable for a given Line. See :meth:`SiriClient.timetable`.
+
+        :rtype: dict
+        """
+        params = {"Operator_id": operator_id, "Line_id": line_id}
+        if accept_language:
+            params["accept_language"] = accept_language
+        if include_day_type_assignments:
+            params["IncludeDayTypeAssignments"] = include_day_type_assignments
+        params["IncludeSpecialService"] = include_special_service
+        if exception_date:
+            params["ExceptionDate"] = exception_date.strftime("%Y%m%d")
+        return await self._request("timetable", params)
+
+    async def vehicle_monitoring(self, agency: str, vehicle_id: str = None) -> dict:
+        """
+        Collect vehicle monitoring information for an agency. See :meth:`SiriClient.vehicle_monitoring`.
+
+        :rtype: dict
+        """
+        params = {"agency": agency}
+        if vehicle_id:
+            params["vehicleID"] = vehicle_id
+        return await self._request("VehicleMonitoring", params)
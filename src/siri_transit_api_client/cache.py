@@ -0,0 +1,343 @@
+"""
+Description: This file contains caches for the responses returned by 511.org. Entries expire after a time to live that
+is configured per endpoint. ResponseCache keeps parsed bodies in memory and evicts the least recently used entries
+once the cached responses take more than a given number of bytes. SQLiteResponseCache keeps the raw response content
+in a SQLite database that can be shared by several processes and survives restarts.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import collections
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from siri_transit_api_client.decoders import loads_content
+
+_HOUR = 3600
+
+_DEFAULT_TTLS = {
+    "holidays": 24 * _HOUR,
+    "lines": 6 * _HOUR,
+    "Operators": 24 * _HOUR,
+    "patterns": 6 * _HOUR,
+    "shapes": 6 * _HOUR,
+    "stopPlaces": 6 * _HOUR,
+    "stops": 6 * _HOUR,
+    "stoptimetable": _HOUR,
+    "timetable": 6 * _HOUR,
+}
+
+CacheStats = collections.namedtuple("CacheStats", ["hits", "misses", "evictions", "entries", "size_bytes"])
+
+_CacheEntry = collections.namedtuple("_CacheEntry", ["body", "size", "expires"])
+
+
+class _EndpointTtls:
+    def __init__(self, ttls: dict = None, default_ttl: float = 0, stale_ttl: float = 0):
+        self.ttls = dict(_DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+
+    def ttl(self, endpoint: str) -> float:
+        """
+        Time to live of the responses of an endpoint.
+
+        :param endpoint: URL path of the endpoint, as passed to SiriClient._request
+        :type endpoint: str
+
+        :rtype: float
+        """
+        return self.ttls.get(endpoint, self.default_ttl)
+
+
+class ResponseCache(_EndpointTtls):
+    def __init__(
+        self, ttls: dict = None, default_ttl: float = 0, max_bytes: int = 64 * 1024 * 1024, stale_ttl: float = 0
+    ):
+        """
+        Thread safe LRU cache of parsed response bodies. The cached bodies are shared between callers and must not be
+        modified.
+
+        :param ttls: Time to live in seconds for each endpoint path. Endpoints with a time to live of zero are not
+            cached. Defaults to hours for the static endpoints; the real-time endpoints are not cached unless they
+            are given a time to live, e.g. {"StopMonitoring": 15}.
+        :type ttls: dict, optional
+
+        :param default_ttl: Time to live in seconds for endpoints missing from ttls.
+        :type default_ttl: float
+
+        :param max_bytes: Maximum size of the cached responses, measured as the length of the response content.
+        :type max_bytes: int
+
+        :param stale_ttl: Seconds an expired entry is kept for get_stale, e.g. to answer while the api is down.
+        :type stale_ttl: float
+        """
+        super().__init__(ttls, default_ttl, stale_ttl)
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str):
+        """
+        Return the cached body for key, or None if it is missing or expired.
+
+        :param key: Cache key of the request
+        :type key: str
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            now = time.monotonic()
+            if entry.expires <= now:
+                if entry.expires + self.stale_ttl <= now:
+                    self._remove(key)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.body
+
+    def get_stale(self, key: str):
+        """
+        Return the body cached for key even if it has expired less than stale_ttl seconds ago, or None.
+
+        :param key: Cache key of the request
+        :type key: str
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires + self.stale_ttl <= time.monotonic():
+                return None
+            return entry.body
+
+    def set(self, key: str, endpoint: str, body, content: bytes) -> None:
+        """
+        Cache the body returned for key, evicting the least recently used entries if the cache is full.
+
+        :param key: Cache key of the request
+        :type key: str
+
+        :param endpoint: URL path of the endpoint, used to look up the time to live
+        :type endpoint: str
+
+        :param body: Parsed response body
+        :type body: dict or list
+
+        :param content: Raw response content, used to account for the size of the entry
+        :type content: bytes
+        """
+        size = len(content)
+        ttl = self.ttl(endpoint)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(body, size, time.monotonic() + ttl)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+
+    def clear(self) -> None:
+        """
+        Remove every entry from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> CacheStats:
+        """
+        Hit, miss and eviction counters along with the number of entries and their size in bytes.
+
+        :rtype: CacheStats
+        """
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, len(self._entries), self._size)
+
+
+class SQLiteResponseCache(_EndpointTtls):
+    def __init__(
+        self,
+        path: str,
+        ttls: dict = None,
+        default_ttl: float = 0,
+        compress: bool = False,
+        loads=None,
+        stale_ttl: float = 0,
+    ):
+        """
+        Cache of raw response content stored in a SQLite database. Several processes can read and write the same file
+        at once and the entries survive restarts. The content is stored as received, so a hit only costs parsing it.
+
+        :param path: Path of the SQLite database file. It is created if it does not exist.
+        :type path: str
+
+        :param ttls: Time to live in seconds for each endpoint path. Endpoints with a time to live of zero are not
+            cached. Defaults to hours for the static endpoints.
+        :type ttls: dict, optional
+
+        :param default_ttl: Time to live in seconds for endpoints missing from ttls.
+        :type default_ttl: float
+
+        :param compress: If True, the content is compressed with zlib before it is stored.
+        :type compress: bool
+
+        :param loads: Function that parses the cached content into the response body. By default a SiriClient parses
+            the hits with its own json_decoder, and get and get_stale use the json module, after stripping any byte
+            order mark.
+        :type loads: function, optional
+
+        :param stale_ttl: Seconds an expired entry is kept for get_stale, e.g. to answer while the api is down.
+        :type stale_ttl: float
+        """
+        super().__init__(ttls, default_ttl, stale_ttl)
+        self.path = path
+        self.compress = compress
+        self.loads = loads
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # connections are opened per thread and must not be carried across a fork
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, endpoint TEXT, content BLOB, "
+                "compressed INTEGER, size INTEGER, expires REAL)"
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_content(self, key: str, stale: bool = False):
+        """
+        Return the raw content cached for key, or None if it is missing or expired.
+
+        :param key: Cache key of the request
+        :type key: str
+
+        :param stale: If True, content that expired less than stale_ttl seconds ago is returned as well and the hit
+            and miss counters are left unchanged.
+        :type stale: bool
+
+        :rtype: bytes
+        """
+        now = time.time() - self.stale_ttl if stale else time.time()
+        row = self._connect().execute(
+            "SELECT content, compressed FROM responses WHERE key = ? AND expires > ?", (key, now)
+        ).fetchone()
+        if not stale:
+            self._count("_misses" if row is None else "_hits")
+        if row is None:
+            return None
+        content, compressed = row
+        return zlib.decompress(content) if compressed else bytes(content)
+
+    def get(self, key: str):
+        """
+        Return the cached body for key, or None if it is missing or expired.
+
+        :param key: Cache key of the request
+        :type key: str
+        """
+        content = self.get_content(key)
+        if content is None:
+            return None
+        return self._parse(content)
+
+    def get_stale(self, key: str):
+        """
+        Return the body cached for key even if it has expired less than stale_ttl seconds ago, or None.
+
+        :param key: Cache key of the request
+        :type key: str
+        """
+        content = self.get_content(key, stale=True)
+        if content is None:
+            return None
+        return self._parse(content)
+
+    def _parse(self, content: bytes):
+        return self.loads(content) if self.loads is not None else loads_content(content)
+
+    def set(self, key: str, endpoint: str, body, content: bytes) -> None:
+        """
+        Store the content returned for key.
+
+        :param key: Cache key of the request
+        :type key: str
+
+        :param endpoint: URL path of the endpoint, used to look up the time to live
+        :type endpoint: str
+
+        :param body: Parsed response body. Only the raw content is stored.
+        :type body: dict or list
+
+        :param content: Raw response content
+        :type content: bytes
+        """
+        ttl = self.ttl(endpoint)
+        if ttl <= 0:
+            return
+        stored = zlib.compress(content, 1) if self.compress else content
+        self._connect().execute(
+            "INSERT OR REPLACE INTO responses (key, endpoint, content, compressed, size, expires) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, endpoint, stored, int(self.compress), len(content), time.time() + ttl),
+        )
+
+    def purge_expired(self) -> int:
+        """
+        Delete the entries that expired more than stale_ttl seconds ago from the database.
+
+        :return: Number of entries deleted
+        :rtype: int
+        """
+        deleted = self._connect().execute(
+            "DELETE FROM responses WHERE expires <= ?", (time.time() - self.stale_ttl,)
+        ).rowcount
+        with self._lock:
+            self._evictions += deleted
+        return deleted
+
+    def clear(self) -> None:
+        """
+        Remove every entry from the cache.
+        """
+        self._connect().execute("DELETE FROM responses")
+
+    def stats(self) -> CacheStats:
+        """
+        Hit, miss and eviction counters of this process along with the number of entries in the database and the
+        size of their uncompressed content in bytes.
+
+        :rtype: CacheStats
+        """
+        entries, size = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, entries, size)
@@ -0,0 +1,311 @@
+"""
+Description: This file contains cassettes, append-only files holding the responses returned by 511.org, and the
+requests transport adapters that record them and replay them without network access. Each record keeps the URL
+without the api key, the status, the headers, the raw content and the time the response took. Replays read the file
+through a memory map, so recordings larger than the memory can be replayed, either as fast as possible or at the pace
+they were recorded.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import collections
+import io
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3.response import HTTPResponse
+
+_MAGIC = b"SIRICAS1"
+# length of the JSON metadata and of the content that follow
+_RECORD = struct.Struct("<IQ")
+# headers describing the content as sent on the wire, which no longer apply to the decoded content that is stored
+_WIRE_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+CassetteRecord = collections.namedtuple(
+    "CassetteRecord", ["url", "status", "headers", "recorded_at", "elapsed", "offset", "size"]
+)
+
+
+def strip_api_key(url: str) -> str:
+    """
+    Remove the api_key parameter from a URL.
+
+    :param url: Request URL
+    :type url: str
+
+    :rtype: str
+    """
+    parts = urllib.parse.urlsplit(url)
+    query = [(name, value) for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+             if name != "api_key"]
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+class CassetteWriter:
+    def __init__(self, path: str):
+        """
+        Append responses to a cassette file, creating it if needed. Safe to use from several threads.
+
+        :param path: Path of the cassette file
+        :type path: str
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(_MAGIC)
+            self._file.flush()
+
+    def write(self, url: str, status: int, headers: dict, content: bytes, elapsed: float,
+              recorded_at: float = None) -> None:
+        """
+        Append a response.
+
+        :param url: Request URL, the api key is removed before it is stored
+        :type url: str
+
+        :param status: HTTP status
+        :type status: int
+
+        :param headers: Response headers
+        :type headers: dict
+
+        :param content: Decoded response content
+        :type content: bytes
+
+        :param elapsed: Seconds from sending the request to receiving the whole response
+        :type elapsed: float
+
+        :param recorded_at: POSIX time the response was received. Defaults to now.
+        :type recorded_at: float, optional
+        """
+        metadata = json.dumps({
+            "url": strip_api_key(url),
+            "status": status,
+            "headers": {name: value for name, value in headers.items() if name.lower() not in _WIRE_HEADERS},
+            "recorded_at": time.time() if recorded_at is None else recorded_at,
+            "elapsed": elapsed,
+        }, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            # one write per record keeps records whole when several processes append to the file
+            self._file.write(_RECORD.pack(len(metadata), len(content)) + metadata + content)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "CassetteWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class CassetteReader:
+    def __init__(self, path: str):
+        """
+        Memory mapped view of a cassette file. Only the record headers are read when the file is opened; the content
+        of a record is read from the map when it is requested.
+
+        :param path: Path of the cassette file
+        :type path: str
+        """
+        self.path = path
+        self.records = []
+        self._by_url = collections.defaultdict(list)
+        with open(path, "rb") as cassette:
+            size = os.fstat(cassette.fileno()).st_size
+            if size < len(_MAGIC) or cassette.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError("Not a cassette file: %s" % path)
+            self._map = mmap.mmap(cassette.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index(size)
+
+    def _index(self, size: int) -> None:
+        offset = len(_MAGIC)
+        while offset + _RECORD.size <= size:
+            metadata_size, content_size = _RECORD.unpack_from(self._map, offset)
+            content_offset = offset + _RECORD.size + metadata_size
+            if content_offset + content_size > size:
+                # a record cut short by an interrupted recording
+                break
+            metadata = json.loads(self._map[offset + _RECORD.size:content_offset])
+            record = CassetteRecord(metadata["url"], metadata["status"], metadata["headers"],
+                                    metadata["recorded_at"], metadata["elapsed"], content_offset, content_size)
+            self._by_url[record.url].append(len(self.records))
+            self.records.append(record)
+            offset = content_offset + content_size
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def urls(self) -> list:
+        """
+        URLs recorded in the cassette, without the api key.
+
+        :rtype: list of str
+        """
+        return list(self._by_url)
+
+    def find(self, url: str) -> list:
+        """
+        Records of a URL in the order they were recorded.
+
+        :param url: Request URL, with or without the api key
+        :type url: str
+
+        :rtype: list of CassetteRecord
+        """
+        return [self.records[index] for index in self._by_url.get(strip_api_key(url), ())]
+
+    def content(self, record: CassetteRecord) -> bytes:
+        """
+        Raw content of a record.
+
+        :rtype: bytes
+        """
+        return self._map[record.offset:record.offset + record.size]
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "CassetteReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class RecordingAdapter(BaseAdapter):
+    def __init__(self, cassette, adapter: BaseAdapter = None):
+        """
+        Transport adapter sending requests with another adapter and appending every response to a cassette.
+
+        :param cassette: Cassette file path or writer
+        :type cassette: str or CassetteWriter
+
+        :param adapter: Adapter sending the requests. Defaults to the adapter the session used before this one was
+            mounted, or to a new HTTPAdapter.
+        :type adapter: requests.adapters.BaseAdapter, optional
+        """
+        super().__init__()
+        self.cassette = CassetteWriter(cassette) if isinstance(cassette, str) else cassette
+        self.adapter = adapter
+        self._default_adapter = adapter is None
+
+    def mount(self, session: requests.Session, prefix: str) -> None:
+        """
+        Record the requests a session sends to URLs starting with prefix.
+
+        :param session: Session to record
+        :type session: requests.Session
+
+        :param prefix: URL prefix, e.g. the base URL of the client
+        :type prefix: str
+        """
+        if self._default_adapter:
+            self.adapter = session.get_adapter(prefix)
+        session.mount(prefix, self)
+
+    def send(self, request, **kwargs):
+        if self.adapter is None:
+            self.adapter = HTTPAdapter()
+        start = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        # the content is kept by the response, so streaming it afterwards replays it from memory
+        content = response.content
+        self.cassette.write(request.url, response.status_code, response.headers, content,
+                            time.perf_counter() - start)
+        return response
+
+    def close(self) -> None:
+        if self.adapter is not None:
+            self.adapter.close()
+        self.cassette.close()
+
+
+class ReplayAdapter(HTTPAdapter):
+    def __init__(self, cassette, speed: float = None, loop: bool = False):
+        """
+        Transport adapter answering requests with the responses recorded in a cassette, without network access.
+        Successive requests for a URL get its responses in the order they were recorded.
+
+        :param cassette: Cassette file path or reader
+        :type cassette: str or CassetteReader
+
+        :param speed: None to replay as fast as possible, or the speed relative to the recording: with 1.0 each
+            response takes as long as it did and is not returned before the time it was recorded, counted from the
+            first request replayed; 2.0 replays twice as fast.
+        :type speed: float, optional
+
+        :param loop: If True, the responses of a URL are replayed again from the first once they have all been used.
+            Otherwise further requests for the URL raise requests.ConnectionError.
+        :type loop: bool
+        """
+        super().__init__()
+        self.cassette = CassetteReader(cassette) if isinstance(cassette, str) else cassette
+        self.speed = speed
+        self.loop = loop
+        self._positions = collections.Counter()
+        self._started = None
+        self._origin = min((record.recorded_at for record in self.cassette.records), default=0.0)
+        self._lock = threading.Lock()
+
+    def _next_record(self, url: str) -> CassetteRecord:
+        records = self.cassette.find(url)
+        if not records:
+            raise requests.exceptions.ConnectionError("No response recorded for %s" % strip_api_key(url))
+        with self._lock:
+            position = self._positions[records[0].url]
+            if position >= len(records):
+                if not self.loop:
+                    raise requests.exceptions.ConnectionError(
+                        "All the responses recorded for %s were replayed" % records[0].url
+                    )
+                position = 0
+            self._positions[records[0].url] = position + 1
+            if self._started is None:
+                self._started = time.monotonic()
+        return records[position]
+
+    def _wait(self, record: CassetteRecord, requested: float) -> None:
+        due = self._started + (record.recorded_at - self._origin) / self.speed
+        delay = max(due, requested + record.elapsed / self.speed) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def mount(self, session: requests.Session, prefix: str) -> None:
+        """
+        Answer the requests a session sends to URLs starting with prefix from the cassette.
+
+        :param session: Session to replay to
+        :type session: requests.Session
+
+        :param prefix: URL prefix, e.g. the base URL of the client
+        :type prefix: str
+        """
+        session.mount(prefix, self)
+
+    def send(self, request, **kwargs):
+        requested = time.monotonic()
+        record = self._next_record(request.url)
+        if self.speed:
+            self._wait(record, requested)
+        raw = HTTPResponse(
+            body=io.BytesIO(self.cassette.content(record)),
+            headers=record.headers,
+            status=record.status,
+            preload_content=False,
+            decode_content=False,
+        )
+        return self.build_response(request, raw)
+
+    def close(self) -> None:
+        super().close()
+        self.cassette.close()
@@ -0,0 +1,238 @@
+"""
+Description: This file contains circuit breakers that stop sending requests to an endpoint of 511.org after it has
+failed repeatedly. While a circuit is open the requests fail at once instead of waiting for the retry timeout, and
+after a recovery timeout a few trial requests are let through to find out whether the endpoint works again.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import collections
+import threading
+import time
+
+import siri_transit_api_client
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+BreakerStats = collections.namedtuple("BreakerStats", ["state", "failures", "rejected", "retry_in"])
+
+
+def is_failure(exception: Exception) -> bool:
+    """
+    Whether an exception raised by a request shows that the endpoint is failing. Errors caused by the request itself,
+    such as an invalid parameter or api key, do not.
+
+    :param exception: Exception raised while sending the request
+    :type exception: Exception
+
+    :rtype: bool
+    """
+    exceptions = siri_transit_api_client.exceptions
+    if isinstance(exception, exceptions.HTTPError):
+        return exception.status_code >= 500
+    if isinstance(exception, exceptions.ApiError):
+        return False
+    return isinstance(exception, (exceptions.TransportError, exceptions.Timeout, exceptions.RetriableRequest))
+
+
+def is_throttled(exception: Exception) -> bool:
+    """
+    Whether an exception raised by a request shows that it was rejected by the rate limit of the api key, which says
+    nothing about the health of the endpoint.
+
+    :param exception: Exception raised while sending the request
+    :type exception: Exception
+
+    :rtype: bool
+    """
+    return isinstance(exception, siri_transit_api_client.exceptions.OverQueryLimit)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30, half_open_max_calls: int = 1):
+        """
+        Thread safe circuit breaker of a single endpoint.
+
+        :param failure_threshold: Number of consecutive failed attempts that open the circuit.
+        :type failure_threshold: int
+
+        :param recovery_timeout: Seconds the circuit stays open before trial requests are let through.
+        :type recovery_timeout: float
+
+        :param half_open_max_calls: Number of trial requests in flight at once while the circuit is half open. The
+            circuit closes when one succeeds and opens again when one fails.
+        :type half_open_max_calls: int
+        """
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1.")
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def _update(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._trials = 0
+
+    @property
+    def state(self) -> str:
+        """
+        CLOSED, OPEN or HALF_OPEN
+        """
+        with self._lock:
+            self._update(time.monotonic())
+            return self._state
+
+    def allow(self) -> bool:
+        """
+        Whether a request may be sent. A request let through while the circuit is half open counts as a trial until
+        its outcome is recorded.
+
+        :rtype: bool
+        """
+        with self._lock:
+            self._update(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._trials < self.half_open_max_calls:
+                self._trials += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def cancel(self) -> None:
+        """
+        Give back a request let through by allow that was not sent after all, or whose outcome says nothing about the
+        endpoint, e.g. a request rejected by the rate limit. The state and the failure count are left as they are.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def record_success(self) -> None:
+        """
+        Record a request answered by the endpoint, which closes the circuit.
+        """
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trials = 0
+
+    def record_failure(self) -> None:
+        """
+        Record a failed request, opening the circuit after failure_threshold consecutive failures or after a failed
+        trial request.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trials = 0
+
+    def retry_in(self) -> float:
+        """
+        Seconds until an open circuit lets trial requests through, zero if it is not open.
+
+        :rtype: float
+        """
+        with self._lock:
+            return self._retry_in(time.monotonic())
+
+    def _retry_in(self, now: float) -> float:
+        self._update(now)
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.recovery_timeout - now)
+
+    def stats(self) -> BreakerStats:
+        """
+        State of the circuit, number of consecutive failures, number of requests rejected and seconds until trial
+        requests are let through.
+
+        :rtype: BreakerStats
+        """
+        with self._lock:
+            retry_in = self._retry_in(time.monotonic())
+            return BreakerStats(self._state, self._failures, self._rejected, retry_in)
+
+
+class CircuitBreakers:
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30,
+        half_open_max_calls: int = 1,
+        endpoint_settings: dict = None,
+    ):
+        """
+        One CircuitBreaker per endpoint path, created when the endpoint is first used.
+
+        :param failure_threshold: Number of consecutive failed attempts that open a circuit.
+        :type failure_threshold: int
+
+        :param recovery_timeout: Seconds a circuit stays open before trial requests are let through.
+        :type recovery_timeout: float
+
+        :param half_open_max_calls: Number of trial requests in flight at once while a circuit is half open.
+        :type half_open_max_calls: int
+
+        :param endpoint_settings: Keyword arguments of CircuitBreaker overriding the settings above for specific
+            endpoints, e.g. {"StopMonitoring": {"failure_threshold": 3}}.
+        :type endpoint_settings: dict, optional
+        """
+        self.settings = {
+            "failure_threshold": failure_threshold,
+            "recovery_timeout": recovery_timeout,
+            "half_open_max_calls": half_open_max_calls,
+        }
+        self.endpoint_settings = dict(endpoint_settings or {})
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """
+        Circuit breaker of an endpoint.
+
+        :param endpoint: URL path of the endpoint, as passed to SiriClient._request
+        :type endpoint: str
+
+        :rtype: CircuitBreaker
+        """
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(endpoint)
+                if breaker is None:
+                    breaker = CircuitBreaker(**dict(self.settings, **self.endpoint_settings.get(endpoint, {})))
+                    self._breakers[endpoint] = breaker
+        return breaker
+
+    def states(self) -> dict:
+        """
+        State of the circuit of every endpoint used so far, e.g. for a health check.
+
+        :return: Endpoint path mapped to CLOSED, OPEN or HALF_OPEN
+        :rtype: dict
+        """
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {endpoint: breaker.state for endpoint, breaker in breakers.items()}
+
+    def stats(self) -> dict:
+        """
+        Statistics of the circuit of every endpoint used so far.
+
+        :return: Endpoint path mapped to BreakerStats
+        :rtype: dict
+        """
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {endpoint: breaker.stats() for endpoint, breaker in breakers.items()}
@@ -0,0 +1,98 @@
+"""
+Description: This file converts VehicleMonitoring responses into columns, one array per field, so that the positions
+and delays of every vehicle in a snapshot can be processed with vectorized code. NumPy arrays are returned when NumPy
+is installed, array.array otherwise.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import array
+import collections
+import math
+import typing
+
+from siri_transit_api_client.models import _delivery_records, _float, _seconds_between, _text, _time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+VehiclePositions = collections.namedtuple(
+    "VehiclePositions",
+    ["vehicle_ref", "line_ref", "latitude", "longitude", "bearing", "recorded_at", "delay"],
+)
+
+
+def _number(value: typing.Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def vehicle_positions_from_records(records: typing.Iterable[dict], use_numpy: bool = None) -> VehiclePositions:
+    """
+    Convert VehicleActivity records, e.g. those yielded by SiriClient.iter_vehicle_monitoring, into columns.
+
+    :param records: VehicleActivity records
+    :type records: iterable of dict
+
+    :param use_numpy: Return NumPy arrays. Defaults to True when NumPy is installed.
+    :type use_numpy: bool, optional
+
+    :return: vehicle and line refs as arrays of str, and latitude, longitude, bearing in degrees, recorded at time as
+        a POSIX timestamp and delay at the next stop in seconds as arrays of float. Missing values are NaN for floats
+        and empty strings for refs.
+    :rtype: VehiclePositions
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    if use_numpy and numpy is None:
+        raise ImportError("NumPy is not installed.")
+
+    vehicle_refs = []
+    line_refs = []
+    latitudes = array.array("d")
+    longitudes = array.array("d")
+    bearings = array.array("d")
+    recorded_at = array.array("d")
+    delays = array.array("d")
+    for record in records:
+        journey = record.get("MonitoredVehicleJourney") or {}
+        location = journey.get("VehicleLocation") or {}
+        call = journey.get("MonitoredCall") or {}
+        vehicle_refs.append(_text(journey.get("VehicleRef")) or "")
+        line_refs.append(_text(journey.get("LineRef")) or "")
+        latitudes.append(_number(_float(location.get("Latitude"))))
+        longitudes.append(_number(_float(location.get("Longitude"))))
+        bearings.append(_number(_float(journey.get("Bearing"))))
+        recorded_at.append(_number(_time(record.get("RecordedAtTime"))))
+        delays.append(_number(_seconds_between(_time(call.get("AimedArrivalTime")),
+                                               _time(call.get("ExpectedArrivalTime")))))
+
+    if not use_numpy:
+        return VehiclePositions(vehicle_refs, line_refs, latitudes, longitudes, bearings, recorded_at, delays)
+    # numpy.frombuffer shares the memory of the array.array instead of copying it
+    return VehiclePositions(
+        numpy.array(vehicle_refs, dtype=str),
+        numpy.array(line_refs, dtype=str),
+        numpy.frombuffer(latitudes, dtype=numpy.float64),
+        numpy.frombuffer(longitudes, dtype=numpy.float64),
+        numpy.frombuffer(bearings, dtype=numpy.float64),
+        numpy.frombuffer(recorded_at, dtype=numpy.float64),
+        numpy.frombuffer(delays, dtype=numpy.float64),
+    )
+
+
+def vehicle_positions(body: dict, use_numpy: bool = None) -> VehiclePositions:
+    """
+    Convert a VehicleMonitoring response into columns. See vehicle_positions_from_records.
+
+    :param body: Body returned by SiriClient.vehicle_monitoring
+    :type body: dict
+
+    :param use_numpy: Return NumPy arrays. Defaults to True when NumPy is installed.
+    :type use_numpy: bool, optional
+
+    :rtype: VehiclePositions
+    """
+    return vehicle_positions_from_records(
+        _delivery_records(body, "VehicleMonitoringDelivery", "VehicleActivity"), use_numpy
+    )
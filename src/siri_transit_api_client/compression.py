@@ -0,0 +1,220 @@
+"""
+Description: This file contains the content encodings SiriClient asks 511.org to compress its responses with, and the
+streaming decoder that decompresses a response as it is read from the connection, so that the compressed content is
+never held in memory as a whole. The decoder counts the bytes received on the wire, the bytes they decompress to and
+the time spent decompressing them.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import time
+import typing
+import zlib
+
+import requests
+import urllib3
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised only when the optional dependency is missing
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+ENCODINGS = ("gzip", "deflate") + (("br",) if brotli is not None else ())
+ACCEPT_ENCODING = ", ".join(ENCODINGS)
+
+# bytes read from the connection at a time when the whole content is read
+CONTENT_CHUNK_SIZE = 64 * 1024
+
+
+class _GzipDecoder:
+    def __init__(self):
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data: bytes) -> bytes:
+        output = [self._decompressor.decompress(data)]
+        # a gzip stream may hold several members
+        while self._decompressor.eof and self._decompressor.unused_data:
+            data = self._decompressor.unused_data
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            output.append(self._decompressor.decompress(data))
+        return b"".join(output)
+
+    def flush(self) -> bytes:
+        return self._decompressor.flush()
+
+
+class _DeflateDecoder:
+    def __init__(self):
+        self._decompressor = zlib.decompressobj()
+        # kept until the first output, to start again if the server sent raw deflate without the zlib header
+        self._received = b""
+
+    def decompress(self, data: bytes) -> bytes:
+        if self._received is None:
+            return self._decompressor.decompress(data)
+        self._received += data
+        try:
+            output = self._decompressor.decompress(data)
+        except zlib.error:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            data, self._received = self._received, None
+            return self._decompressor.decompress(data)
+        if output:
+            self._received = None
+        return output
+
+    def flush(self) -> bytes:
+        return self._decompressor.flush()
+
+
+class _BrotliDecoder:
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+        # brotli names the method process, brotlicffi names it decompress
+        self.decompress = getattr(self._decompressor, "process", None) or self._decompressor.decompress
+
+    def flush(self) -> bytes:
+        return b""
+
+
+_DECODERS = {"gzip": _GzipDecoder, "x-gzip": _GzipDecoder, "deflate": _DeflateDecoder}
+if brotli is not None:
+    _DECODERS["br"] = _BrotliDecoder
+
+
+class ContentDecoder:
+    def __init__(self, content_encoding: str = None):
+        """
+        Streaming decoder of a response content. A content with an encoding this module does not support is
+        decoded by urllib3 instead, see delegated, and only counted.
+
+        :param content_encoding: Content-Encoding header of the response, e.g. "gzip"
+        :type content_encoding: str, optional
+        """
+        encodings = [encoding.strip().lower() for encoding in (content_encoding or "").split(",")]
+        encodings = [encoding for encoding in encodings if encoding not in ("", "identity")]
+        # urllib3 decodes the encodings missing here, e.g. zstd when zstandard is installed and the session advertises
+        # it, or leaves them as they are
+        self.delegated = any(encoding not in _DECODERS for encoding in encodings)
+        # the encodings are listed in the order they were applied
+        self._decoders = [] if self.delegated else [_DECODERS[encoding]() for encoding in reversed(encodings)]
+        self.wire_bytes = 0
+        self.content_bytes = 0
+        self.duration = 0.0
+
+    @property
+    def compressed(self) -> bool:
+        return bool(self._decoders)
+
+    def decompress(self, data: bytes) -> bytes:
+        """
+        Decompress the next chunk received.
+
+        :rtype: bytes
+        """
+        self.wire_bytes += len(data)
+        if self._decoders:
+            start = time.perf_counter()
+            for decoder in self._decoders:
+                data = decoder.decompress(data)
+            self.duration += time.perf_counter() - start
+        self.content_bytes += len(data)
+        return data
+
+    def flush(self) -> bytes:
+        """
+        Decompress the data left once the whole content has been received.
+
+        :rtype: bytes
+        """
+        if not self._decoders:
+            return b""
+        start = time.perf_counter()
+        data = b""
+        for decoder in self._decoders:
+            data = decoder.decompress(data) + decoder.flush() if data else decoder.flush()
+        self.duration += time.perf_counter() - start
+        self.content_bytes += len(data)
+        return data
+
+
+# requests keeps the content of a response in private attributes, _content and _content_consumed, which it reads
+# back for response.content and response.close. They are only touched here; checked against requests 2.27 to 2.34.
+def _consumed_content(response: requests.Response) -> typing.Optional[bytes]:
+    return response.content if response._content_consumed else None
+
+
+def _keep_content(response: requests.Response, content: bytes) -> None:
+    response._content = content
+    response._content_consumed = True
+
+
+def iter_decoded(response: requests.Response, chunk_size: int, decoder: ContentDecoder) -> typing.Iterator[bytes]:
+    """
+    Yields the content of a response decompressed, chunk by chunk as it is read from the connection.
+
+    :param response: Response whose content has not been read yet, see the stream argument of requests.
+    :type response: requests.Response
+
+    :param chunk_size: Number of bytes read from the connection at a time.
+    :type chunk_size: int
+
+    :param decoder: Decoder of the Content-Encoding of the response
+    :type decoder: ContentDecoder
+
+    :raises requests.ConnectionError: if the connection fails while the content is read.
+    :raises requests.ContentDecodingError: if the content cannot be decompressed.
+    """
+    content = _consumed_content(response)
+    if content is not None:
+        # read by a transport adapter, e.g. while recording a cassette, and decompressed already
+        decoder.wire_bytes += len(content)
+        decoder.content_bytes += len(content)
+        yield content
+        return
+    raw = response.raw
+    chunks = raw.stream(chunk_size, decode_content=decoder.delegated) if hasattr(raw, "stream") else iter(
+        lambda: raw.read(chunk_size), b""
+    )
+    # the exceptions are mapped as requests.models.Response.iter_content maps them
+    try:
+        for chunk in chunks:
+            data = decoder.decompress(chunk)
+            if data:
+                yield data
+        data = decoder.flush()
+        if data:
+            yield data
+    except zlib.error as e:
+        raise requests.exceptions.ContentDecodingError(e)
+    except urllib3.exceptions.ProtocolError as e:
+        raise requests.exceptions.ChunkedEncodingError(e)
+    except urllib3.exceptions.DecodeError as e:
+        raise requests.exceptions.ContentDecodingError(e)
+    except urllib3.exceptions.ReadTimeoutError as e:
+        raise requests.exceptions.ConnectionError(e)
+    except urllib3.exceptions.SSLError as e:
+        raise requests.exceptions.SSLError(e)
+    finally:
+        if decoder.delegated and hasattr(raw, "tell"):
+            # the chunks were decoded by urllib3, tell counts the bytes received
+            decoder.wire_bytes = raw.tell()
+
+
+def read_content(response: requests.Response, decoder: ContentDecoder) -> bytes:
+    """
+    Reads the whole content of a response, decompressing it as it is received, and keeps it as response.content.
+
+    :param response: Response whose content has not been read yet, see the stream argument of requests.
+    :type response: requests.Response
+
+    :param decoder: Decoder of the Content-Encoding of the response
+    :type decoder: ContentDecoder
+
+    :rtype: bytes
+    """
+    content = b"".join(iter_decoded(response, CONTENT_CHUNK_SIZE, decoder))
+    _keep_content(response, content)
+    return content
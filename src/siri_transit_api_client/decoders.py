@@ -0,0 +1,112 @@
+"""
+Description: This file contains the JSON decoders that can be used to parse the responses from 511.org. The responses
+may start with a UTF-8 byte order mark, which is removed by slicing a memoryview of the content, so that decoders able
+to parse bytes directly (orjson, msgspec) never copy the content into a str.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import codecs
+import json
+import typing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def strip_bom(content: bytes) -> typing.Union[bytes, memoryview]:
+    """
+    Remove the UTF-8 byte order mark from the start of content without copying it.
+
+    :param content: Raw response content
+    :type content: bytes
+
+    :return: content, or a memoryview of content after the byte order mark
+    :rtype: bytes or memoryview
+    """
+    if content.startswith(codecs.BOM_UTF8):
+        return memoryview(content)[len(codecs.BOM_UTF8):]
+    return content
+
+
+def loads_json(data: typing.Union[bytes, memoryview]):
+    """
+    Parse data with the json module of the standard library, which needs the content decoded into a str first.
+    """
+    return json.loads(str(data, "utf-8"))
+
+
+def loads_orjson(data: typing.Union[bytes, memoryview]):
+    """
+    Parse data with orjson, which reads the bytes directly.
+    """
+    return orjson.loads(data)
+
+
+def loads_msgspec(data: typing.Union[bytes, memoryview]):
+    """
+    Parse data with msgspec, which reads the bytes directly.
+    """
+    return msgspec.json.decode(data)
+
+
+_DECODERS = {
+    "json": (loads_json, lambda: True),
+    "orjson": (loads_orjson, lambda: orjson is not None),
+    "msgspec": (loads_msgspec, lambda: msgspec is not None),
+}
+
+
+def available_decoders() -> typing.List[str]:
+    """
+    Names of the decoders whose packages are installed.
+
+    :rtype: list of str
+    """
+    return [name for name, (_, available) in _DECODERS.items() if available()]
+
+
+def get_decoder(decoder: typing.Union[str, typing.Callable] = "json") -> typing.Callable:
+    """
+    Look up a decoder by name. "auto" selects the fastest decoder that is installed. A callable is returned as it is;
+    it is passed the content as bytes or memoryview and must return the parsed body.
+
+    :param decoder: "json", "orjson", "msgspec", "auto" or a callable
+    :type decoder: str or function
+
+    :rtype: function
+
+    :raises ValueError: if the decoder is unknown.
+    :raises ImportError: if the package of the decoder is not installed.
+    """
+    if callable(decoder):
+        return decoder
+    if decoder == "auto":
+        decoder = next(name for name in ("orjson", "msgspec", "json") if _DECODERS[name][1]())
+    if decoder not in _DECODERS:
+        raise ValueError("Unknown JSON decoder: %s" % decoder)
+    loads, available = _DECODERS[decoder]
+    if not available():
+        raise ImportError("The %s JSON decoder is not installed." % decoder)
+    return loads
+
+
+def loads_content(content: bytes, loads: typing.Callable = loads_json):
+    """
+    Parse raw response content that may start with a byte order mark.
+
+    :param content: Raw response content
+    :type content: bytes
+
+    :param loads: Decoder used to parse the content
+    :type loads: function
+
+    :return: Parsed body
+    """
+    return loads(strip_bom(content))
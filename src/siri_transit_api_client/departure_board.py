@@ -0,0 +1,148 @@
+"""
+Description: This file contains a departure board that serves the visits of any number of stops from a single agency
+wide StopMonitoring query per refresh, instead of one query per stop.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import logging
+import math
+import threading
+import time
+import typing
+
+from siri_transit_api_client.models import StopVisit
+
+logger = logging.getLogger(__name__)
+
+
+def _departure_order(visit: StopVisit) -> float:
+    for value in (visit.expected_departure_time, visit.expected_arrival_time,
+                  visit.aimed_departure_time, visit.aimed_arrival_time):
+        if value is not None:
+            return value
+    return math.inf
+
+
+class DepartureBoard:
+    def __init__(self, client, agency: str, max_age: float = 60, retry_interval: float = 10,
+                 on_error: typing.Callable[[Exception], None] = None):
+        """
+        Index the StopMonitoring feed of an agency by MonitoringRef. The feed is downloaded again the first time a
+        stop is looked up after it has become older than max_age, so looking up many stops costs one request per
+        refresh. Only the lookup that starts a refresh waits for it; concurrent lookups are served from the previous
+        index in the meantime.
+
+        :param client: Client used to query StopMonitoring
+        :type client: SiriClient
+
+        :param agency: agency ID to be monitored
+        :type agency: str
+
+        :param max_age: Seconds after which the index is refreshed on the next lookup. None disables automatic
+            refreshes, refresh must then be called explicitly.
+        :type max_age: float, optional
+
+        :param retry_interval: Seconds to wait after a failed refresh before lookups try again, so that an outage of
+            the feed does not turn every lookup into a request.
+        :type retry_interval: float, optional
+
+        :param on_error: Called with the exception when a refresh started by a lookup fails while a previous index
+            can still be served. Defaults to logging the exception. Lookups made before any index was built raise it.
+        :type on_error: function, optional
+        """
+        self.client = client
+        self.agency = agency
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self.on_error = on_error
+        self.updated_at = None
+        self._index = {}
+        self._refreshed = None
+        self._failed = None
+        self._error = None
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """
+        Download the agency wide StopMonitoring feed and rebuild the index. Lookups made while the feed downloads
+        keep being served from the previous index.
+        """
+        index = {}
+        try:
+            for record in self.client.iter_stop_monitoring(self.agency):
+                visit = StopVisit.from_dict(record)
+                index.setdefault(visit.monitoring_ref, []).append(visit)
+        except Exception as e:
+            self._failed = time.monotonic()
+            self._error = e
+            raise
+        for stop_code, visits in index.items():
+            visits.sort(key=_departure_order)
+            index[stop_code] = tuple(visits)
+        # replacing the dict in one assignment lets readers skip locking
+        self._index = index
+        self._refreshed = time.monotonic()
+        self._failed = None
+        self._error = None
+        self.updated_at = time.time()
+
+    def _stale(self) -> bool:
+        now = time.monotonic()
+        if self._failed is not None and now - self._failed < self.retry_interval:
+            return False
+        if self._refreshed is None:
+            return True
+        return self.max_age is not None and now - self._refreshed >= self.max_age
+
+    def _ensure_fresh(self) -> None:
+        if self._stale():
+            if self._refreshed is None:
+                # nothing to serve yet, wait for the first index
+                self._refresh_lock.acquire()
+            elif not self._refresh_lock.acquire(blocking=False):
+                # another lookup is refreshing the index, serve the previous one meanwhile
+                return
+            try:
+                # another thread may have refreshed the index while this one waited for the lock
+                if self._stale():
+                    self.refresh()
+            except Exception as e:
+                if self._refreshed is None:
+                    raise
+                if self.on_error is not None:
+                    self.on_error(e)
+                else:
+                    logger.exception("Refreshing the departure board of %s failed", self.agency)
+            finally:
+                self._refresh_lock.release()
+        if self._refreshed is None and self._error is not None:
+            # the first refresh failed recently, raise its error rather than sending the request again
+            raise self._error
+
+    def visits(self, stop_code: str) -> typing.Tuple[StopVisit, ...]:
+        """
+        Visits of a stop, ordered by departure time, refreshing the index first if it is stale.
+
+        :param stop_code: stop ID, the MonitoringRef of the visits
+        :type stop_code: str
+
+        :rtype: tuple of StopVisit
+        """
+        self._ensure_fresh()
+        return self._index.get(stop_code, ())
+
+    def stop_codes(self) -> typing.List[str]:
+        """
+        Stops that have at least one visit in the index, refreshing the index first if it is stale.
+
+        :rtype: list of str
+        """
+        self._ensure_fresh()
+        return list(self._index)
+
+    def __getitem__(self, stop_code: str) -> typing.Tuple[StopVisit, ...]:
+        return self.visits(stop_code)
+
+    def __contains__(self, stop_code: str) -> bool:
+        self._ensure_fresh()
+        return stop_code in self._index
@@ -58,3 +58,14 @@ class OverQueryLimit(ApiError, RetriableRequest):
     """
 
     pass
+
+
+class CircuitOpen(TransportError):
+    """The request was not sent because the circuit breaker of its endpoint is open."""
+
+    def __init__(self, endpoint, retry_in=0.0):
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+    def __str__(self):
+        return "Circuit open for %s, retry in %.1f seconds" % (self.endpoint, self.retry_in)
@@ -0,0 +1,182 @@
+"""
+Description: This file contains the hooks SiriClient calls while it handles a request, and the event passed to them.
+The event carries the endpoint, the parameters and URL without the api key and a breakdown of where the time of the
+last attempt went: waiting for the rate limiter and quota, acquiring a connection, waiting for the first byte,
+downloading the body, decompressing it, removing the byte order mark and parsing the JSON.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import dataclasses
+import threading
+import time
+import typing
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_active = threading.local()
+
+
+@dataclasses.dataclass(slots=True)
+class RequestTimings:
+    """
+    Seconds spent in each phase of an attempt. Phases that were not measured are None: connect needs a session using
+    TimedHTTPAdapter, transfer and decompress are not measured for streamed responses and bom and parse are not
+    measured when a custom function extracts the body.
+    """
+
+    queue: float = 0.0
+    connect: typing.Optional[float] = None
+    ttfb: typing.Optional[float] = None
+    transfer: typing.Optional[float] = None
+    decompress: typing.Optional[float] = None
+    bom: typing.Optional[float] = None
+    parse: typing.Optional[float] = None
+
+    @property
+    def total(self) -> float:
+        return sum(value for value in dataclasses.astuple(self) if value is not None)
+
+
+@dataclasses.dataclass(slots=True)
+class RequestEvent:
+    """
+    A request handled by SiriClient. The same event is passed to every hook called for the request, so context can be
+    used to carry data between them, e.g. a tracing span opened in on_request and closed in on_response or on_error.
+    """
+
+    endpoint: str
+    params: dict
+    url: str
+    attempt: int = 0
+    status: typing.Optional[int] = None
+    error: typing.Optional[Exception] = None
+    delay: typing.Optional[float] = None
+    timings: RequestTimings = dataclasses.field(default_factory=RequestTimings)
+    context: dict = dataclasses.field(default_factory=dict)
+
+    def start_attempt(self, attempt: int) -> None:
+        self.attempt = attempt
+        self.status = None
+        self.error = None
+        self.delay = None
+        self.timings = RequestTimings()
+
+
+class RequestHooks:
+    def __init__(
+        self,
+        on_request: typing.Callable[[RequestEvent], None] = None,
+        on_response: typing.Callable[[RequestEvent], None] = None,
+        on_retry: typing.Callable[[RequestEvent], None] = None,
+        on_error: typing.Callable[[RequestEvent], None] = None,
+    ):
+        """
+        Functions called with a RequestEvent as SiriClient handles a request. Exceptions raised by a hook propagate
+        to the caller of the client.
+
+        :param on_request: Called before each attempt is sent.
+        :type on_request: function, optional
+
+        :param on_response: Called once the response of an attempt has been received and parsed, with its status and
+            timings, and with the error it caused if any.
+        :type on_response: function, optional
+
+        :param on_retry: Called before sleeping for event.delay seconds ahead of the next attempt.
+        :type on_retry: function, optional
+
+        :param on_error: Called when the request fails, with the exception raised to the caller in event.error.
+        :type on_error: function, optional
+        """
+        self.on_request = on_request
+        self.on_response = on_response
+        self.on_retry = on_retry
+        self.on_error = on_error
+
+    def request(self, event: RequestEvent) -> None:
+        if self.on_request is not None:
+            self.on_request(event)
+
+    def response(self, event: RequestEvent) -> None:
+        if self.on_response is not None:
+            self.on_response(event)
+
+    def retry(self, event: RequestEvent) -> None:
+        if self.on_retry is not None:
+            self.on_retry(event)
+
+    def error(self, event: RequestEvent) -> None:
+        if self.on_error is not None:
+            self.on_error(event)
+
+
+class measure_connect:
+    """
+    Context manager adding the time the current thread spends acquiring connections from a TimedHTTPAdapter to
+    timings.connect.
+    """
+
+    def __init__(self, timings: RequestTimings):
+        self.timings = timings
+
+    def __enter__(self) -> RequestTimings:
+        _active.timings = self.timings
+        return self.timings
+
+    def __exit__(self, *exc_info) -> None:
+        _active.timings = None
+
+
+def _add_connect(seconds: float) -> None:
+    timings = getattr(_active, "timings", None)
+    if timings is not None:
+        timings.connect = (timings.connect or 0.0) + seconds
+
+
+class _TimedConnectMixin:
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _add_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+
+class _TimedPoolMixin:
+    def _get_conn(self, timeout=None):
+        start = time.perf_counter()
+        try:
+            return super()._get_conn(timeout)
+        finally:
+            _add_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPConnectionPool(_TimedPoolMixin, HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(_TimedPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter measuring the time spent waiting for a pooled connection and opening new connections, reported as
+    RequestTimings.connect. The PooledHTTPAdapter SiriClient mounts on the session it creates is one.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
@@ -0,0 +1,168 @@
+"""
+Description: This file contains the metrics recorded by SiriClient and the sinks they are sent to. A sink receives
+every observation as a metric name, a value and labels; PrometheusSink aggregates them into counters and histograms
+rendered in the Prometheus text format, CallbackSink hands them to a function. Without a sink the client records
+nothing.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import bisect
+import threading
+import typing
+
+COUNTER = "counter"
+HISTOGRAM = "histogram"
+
+REQUEST_DURATION = "siri_request_duration_seconds"
+RESPONSE_BYTES = "siri_response_bytes_total"
+WIRE_BYTES = "siri_response_wire_bytes_total"
+DECOMPRESS_DURATION = "siri_decompress_duration_seconds"
+DECODE_DURATION = "siri_decode_duration_seconds"
+RETRIES = "siri_retries_total"
+RATE_LIMIT_WAIT = "siri_rate_limit_wait_seconds_total"
+QUOTA_WAIT = "siri_quota_wait_seconds_total"
+BACKOFF = "siri_backoff_seconds_total"
+
+METRICS = {
+    REQUEST_DURATION: (HISTOGRAM, "Time from sending a request to receiving its response, by endpoint and status."),
+    RESPONSE_BYTES: (COUNTER, "Bytes of response content received once decompressed, by endpoint."),
+    WIRE_BYTES: (COUNTER, "Bytes of response content received on the wire, before decompression, by endpoint."),
+    DECOMPRESS_DURATION: (HISTOGRAM, "Time spent decompressing compressed response content, by endpoint."),
+    DECODE_DURATION: (HISTOGRAM, "Time spent checking and parsing response bodies, by endpoint."),
+    RETRIES: (COUNTER, "Requests retried, by endpoint and the status that caused the retry."),
+    RATE_LIMIT_WAIT: (COUNTER, "Time spent waiting for the rate limiter, by endpoint."),
+    QUOTA_WAIT: (COUNTER, "Time spent waiting for the hourly quota scheduler, by endpoint."),
+    BACKOFF: (COUNTER, "Time spent sleeping between retries, by endpoint."),
+}
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+
+def _format_labels(labels: typing.Tuple[typing.Tuple[str, str], ...], extra: str = None) -> str:
+    parts = ['%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"')) for name, value in labels]
+    if extra is not None:
+        parts.append(extra)
+    return "{%s}" % ",".join(parts) if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class PrometheusSink:
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Thread safe sink aggregating the observations into counters and histograms.
+
+        :param buckets: Upper bounds in seconds of the histogram buckets.
+        :type buckets: sequence of float
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, labels: dict) -> None:
+        """
+        Add an observation.
+
+        :param name: Name of the metric, a key of METRICS
+        :type name: str
+
+        :param value: Observed value
+        :type value: float
+
+        :param labels: Labels of the observation, e.g. {"endpoint": "StopMonitoring"}
+        :type labels: dict
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if METRICS[name][0] == HISTOGRAM:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = _Histogram(len(self.buckets))
+                index = bisect.bisect_left(self.buckets, value)
+                if index < len(self.buckets):
+                    histogram.counts[index] += 1
+                histogram.count += 1
+                histogram.sum += value
+            else:
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def get(self, name: str, **labels) -> float:
+        """
+        Value of a counter, or number of observations of a histogram.
+
+        :param name: Name of the metric
+        :type name: str
+
+        :param labels: Labels of the series
+        :type labels: str
+
+        :rtype: float
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key in self._histograms:
+                return self._histograms[key].count
+            return self._counters.get(key, 0)
+
+    def render(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        :rtype: str
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(h.counts), h.count, h.sum) for key, h in self._histograms.items()}
+
+        lines = []
+        for name, (metric_type, description) in METRICS.items():
+            if metric_type == HISTOGRAM:
+                series = sorted((labels, value) for (metric, labels), value in histograms.items() if metric == name)
+            else:
+                series = sorted((labels, value) for (metric, labels), value in counters.items() if metric == name)
+            if not series:
+                continue
+            lines.append("# HELP %s %s" % (name, description))
+            lines.append("# TYPE %s %s" % (name, metric_type))
+            for labels, value in series:
+                if metric_type == COUNTER:
+                    lines.append("%s%s %s" % (name, _format_labels(labels), _format_value(value)))
+                    continue
+                counts, count, total = value
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append("%s_bucket%s %d" % (name, _format_labels(labels, 'le="%s"' % bound), cumulative))
+                lines.append("%s_bucket%s %d" % (name, _format_labels(labels, 'le="+Inf"'), count))
+                lines.append("%s_sum%s %s" % (name, _format_labels(labels), _format_value(total)))
+                lines.append("%s_count%s %d" % (name, _format_labels(labels), count))
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class CallbackSink:
+    def __init__(self, callback: typing.Callable[[str, float, dict], None]):
+        """
+        Sink handing every observation to a function, e.g. to forward it to statsd or OpenTelemetry.
+
+        :param callback: Function called with the metric name, the value and the labels
+        :type callback: function
+        """
+        self.callback = callback
+
+    def observe(self, name: str, value: float, labels: dict) -> None:
+        """
+        Forward an observation to the callback.
+        """
+        self.callback(name, value, labels)
@@ -0,0 +1,337 @@
+"""
+Description: This file contains compact typed records that can be built from the responses of 511.org. The records
+use __slots__, keep times as POSIX timestamps and intern the strings that repeat across records (operator, line, stop
+and direction refs), so that long lived caches of departures and vehicle positions take a fraction of the memory of
+the nested dicts.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import dataclasses
+import datetime as dt
+import sys
+import typing
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _text(value) -> typing.Optional[str]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, list):
+        # some names are returned as a list of translations
+        return _text(value[0]) if value else None
+    return str(value)
+
+
+def _ref(value) -> typing.Optional[str]:
+    value = _text(value)
+    return None if value is None else sys.intern(value)
+
+
+def _float(value) -> typing.Optional[float]:
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def _time(value) -> typing.Optional[float]:
+    # times are kept as POSIX timestamps, which take half the memory of a datetime
+    if not value:
+        return None
+    return dt.datetime.fromisoformat(value).timestamp()
+
+
+def _seconds_between(start: typing.Optional[float], end: typing.Optional[float]) -> typing.Optional[float]:
+    if start is None or end is None:
+        return None
+    return end - start
+
+
+def service_delivery(body: dict) -> dict:
+    """
+    Return the ServiceDelivery of a SIRI response, which VehicleMonitoring wraps in a Siri element.
+
+    :param body: Body returned by SiriClient.stop_monitoring or SiriClient.vehicle_monitoring
+    :type body: dict
+
+    :rtype: dict
+    """
+    if "Siri" in body:
+        body = body["Siri"]
+    return body.get("ServiceDelivery") or {}
+
+
+def _delivery_records(body: dict, delivery: str, records: str) -> list:
+    found = []
+    for item in _as_list(service_delivery(body).get(delivery)):
+        found.extend(_as_list(item.get(records)))
+    return found
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class StopVisit:
+    """A vehicle arriving at or departing from a monitored stop (MonitoredStopVisit)."""
+
+    monitoring_ref: typing.Optional[str]
+    recorded_at_time: typing.Optional[float]
+    operator_ref: typing.Optional[str]
+    line_ref: typing.Optional[str]
+    direction_ref: typing.Optional[str]
+    published_line_name: typing.Optional[str]
+    destination_name: typing.Optional[str]
+    vehicle_ref: typing.Optional[str]
+    dated_vehicle_journey_ref: typing.Optional[str]
+    stop_point_ref: typing.Optional[str]
+    aimed_arrival_time: typing.Optional[float]
+    expected_arrival_time: typing.Optional[float]
+    aimed_departure_time: typing.Optional[float]
+    expected_departure_time: typing.Optional[float]
+    latitude: typing.Optional[float]
+    longitude: typing.Optional[float]
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "StopVisit":
+        """
+        Build the record from a MonitoredStopVisit of a StopMonitoring response.
+
+        :param record: MonitoredStopVisit
+        :type record: dict
+
+        :rtype: StopVisit
+        """
+        journey = record.get("MonitoredVehicleJourney") or {}
+        call = journey.get("MonitoredCall") or {}
+        location = journey.get("VehicleLocation") or {}
+        framed_journey = journey.get("FramedVehicleJourneyRef") or {}
+        return cls(
+            monitoring_ref=_ref(record.get("MonitoringRef")),
+            recorded_at_time=_time(record.get("RecordedAtTime")),
+            operator_ref=_ref(journey.get("OperatorRef")),
+            line_ref=_ref(journey.get("LineRef")),
+            direction_ref=_ref(journey.get("DirectionRef")),
+            published_line_name=_ref(journey.get("PublishedLineName")),
+            destination_name=_ref(journey.get("DestinationName")),
+            vehicle_ref=_ref(journey.get("VehicleRef")),
+            dated_vehicle_journey_ref=_text(framed_journey.get("DatedVehicleJourneyRef")),
+            stop_point_ref=_ref(call.get("StopPointRef")),
+            aimed_arrival_time=_time(call.get("AimedArrivalTime")),
+            expected_arrival_time=_time(call.get("ExpectedArrivalTime")),
+            aimed_departure_time=_time(call.get("AimedDepartureTime")),
+            expected_departure_time=_time(call.get("ExpectedDepartureTime")),
+            latitude=_float(location.get("Latitude")),
+            longitude=_float(location.get("Longitude")),
+        )
+
+    @property
+    def arrival_delay(self) -> typing.Optional[float]:
+        """Seconds between the aimed and the expected arrival, or None if either is unknown."""
+        return _seconds_between(self.aimed_arrival_time, self.expected_arrival_time)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class VehicleActivity:
+    """The position and progress of a monitored vehicle (VehicleActivity)."""
+
+    vehicle_ref: typing.Optional[str]
+    recorded_at_time: typing.Optional[float]
+    operator_ref: typing.Optional[str]
+    line_ref: typing.Optional[str]
+    direction_ref: typing.Optional[str]
+    published_line_name: typing.Optional[str]
+    dated_vehicle_journey_ref: typing.Optional[str]
+    latitude: typing.Optional[float]
+    longitude: typing.Optional[float]
+    bearing: typing.Optional[float]
+    occupancy: typing.Optional[str]
+    stop_point_ref: typing.Optional[str]
+    aimed_arrival_time: typing.Optional[float]
+    expected_arrival_time: typing.Optional[float]
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "VehicleActivity":
+        """
+        Build the record from a VehicleActivity of a VehicleMonitoring response.
+
+        :param record: VehicleActivity
+        :type record: dict
+
+        :rtype: VehicleActivity
+        """
+        journey = record.get("MonitoredVehicleJourney") or {}
+        call = journey.get("MonitoredCall") or {}
+        location = journey.get("VehicleLocation") or {}
+        framed_journey = journey.get("FramedVehicleJourneyRef") or {}
+        return cls(
+            vehicle_ref=_ref(journey.get("VehicleRef")),
+            recorded_at_time=_time(record.get("RecordedAtTime")),
+            operator_ref=_ref(journey.get("OperatorRef")),
+            line_ref=_ref(journey.get("LineRef")),
+            direction_ref=_ref(journey.get("DirectionRef")),
+            published_line_name=_ref(journey.get("PublishedLineName")),
+            dated_vehicle_journey_ref=_text(framed_journey.get("DatedVehicleJourneyRef")),
+            latitude=_float(location.get("Latitude")),
+            longitude=_float(location.get("Longitude")),
+            bearing=_float(journey.get("Bearing")),
+            occupancy=_ref(journey.get("Occupancy")),
+            stop_point_ref=_ref(call.get("StopPointRef")),
+            aimed_arrival_time=_time(call.get("AimedArrivalTime")),
+            expected_arrival_time=_time(call.get("ExpectedArrivalTime")),
+        )
+
+    @property
+    def delay(self) -> typing.Optional[float]:
+        """Seconds between the aimed and the expected arrival at the next stop, or None if either is unknown."""
+        return _seconds_between(self.aimed_arrival_time, self.expected_arrival_time)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Line:
+    """A route of a transit operator."""
+
+    id: typing.Optional[str]
+    name: typing.Optional[str]
+    transport_mode: typing.Optional[str]
+    public_code: typing.Optional[str]
+    siri_line_ref: typing.Optional[str]
+    monitored: bool
+    operator_ref: typing.Optional[str]
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "Line":
+        """
+        Build the record from an item of a lines response.
+
+        :param record: Line
+        :type record: dict
+
+        :rtype: Line
+        """
+        return cls(
+            id=_ref(record.get("Id")),
+            name=_text(record.get("Name")),
+            transport_mode=_ref(record.get("TransportMode")),
+            public_code=_ref(record.get("PublicCode")),
+            siri_line_ref=_ref(record.get("SiriLineRef")),
+            monitored=record.get("Monitored") in (True, "true"),
+            operator_ref=_ref(record.get("OperatorRef")),
+        )
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Stop:
+    """A location where passengers can board or leave vehicles (ScheduledStopPoint)."""
+
+    id: typing.Optional[str]
+    name: typing.Optional[str]
+    latitude: typing.Optional[float]
+    longitude: typing.Optional[float]
+    stop_type: typing.Optional[str]
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "Stop":
+        """
+        Build the record from a ScheduledStopPoint of a stops response.
+
+        :param record: ScheduledStopPoint
+        :type record: dict
+
+        :rtype: Stop
+        """
+        location = record.get("Location") or {}
+        return cls(
+            id=_ref(record.get("id")),
+            name=_text(record.get("Name")),
+            latitude=_float(location.get("Latitude")),
+            longitude=_float(location.get("Longitude")),
+            stop_type=_ref(record.get("StopType")),
+        )
+
+    @classmethod
+    def from_stop_place(cls, record: dict) -> "Stop":
+        """
+        Build the record from a StopPlace of a stop_places response, located at its centroid.
+
+        :param record: StopPlace
+        :type record: dict
+
+        :rtype: Stop
+        """
+        location = (record.get("Centroid") or {}).get("Location") or {}
+        return cls(
+            id=_ref(record.get("@id") or record.get("id")),
+            name=_text(record.get("Name")),
+            latitude=_float(location.get("Latitude")),
+            longitude=_float(location.get("Longitude")),
+            stop_type=_ref(record.get("StopPlaceType")),
+        )
+
+
+def stop_visits(body: dict) -> typing.List[StopVisit]:
+    """
+    Build the StopVisit records of a StopMonitoring response.
+
+    :param body: Body returned by SiriClient.stop_monitoring
+    :type body: dict
+
+    :rtype: list of StopVisit
+    """
+    return [StopVisit.from_dict(record)
+            for record in _delivery_records(body, "StopMonitoringDelivery", "MonitoredStopVisit")]
+
+
+def vehicle_activities(body: dict) -> typing.List[VehicleActivity]:
+    """
+    Build the VehicleActivity records of a VehicleMonitoring response.
+
+    :param body: Body returned by SiriClient.vehicle_monitoring
+    :type body: dict
+
+    :rtype: list of VehicleActivity
+    """
+    return [VehicleActivity.from_dict(record)
+            for record in _delivery_records(body, "VehicleMonitoringDelivery", "VehicleActivity")]
+
+
+def lines(body: list) -> typing.List[Line]:
+    """
+    Build the Line records of a lines response.
+
+    :param body: Body returned by SiriClient.lines
+    :type body: list
+
+    :rtype: list of Line
+    """
+    return [Line.from_dict(record) for record in _as_list(body)]
+
+
+def stops(body: dict) -> typing.List[Stop]:
+    """
+    Build the Stop records of a stops response.
+
+    :param body: Body returned by SiriClient.stops
+    :type body: dict
+
+    :rtype: list of Stop
+    """
+    data_objects = (body.get("Contents") or {}).get("dataObjects") or {}
+    return [Stop.from_dict(record) for record in _as_list(data_objects.get("ScheduledStopPoint"))]
+
+
+def stop_places(body: dict) -> typing.List[Stop]:
+    """
+    Build the Stop records of a stop_places response.
+
+    :param body: Body returned by SiriClient.stop_places
+    :type body: dict
+
+    :rtype: list of Stop
+    """
+    delivery = service_delivery(body).get("DataObjectDelivery") or {}
+    site_frame = (delivery.get("dataObjects") or {}).get("SiteFrame") or {}
+    return [Stop.from_stop_place(record) for record in _as_list((site_frame.get("stopPlaces") or {}).get("StopPlace"))]
@@ -0,0 +1,302 @@
+"""
+Description: This file contains a loader that downloads the static network of the transit operators, their lines,
+stops, patterns and timetables, into normalized tables of a SQLite database. The requests of each level are sent
+concurrently with SiriClient.map, under the rate limit of the client. Each response is written in its own transaction
+along with a progress record, so an interrupted load resumes where it stopped.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import collections
+import contextlib
+import sqlite3
+import time
+import typing
+
+from siri_transit_api_client import models
+from siri_transit_api_client.models import _as_list, _text
+
+LoadStats = collections.namedtuple("LoadStats", ["requests", "skipped", "failed"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS operators (
+    id TEXT PRIMARY KEY, name TEXT, short_name TEXT, siri_operator_ref TEXT, time_zone TEXT, primary_mode TEXT,
+    monitored INTEGER
+);
+CREATE TABLE IF NOT EXISTS lines (
+    operator_id TEXT, id TEXT, name TEXT, public_code TEXT, transport_mode TEXT, siri_line_ref TEXT,
+    monitored INTEGER, PRIMARY KEY (operator_id, id)
+);
+CREATE TABLE IF NOT EXISTS stops (
+    operator_id TEXT, id TEXT, name TEXT, latitude REAL, longitude REAL, stop_type TEXT,
+    PRIMARY KEY (operator_id, id)
+);
+CREATE TABLE IF NOT EXISTS patterns (
+    operator_id TEXT, id TEXT, line_id TEXT, name TEXT, direction_ref TEXT, destination TEXT,
+    PRIMARY KEY (operator_id, id)
+);
+CREATE TABLE IF NOT EXISTS pattern_stops (
+    operator_id TEXT, pattern_id TEXT, stop_order INTEGER, stop_id TEXT, timing_point INTEGER,
+    PRIMARY KEY (operator_id, pattern_id, stop_order)
+);
+CREATE TABLE IF NOT EXISTS journeys (
+    operator_id TEXT, id TEXT, line_id TEXT, day_type TEXT, route_ref TEXT, direction_ref TEXT,
+    PRIMARY KEY (operator_id, id)
+);
+CREATE TABLE IF NOT EXISTS stop_times (
+    operator_id TEXT, journey_id TEXT, stop_order INTEGER, stop_id TEXT, arrival_time TEXT, arrival_days_offset
+    INTEGER, departure_time TEXT, departure_days_offset INTEGER, PRIMARY KEY (operator_id, journey_id, stop_order)
+);
+CREATE TABLE IF NOT EXISTS load_progress (task TEXT PRIMARY KEY, loaded_at REAL);
+CREATE INDEX IF NOT EXISTS patterns_by_line ON patterns (operator_id, line_id);
+CREATE INDEX IF NOT EXISTS pattern_stops_by_stop ON pattern_stops (operator_id, stop_id);
+CREATE INDEX IF NOT EXISTS journeys_by_line ON journeys (operator_id, line_id);
+CREATE INDEX IF NOT EXISTS stop_times_by_stop ON stop_times (operator_id, stop_id, departure_time);
+"""
+
+# lines whose patterns or timetables call at stops missing from the stops of their operator
+_LINES_WITH_UNKNOWN_STOPS = """
+SELECT DISTINCT patterns.operator_id, patterns.line_id FROM pattern_stops
+JOIN patterns ON patterns.operator_id = pattern_stops.operator_id AND patterns.id = pattern_stops.pattern_id
+LEFT JOIN stops ON stops.operator_id = pattern_stops.operator_id AND stops.id = pattern_stops.stop_id
+WHERE stops.id IS NULL
+UNION
+SELECT DISTINCT journeys.operator_id, journeys.line_id FROM stop_times
+JOIN journeys ON journeys.operator_id = stop_times.operator_id AND journeys.id = stop_times.journey_id
+LEFT JOIN stops ON stops.operator_id = stop_times.operator_id AND stops.id = stop_times.stop_id
+WHERE stops.id IS NULL
+"""
+
+
+def _point_ref(value) -> typing.Optional[str]:
+    # references are either the id itself or an object holding it
+    if isinstance(value, dict):
+        value = value.get("ref")
+    return _text(value)
+
+
+def _int(value) -> typing.Optional[int]:
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _task(endpoint: str, params: dict) -> str:
+    return ":".join([endpoint] + [str(value) for value in params.values()])
+
+
+def _write_operators(connection: sqlite3.Connection, params: dict, body) -> None:
+    connection.execute("DELETE FROM operators")
+    connection.executemany(
+        "INSERT OR REPLACE INTO operators VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(_text(record.get("Id")), _text(record.get("Name")), _text(record.get("ShortName")),
+          _text(record.get("SiriOperatorRef")), _text(record.get("TimeZone")), _text(record.get("PrimaryMode")),
+          int(record.get("Monitored") in (True, "true")))
+         for record in _as_list(body)],
+    )
+
+
+def _write_lines(connection: sqlite3.Connection, params: dict, body) -> None:
+    operator_id = params["operator_id"]
+    connection.execute("DELETE FROM lines WHERE operator_id = ?", (operator_id,))
+    connection.executemany(
+        "INSERT OR REPLACE INTO lines VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(operator_id, line.id, line.name, line.public_code, line.transport_mode, line.siri_line_ref,
+          int(line.monitored))
+         for line in models.lines(body)],
+    )
+
+
+def _write_stops(connection: sqlite3.Connection, params: dict, body) -> None:
+    operator_id = params["operator_id"]
+    if "line_id" not in params:
+        # the stops of a line only complete those of the operator
+        connection.execute("DELETE FROM stops WHERE operator_id = ?", (operator_id,))
+    connection.executemany(
+        "INSERT OR REPLACE INTO stops VALUES (?, ?, ?, ?, ?, ?)",
+        [(operator_id, stop.id, stop.name, stop.latitude, stop.longitude, stop.stop_type)
+         for stop in models.stops(body)],
+    )
+
+
+def _write_patterns(connection: sqlite3.Connection, params: dict, body) -> None:
+    operator_id, line_id = params["operator_id"], params["line_id"]
+    connection.execute(
+        "DELETE FROM pattern_stops WHERE operator_id = ? AND pattern_id IN "
+        "(SELECT id FROM patterns WHERE operator_id = ? AND line_id = ?)",
+        (operator_id, operator_id, line_id),
+    )
+    connection.execute("DELETE FROM patterns WHERE operator_id = ? AND line_id = ?", (operator_id, line_id))
+    for pattern in _as_list((body or {}).get("journeyPatterns")):
+        pattern_id = _text(pattern.get("serviceJourneyPatternRef"))
+        destination = (pattern.get("DestinationDisplayView") or {}).get("FontText")
+        connection.execute(
+            "INSERT OR REPLACE INTO patterns VALUES (?, ?, ?, ?, ?, ?)",
+            (operator_id, pattern_id, line_id, _text(pattern.get("Name")), _text(pattern.get("DirectionRef")),
+             _text(destination)),
+        )
+        points = pattern.get("PointsInSequence") or {}
+        timing_points = {_int(point.get("Order")) for point in _as_list(points.get("TimingPointInJourneyPattern"))}
+        connection.executemany(
+            "INSERT OR REPLACE INTO pattern_stops VALUES (?, ?, ?, ?, ?)",
+            [(operator_id, pattern_id, _int(point.get("Order")), _point_ref(point.get("ScheduledStopPointRef")),
+              int(_int(point.get("Order")) in timing_points))
+             for point in _as_list(points.get("StopPointInJourneyPattern"))
+             + _as_list(points.get("TimingPointInJourneyPattern"))],
+        )
+
+
+def _write_timetable(connection: sqlite3.Connection, params: dict, body) -> None:
+    operator_id, line_id = params["operator_id"], params["line_id"]
+    connection.execute(
+        "DELETE FROM stop_times WHERE operator_id = ? AND journey_id IN "
+        "(SELECT id FROM journeys WHERE operator_id = ? AND line_id = ?)",
+        (operator_id, operator_id, line_id),
+    )
+    connection.execute("DELETE FROM journeys WHERE operator_id = ? AND line_id = ?", (operator_id, line_id))
+    for frame in _as_list(((body or {}).get("Content") or {}).get("TimetableFrame")):
+        day_type = _text(frame.get("Name"))
+        for journey in _as_list((frame.get("vehicleJourneys") or {}).get("ServiceJourney")):
+            journey_id = _text(journey.get("id"))
+            view = journey.get("JourneyPatternView") or {}
+            connection.execute(
+                "INSERT OR REPLACE INTO journeys VALUES (?, ?, ?, ?, ?, ?)",
+                (operator_id, journey_id, line_id, day_type, _point_ref(view.get("RouteRef")),
+                 _point_ref(view.get("DirectionRef"))),
+            )
+            stop_times = []
+            for call in _as_list((journey.get("calls") or {}).get("Call")):
+                arrival = call.get("Arrival") or {}
+                departure = call.get("Departure") or {}
+                stop_times.append(
+                    (operator_id, journey_id, _int(call.get("Order")), _point_ref(call.get("ScheduledStopPointRef")),
+                     _text(arrival.get("Time")), _int(arrival.get("DaysOffset")), _text(departure.get("Time")),
+                     _int(departure.get("DaysOffset")))
+                )
+            connection.executemany("INSERT OR REPLACE INTO stop_times VALUES (?, ?, ?, ?, ?, ?, ?, ?)", stop_times)
+
+
+class StaticNetworkLoader:
+    def __init__(self, client, path: str, max_workers: int = 8):
+        """
+        Load the static network into a SQLite database. The stops of each operator are requested once, instead of
+        once per line; the stops of a line are only requested when its patterns or timetable call at stops missing
+        from those of its operator.
+
+        :param client: Client used to query the api. Give it a cache to keep the raw responses as well.
+        :type client: SiriClient
+
+        :param path: Path of the SQLite database file. It is created if it does not exist.
+        :type path: str
+
+        :param max_workers: Number of requests sent at the same time.
+        :type max_workers: int
+        """
+        self.client = client
+        self.path = path
+        self.max_workers = max_workers
+        # MapResult of each request that failed during the last load
+        self.errors = []
+        self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    @contextlib.contextmanager
+    def _transaction(self) -> typing.Iterator[sqlite3.Connection]:
+        connection = self._connect()
+        connection.execute("BEGIN")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> "StaticNetworkLoader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def load(self, operator_ids: typing.Iterable[str] = None, timetables: bool = True,
+             refresh: bool = False) -> LoadStats:
+        """
+        Load the operators, then the lines and stops of each operator, then the patterns and timetable of each line.
+        The requests that completed during a previous load are skipped, so calling load again after an interruption
+        or after failed requests only sends the requests left.
+
+        :param operator_ids: Operators whose network is loaded. Defaults to every operator.
+        :type operator_ids: iterable of str, optional
+
+        :param timetables: If False, the timetables are not loaded.
+        :type timetables: bool
+
+        :param refresh: If True, every request is sent again, e.g. to load a new schedule.
+        :type refresh: bool
+
+        :return: Number of requests sent, skipped because they completed earlier and failed. The failures are kept in
+            errors.
+        :rtype: LoadStats
+        """
+        connection = self._connect()
+        if refresh:
+            connection.execute("DELETE FROM load_progress")
+        self.errors = []
+        counts = collections.Counter()
+
+        self._run("operators", [{}], _write_operators, counts)
+        if operator_ids is None:
+            operator_ids = [row[0] for row in connection.execute("SELECT id FROM operators ORDER BY id")]
+        operator_params = [{"operator_id": operator_id} for operator_id in dict.fromkeys(operator_ids)]
+        self._run("lines", operator_params, _write_lines, counts)
+        self._run("stops", operator_params, _write_stops, counts)
+
+        operators = {params["operator_id"] for params in operator_params}
+        line_params = [{"operator_id": operator_id, "line_id": line_id}
+                       for operator_id, line_id in connection.execute("SELECT operator_id, id FROM lines ORDER BY 1, 2")
+                       if operator_id in operators]
+        self._run("patterns", line_params, _write_patterns, counts)
+        if timetables:
+            self._run("timetable", line_params, _write_timetable, counts)
+
+        missing = [{"operator_id": operator_id, "line_id": line_id}
+                   for operator_id, line_id in connection.execute(_LINES_WITH_UNKNOWN_STOPS)
+                   if operator_id in operators]
+        self._run("stops", missing, _write_stops, counts)
+        return LoadStats(counts["requests"], counts["skipped"], counts["failed"])
+
+    def _run(self, endpoint: str, param_sets: typing.List[dict], write, counts: collections.Counter) -> None:
+        done = {row[0] for row in self._connect().execute("SELECT task FROM load_progress")}
+        pending = [params for params in param_sets if _task(endpoint, params) not in done]
+        counts["skipped"] += len(param_sets) - len(pending)
+        # the responses are written by this thread while the next requests are in flight
+        for result in self.client.map(endpoint, pending, self.max_workers):
+            counts["requests"] += 1
+            if result.error is not None:
+                counts["failed"] += 1
+                self.errors.append(result)
+                continue
+            with self._transaction() as connection:
+                write(connection, result.params, result.result)
+                connection.execute("INSERT OR REPLACE INTO load_progress VALUES (?, ?)",
+                                   (_task(endpoint, result.params), time.time()))
+
+    def stats(self) -> dict:
+        """
+        Number of rows of each table.
+
+        :rtype: dict
+        """
+        connection = self._connect()
+        return {table: connection.execute("SELECT COUNT(*) FROM %s" % table).fetchone()[0]
+                for table in ("operators", "lines", "stops", "patterns", "pattern_stops", "journeys", "stop_times")}
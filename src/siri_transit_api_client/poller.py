@@ -0,0 +1,186 @@
+"""
+Description: This file contains a poller that queries the VehicleMonitoring or StopMonitoring endpoint on a fixed
+interval in a background thread and sends subscribers only the records that were added, changed or removed since the
+previous snapshot, so that the work done by consumers follows how much data changes instead of the size of the feed.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import collections
+import logging
+import threading
+import time
+import typing
+
+logger = logging.getLogger(__name__)
+
+SnapshotDiff = collections.namedtuple("SnapshotDiff", ["added", "changed", "removed"])
+
+
+def vehicle_activity_key(record: dict) -> typing.Hashable:
+    """
+    Identify a VehicleActivity record by its vehicle, or by its journey if the vehicle is unknown.
+    """
+    journey = record.get("MonitoredVehicleJourney") or {}
+    vehicle_ref = journey.get("VehicleRef")
+    if vehicle_ref:
+        return vehicle_ref
+    framed_journey = journey.get("FramedVehicleJourneyRef") or {}
+    return framed_journey.get("DataFrameRef"), framed_journey.get("DatedVehicleJourneyRef")
+
+
+def stop_visit_key(record: dict) -> typing.Hashable:
+    """
+    Identify a MonitoredStopVisit record by its stop and the journey of the vehicle calling at it.
+    """
+    journey = record.get("MonitoredVehicleJourney") or {}
+    framed_journey = journey.get("FramedVehicleJourneyRef") or {}
+    return (
+        record.get("MonitoringRef"),
+        framed_journey.get("DataFrameRef"),
+        framed_journey.get("DatedVehicleJourneyRef"),
+        journey.get("VehicleRef"),
+    )
+
+
+_ENDPOINTS = {
+    "vehicle_monitoring": ("iter_vehicle_monitoring", vehicle_activity_key),
+    "stop_monitoring": ("iter_stop_monitoring", stop_visit_key),
+}
+
+
+class SiriPoller:
+    def __init__(
+        self,
+        client,
+        endpoint: str,
+        interval: float = 30,
+        key: typing.Callable[[dict], typing.Hashable] = None,
+        on_error: typing.Callable[[Exception], None] = None,
+        **params,
+    ):
+        """
+        Poll a real-time endpoint of a SiriClient and publish the differences between consecutive snapshots. The
+        queries go through the client, so they share its rate limiter.
+
+        :param client: Client used to query the endpoint
+        :type client: SiriClient
+
+        :param endpoint: "vehicle_monitoring" or "stop_monitoring"
+        :type endpoint: str
+
+        :param interval: Seconds between the start of consecutive polls. A poll that overruns the interval is
+            followed by the next one on the schedule, instead of shifting every later poll.
+        :type interval: float
+
+        :param key: Function identifying a record across snapshots. Defaults to the vehicle for vehicle monitoring
+            and to the stop and vehicle journey for stop monitoring.
+        :type key: function, optional
+
+        :param on_error: Called with the exception when a poll fails. Polling carries on afterwards. Defaults to
+            logging the exception.
+        :type on_error: function, optional
+
+        :param params: Arguments of the endpoint method, e.g. agency="SF".
+        """
+        if endpoint not in _ENDPOINTS:
+            raise ValueError("Can not poll endpoint: %s" % endpoint)
+        if interval <= 0:
+            raise ValueError("interval must be positive.")
+        method_name, default_key = _ENDPOINTS[endpoint]
+        self.client = client
+        self.endpoint = endpoint
+        self.interval = interval
+        self.params = params
+        self.key = key or default_key
+        self.on_error = on_error
+        self._fetch = getattr(client, method_name)
+        self._subscribers = []
+        self._previous = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback: typing.Callable[[SnapshotDiff], None]) -> None:
+        """
+        Register a function called with a SnapshotDiff after each poll that found a difference.
+
+        :param callback: Function taking a SnapshotDiff
+        :type callback: function
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: typing.Callable[[SnapshotDiff], None]) -> None:
+        """
+        Stop calling a function registered with subscribe.
+
+        :param callback: Function registered with subscribe
+        :type callback: function
+        """
+        self._subscribers.remove(callback)
+
+    def poll_once(self) -> SnapshotDiff:
+        """
+        Query the endpoint, compare the records with the previous snapshot by key and RecordedAtTime and publish the
+        difference to the subscribers.
+
+        :return: Records added, changed and removed since the previous poll
+        :rtype: SnapshotDiff
+        """
+        current = {}
+        added = []
+        changed = []
+        previous = self._previous
+        for record in self._fetch(**self.params):
+            record_key = self.key(record)
+            current[record_key] = record
+            old = previous.get(record_key)
+            if old is None:
+                added.append(record)
+            elif old.get("RecordedAtTime") != record.get("RecordedAtTime"):
+                changed.append(record)
+        removed = [record for record_key, record in previous.items() if record_key not in current]
+        self._previous = current
+
+        diff = SnapshotDiff(added, changed, removed)
+        if added or changed or removed:
+            for callback in list(self._subscribers):
+                callback(diff)
+        return diff
+
+    def start(self) -> None:
+        """
+        Start polling in a background thread.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError("Poller is already running.")
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="SiriPoller-%s" % self.endpoint, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None) -> None:
+        """
+        Stop the background thread, waiting for a poll in progress to finish.
+
+        :param timeout: Maximum number of seconds to wait for the thread.
+        :type timeout: float, optional
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        next_poll = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(e)
+                else:
+                    logger.exception("Polling %s failed", self.endpoint)
+            # schedule from the planned start time so that the time spent polling does not add up as drift
+            next_poll += self.interval
+            now = time.monotonic()
+            if next_poll < now:
+                next_poll += (now - next_poll) // self.interval * self.interval + self.interval
+            self._stop_event.wait(next_poll - now)
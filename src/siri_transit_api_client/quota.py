@@ -0,0 +1,172 @@
+"""
+Description: This file contains a scheduler that keeps the requests sent to 511.org under the hourly quota of an api
+key. Requests wait in a priority queue so that real-time queries are sent ahead of bulk static downloads, and bulk
+downloads can not use up the part of the budget that is held back for the other requests.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import collections
+import heapq
+import itertools
+import threading
+import time
+
+import siri_transit_api_client
+
+PRIORITY_REALTIME = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BULK = 2
+
+_DEFAULT_ENDPOINT_PRIORITIES = {
+    "StopMonitoring": PRIORITY_REALTIME,
+    "VehicleMonitoring": PRIORITY_REALTIME,
+    "timetable": PRIORITY_BULK,
+    "patterns": PRIORITY_BULK,
+    "shapes": PRIORITY_BULK,
+}
+
+QuotaStats = collections.namedtuple("QuotaStats", ["remaining", "sent", "waiting", "rejected"])
+
+
+class HourlyQuotaScheduler:
+    def __init__(
+        self,
+        requests_per_hour: int = 60,
+        bulk_reserve: float = 0.2,
+        defer_bulk: bool = True,
+        max_wait: float = None,
+        endpoint_priorities: dict = None,
+        period: float = 3600,
+    ):
+        """
+        Tracks the requests sent during the last hour and hands out the remaining budget by priority.
+
+        :param requests_per_hour: Number of requests the api key may send per hour.
+        :type requests_per_hour: int
+
+        :param bulk_reserve: Fraction of the hourly budget that bulk requests may not use, so that it stays available
+            for real-time and default priority requests.
+        :type bulk_reserve: float
+
+        :param defer_bulk: If True, bulk requests wait until the budget frees up once only the reserve is left. If
+            False, they are rejected with OverQueryLimit instead.
+        :type defer_bulk: bool
+
+        :param max_wait: Maximum number of seconds a request waits for budget before OverQueryLimit is raised.
+            Defaults to waiting as long as needed.
+        :type max_wait: float, optional
+
+        :param endpoint_priorities: Priority of each endpoint path, lower values are sent first. Endpoints that are not
+            listed use PRIORITY_DEFAULT. Defaults to real-time priority for StopMonitoring and VehicleMonitoring and
+            bulk priority for timetable, patterns and shapes.
+        :type endpoint_priorities: dict, optional
+
+        :param period: Length of the quota window in seconds.
+        :type period: float
+        """
+        if requests_per_hour <= 0:
+            raise ValueError("requests_per_hour must be positive.")
+        self.requests_per_hour = requests_per_hour
+        self.bulk_reserve = bulk_reserve
+        self.defer_bulk = defer_bulk
+        self.max_wait = max_wait
+        if endpoint_priorities is None:
+            endpoint_priorities = _DEFAULT_ENDPOINT_PRIORITIES
+        self.endpoint_priorities = dict(endpoint_priorities)
+        self.period = period
+        self._sent_times = collections.deque()
+        self._waiters = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._rejected = 0
+
+    def priority(self, endpoint: str) -> int:
+        """
+        Priority of requests sent to an endpoint.
+
+        :param endpoint: URL path of the endpoint, as passed to SiriClient._request
+        :type endpoint: str
+
+        :rtype: int
+        """
+        return self.endpoint_priorities.get(endpoint, PRIORITY_DEFAULT)
+
+    def _expire(self, now: float) -> None:
+        while self._sent_times and self._sent_times[0] <= now - self.period:
+            self._sent_times.popleft()
+
+    def _remaining(self) -> int:
+        return self.requests_per_hour - len(self._sent_times)
+
+    def _reserved(self, priority: int) -> int:
+        if priority >= PRIORITY_BULK:
+            return int(self.requests_per_hour * self.bulk_reserve)
+        return 0
+
+    def remaining(self) -> int:
+        """
+        Number of requests left in the current window.
+
+        :rtype: int
+        """
+        with self._condition:
+            self._expire(time.monotonic())
+            return self._remaining()
+
+    def stats(self) -> QuotaStats:
+        """
+        Snapshot of the remaining budget, requests sent in the window, requests waiting and requests rejected.
+
+        :rtype: QuotaStats
+        """
+        with self._condition:
+            self._expire(time.monotonic())
+            return QuotaStats(self._remaining(), len(self._sent_times), len(self._waiters), self._rejected)
+
+    def _reject(self, message: str):
+        self._rejected += 1
+        return siri_transit_api_client.exceptions.OverQueryLimit("quota", message)
+
+    def acquire(self, endpoint: str) -> None:
+        """
+        Block until the request to endpoint may be sent and count it against the hourly budget.
+
+        :param endpoint: URL path of the endpoint, as passed to SiriClient._request
+        :type endpoint: str
+
+        :raises OverQueryLimit: if the request is rejected or max_wait elapses before budget is available.
+        """
+        priority = self.priority(endpoint)
+        reserved = self._reserved(priority)
+        entry = (priority, next(self._counter))
+        start = time.monotonic()
+        with self._condition:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._expire(now)
+                    has_budget = self._remaining() > reserved
+                    if has_budget and self._waiters[0] == entry:
+                        heapq.heappop(self._waiters)
+                        self._sent_times.append(now)
+                        return
+                    if not has_budget and reserved and not self.defer_bulk:
+                        raise self._reject("hourly quota is reserved for higher priority requests")
+                    timeout = None
+                    if not has_budget:
+                        if not self._sent_times:
+                            raise self._reject("hourly quota is reserved for higher priority requests")
+                        timeout = self._sent_times[0] + self.period - now
+                    if self.max_wait is not None:
+                        left = start + self.max_wait - now
+                        if left <= 0:
+                            raise self._reject("timed out waiting for hourly quota")
+                        timeout = left if timeout is None else min(timeout, left)
+                    self._condition.wait(timeout)
+            finally:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                # the head of the queue may have changed
+                self._condition.notify_all()
@@ -0,0 +1,146 @@
+"""
+Description: This file contains rate limiters that keep the queries sent to 511.org under the permitted rate. A limiter
+is acquired before each request is sent and can be shared by several threads and SiriClient instances.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import collections
+import os
+import sqlite3
+import threading
+import time
+
+RateLimiterStats = collections.namedtuple(
+    "RateLimiterStats", ["acquired", "waited", "total_wait_seconds", "max_wait_seconds"]
+)
+
+
+class TokenBucketRateLimiter:
+    def __init__(self, queries_per_second: float = 10, burst: int = None):
+        """
+        Thread safe token bucket. Tokens are added at queries_per_second and up to burst tokens can be saved up. A
+        caller that finds the bucket empty reserves the next token and sleeps until it is due, so waiting callers
+        are served in the order they arrived.
+
+        :param queries_per_second: Number of queries per second permitted.
+        :type queries_per_second: float
+
+        :param burst: Maximum number of queries that can be sent back to back. Defaults to queries_per_second.
+        :type burst: int, optional
+        """
+        if queries_per_second <= 0:
+            raise ValueError("queries_per_second must be positive.")
+        self.queries_per_second = queries_per_second
+        self.burst = burst or max(1, int(queries_per_second))
+        self._tokens = float(self.burst)
+        self._last_refill = None
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._waited = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _reserve(self) -> float:
+        """
+        Take a token from the bucket, returning how long the caller has to wait before it may use it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._last_refill is None:
+                self._last_refill = now
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.queries_per_second)
+            self._last_refill = now
+            self._tokens -= 1
+            wait = -self._tokens / self.queries_per_second if self._tokens < 0 else 0.0
+            self._record_wait(wait)
+            return wait
+
+    def _record_wait(self, wait: float) -> None:
+        self._acquired += 1
+        if wait > 0:
+            self._waited += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+
+    def acquire(self) -> float:
+        """
+        Block until a query can be sent without exceeding the rate limit.
+
+        :return: Number of seconds spent waiting
+        :rtype: float
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self) -> RateLimiterStats:
+        """
+        Statistics on how long callers waited for the limiter.
+
+        :return: acquired calls, calls that had to wait, total and maximum wait in seconds
+        :rtype: RateLimiterStats
+        """
+        with self._lock:
+            return RateLimiterStats(self._acquired, self._waited, self._total_wait, self._max_wait)
+
+
+class SQLiteRateLimiter(TokenBucketRateLimiter):
+    def __init__(self, path: str, queries_per_second: float = 10, burst: int = None, name: str = "default"):
+        """
+        Token bucket whose state is kept in a row of a local SQLite database, so that every process using the same
+        file shares a single rate limit. Use one file (or name) per api key. Stats only cover the current process.
+
+        :param path: Path of the SQLite database file. It is created if it does not exist.
+        :type path: str
+
+        :param queries_per_second: Number of queries per second permitted across all processes.
+        :type queries_per_second: float
+
+        :param burst: Maximum number of queries that can be sent back to back. Defaults to queries_per_second.
+        :type burst: int, optional
+
+        :param name: Name of the bucket, allowing several limits to be kept in one database.
+        :type name: str, optional
+        """
+        super().__init__(queries_per_second, burst)
+        self.path = path
+        self.name = name
+        self._connection = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite connections must not be carried across a fork, so each process opens its own
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS token_bucket (name TEXT PRIMARY KEY, tokens REAL, last_refill REAL)"
+            )
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def _reserve(self) -> float:
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = connection.execute(
+                    "SELECT tokens, last_refill FROM token_bucket WHERE name = ?", (self.name,)
+                ).fetchone()
+                tokens = self.burst if row is None else min(
+                    self.burst, row[0] + max(0.0, now - row[1]) * self.queries_per_second
+                )
+                tokens -= 1
+                connection.execute(
+                    "INSERT OR REPLACE INTO token_bucket (name, tokens, last_refill) VALUES (?, ?, ?)",
+                    (self.name, tokens, now),
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            wait = -tokens / self.queries_per_second if tokens < 0 else 0.0
+            self._record_wait(wait)
+            return wait
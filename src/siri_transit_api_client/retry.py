@@ -0,0 +1,196 @@
+"""
+Description: This file contains the retry policy of the clients, which decides whether and after how long a failed
+request is sent again, and a retry budget shared by all the requests of a client, which keeps the retries to a
+fraction of the requests so that they can not multiply the load on the api while it is failing.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import collections
+import datetime as dt
+import email.utils
+import random
+import threading
+import time
+import typing
+
+_DEFAULT_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+RetryBudgetStats = collections.namedtuple("RetryBudgetStats", ["requests", "retries", "exhausted", "balance"])
+
+
+def parse_retry_after(value: typing.Optional[str], now: float = None) -> typing.Optional[float]:
+    """
+    Seconds to wait according to a Retry-After header, given either as a number of seconds or as an HTTP date.
+
+    :param value: Value of the Retry-After header
+    :type value: str, optional
+
+    :param now: Current POSIX time, used for HTTP dates. Defaults to time.time().
+    :type now: float, optional
+
+    :return: Seconds to wait, None if the header is missing or invalid
+    :rtype: float or None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=dt.timezone.utc)
+    if now is None:
+        now = time.time()
+    return max(0.0, retry_at.timestamp() - now)
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_attempts: int = None,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        deadline: float = None,
+        retry_statuses: typing.Iterable[int] = _DEFAULT_RETRY_STATUSES,
+        respect_retry_after: bool = True,
+    ):
+        """
+        Decides how a failed request is retried. The delay before retry n is drawn uniformly between 0 and
+        min(max_delay, base_delay * 2 ** (n - 1)) (full jitter), unless the response has a Retry-After header.
+
+        :param max_attempts: Maximum number of times a request is sent, including the first. Defaults to no limit
+            other than the deadline.
+        :type max_attempts: int, optional
+
+        :param base_delay: Upper bound, in seconds, of the delay before the first retry.
+        :type base_delay: float
+
+        :param max_delay: Upper bound, in seconds, of the delay before any retry.
+        :type max_delay: float
+
+        :param deadline: Seconds after the first attempt past which no retry is made. Defaults to the retry_timeout
+            of the client.
+        :type deadline: float, optional
+
+        :param retry_statuses: HTTP statuses that are retried.
+        :type retry_statuses: iterable of int
+
+        :param respect_retry_after: If True, the Retry-After header of a retried response sets the delay. A request is
+            given up at once when the api asks to wait past the deadline.
+        :type respect_retry_after: bool
+        """
+        if max_attempts is not None and max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retry_statuses = frozenset(retry_statuses)
+        self.respect_retry_after = respect_retry_after
+
+    def backoff(self, retry: int) -> float:
+        """
+        Jittered delay before a retry.
+
+        :param retry: Number of the retry, 1 for the first
+        :type retry: int
+
+        :rtype: float
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    def next_delay(
+        self, attempt: int, remaining: float, retry_after: typing.Optional[float] = None
+    ) -> typing.Optional[float]:
+        """
+        Delay before sending a request again, or None if it should be given up.
+
+        :param attempt: Number of times the request has been sent
+        :type attempt: int
+
+        :param remaining: Seconds left before the deadline
+        :type remaining: float
+
+        :param retry_after: Delay asked for by the Retry-After header of the response
+        :type retry_after: float, optional
+
+        :rtype: float or None
+        """
+        if self.max_attempts is not None and attempt >= self.max_attempts:
+            return None
+        if remaining <= 0:
+            return None
+        if retry_after is not None and self.respect_retry_after:
+            return retry_after if retry_after <= remaining else None
+        return min(self.backoff(attempt), remaining)
+
+
+class RetryBudget:
+    def __init__(self, ratio: float = 0.2, min_retries_per_second: float = 1.0, max_balance: float = 10.0):
+        """
+        Limits the retries of all the requests of a client. Every first attempt adds ratio to a balance, which also
+        grows by min_retries_per_second so that an idle client can still retry, and every retry takes 1 from it. While
+        the balance is below 1 failed requests are not retried, so during an outage the client sends at most
+        1 + ratio times its normal load.
+
+        :param ratio: Retries permitted per request sent.
+        :type ratio: float
+
+        :param min_retries_per_second: Retries permitted per second regardless of the number of requests.
+        :type min_retries_per_second: float
+
+        :param max_balance: Maximum number of retries that can be saved up.
+        :type max_balance: float
+        """
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.max_balance = max_balance
+        self._balance = max_balance
+        self._updated = time.monotonic()
+        self._requests = 0
+        self._retries = 0
+        self._exhausted = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, amount: float) -> None:
+        now = time.monotonic()
+        amount += (now - self._updated) * self.min_retries_per_second
+        self._updated = now
+        self._balance = min(self.max_balance, self._balance + amount)
+
+    def deposit(self) -> None:
+        """
+        Record a first attempt.
+        """
+        with self._lock:
+            self._requests += 1
+            self._refill(self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        Take a retry from the budget.
+
+        :return: False if the budget is exhausted and the request should not be retried
+        :rtype: bool
+        """
+        with self._lock:
+            self._refill(0.0)
+            if self._balance < 1:
+                self._exhausted += 1
+                return False
+            self._balance -= 1
+            self._retries += 1
+            return True
+
+    def stats(self) -> RetryBudgetStats:
+        """
+        Number of first attempts, retries, retries refused because the budget was exhausted and the current balance.
+
+        :rtype: RetryBudgetStats
+        """
+        with self._lock:
+            self._refill(0.0)
+            return RetryBudgetStats(self._requests, self._retries, self._exhausted, self._balance)
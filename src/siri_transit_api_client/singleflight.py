@@ -0,0 +1,130 @@
+"""
+Description: This file contains helpers that coalesce identical calls made while one of them is in flight: the first
+caller runs the call and every caller that arrives before it finishes receives the same result or exception. One
+helper is for threads, the other for asyncio tasks.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import asyncio
+import collections
+import threading
+import typing
+
+SingleFlightStats = collections.namedtuple("SingleFlightStats", ["calls", "coalesced", "in_flight"])
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Coalesce identical calls made by several threads at the same time.
+        """
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._made = 0
+        self._coalesced = 0
+
+    def do(self, key: typing.Hashable, function: typing.Callable, *args, **kwargs):
+        """
+        Call function unless a call with the same key is in flight, in which case wait for that call instead. The
+        result is shared by every caller and should not be modified.
+
+        :param key: Identifies the call
+        :type key: hashable
+
+        :param function: Function to call with args and kwargs
+        :type function: function
+
+        :return: The result of the call
+        :raises: The exception raised by the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._made += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> SingleFlightStats:
+        """
+        Number of calls made, number of calls that waited for an identical call instead and number of calls in flight.
+
+        :rtype: SingleFlightStats
+        """
+        with self._lock:
+            return SingleFlightStats(self._made, self._coalesced, len(self._calls))
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        """
+        Coalesce identical coroutine calls made by several tasks of an event loop at the same time.
+        """
+        self._calls = {}
+        self._made = 0
+        self._coalesced = 0
+
+    async def do(self, key: typing.Hashable, function: typing.Callable, *args, **kwargs):
+        """
+        Await function unless a call with the same key is in flight, in which case await that call instead. The call
+        runs in its own task, so cancelling one caller does not cancel it for the others. The result is shared by
+        every caller and should not be modified.
+
+        :param key: Identifies the call
+        :type key: hashable
+
+        :param function: Coroutine function to call with args and kwargs
+        :type function: function
+
+        :return: The result of the call
+        :raises: The exception raised by the call
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function(*args, **kwargs))
+            self._calls[key] = task
+            self._made += 1
+            task.add_done_callback(lambda finished: self._forget(key, finished))
+        else:
+            self._coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: typing.Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def stats(self) -> SingleFlightStats:
+        """
+        Number of calls made, number of calls that awaited an identical call instead and number of calls in flight.
+
+        :rtype: SingleFlightStats
+        """
+        return SingleFlightStats(self._made, self._coalesced, len(self._calls))
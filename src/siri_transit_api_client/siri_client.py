@@ -5,21 +5,40 @@ https://github.com/googlemaps/google-maps-services-python
 @author: Robert Hennessy (robertghennessy@gmail.com)
 """
 import collections
-import datetime
+import concurrent.futures
 import datetime as dt
-import json
-import random
+import threading
 import time
+import typing
 import urllib
 
 import requests
 
 import siri_transit_api_client
+from siri_transit_api_client import metrics
+from siri_transit_api_client.circuit_breaker import is_failure, is_throttled
+from siri_transit_api_client.compression import ACCEPT_ENCODING, ContentDecoder, iter_decoded, read_content
+from siri_transit_api_client.decoders import get_decoder, strip_bom
+from siri_transit_api_client.hooks import RequestEvent, RequestTimings, measure_connect
+from siri_transit_api_client.rate_limit import TokenBucketRateLimiter
+from siri_transit_api_client.retry import RetryBudget, RetryPolicy, parse_retry_after
+from siri_transit_api_client.singleflight import SingleFlight
+from siri_transit_api_client.streaming import iter_array_items
+from siri_transit_api_client.transport import PooledHTTPAdapter
 
 
 _DEFAULT_BASE_URL = "https://api.511.org/Transit/"
 _DEFAULT_TRANSIT_AGENCY = "CT"
-_RETRIABLE_STATUSES = {500, 503, 504}
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+_MAP_ENDPOINTS = {
+    "holidays", "lines", "operators", "patterns", "shapes", "stop_monitoring", "stop_places", "stop_timetable",
+    "stops", "timetable", "vehicle_monitoring",
+}
+
+_ConditionalEntry = collections.namedtuple("_ConditionalEntry", ["etag", "last_modified", "body", "content", "size"])
+
+MapResult = collections.namedtuple("MapResult", ["params", "result", "error"])
 
 
 class SiriClient:
@@ -32,6 +51,22 @@ class SiriClient:
         retry_over_query_limit: bool = True,
         requests_session: requests.Session = None,
         requests_kwargs: dict = None,
+        rate_limiter=None,
+        quota_scheduler=None,
+        cache=None,
+        conditional_requests: bool = False,
+        conditional_max_bytes: int = 64 * 1024 * 1024,
+        json_decoder="json",
+        coalesce_requests: bool = False,
+        retry_policy: RetryPolicy = None,
+        endpoint_retry_policies: dict = None,
+        retry_budget: RetryBudget = None,
+        circuit_breakers=None,
+        metrics_sink=None,
+        hooks=None,
+        cassette=None,
+        transport=None,
+        accept_encoding: str = ACCEPT_ENCODING,
     ):
         """
         Create session to query the SIRI transit data from 511.org
@@ -62,33 +97,129 @@ class SiriClient:
         :param requests_kwargs: Extra keyword arguments for the requests' library
         :type requests_kwargs: dict
 
+        :param rate_limiter: Limiter acquired before every request is sent. Pass the same limiter to several clients
+            to share one rate limit between them. Defaults to a TokenBucketRateLimiter using queries_per_second.
+        :type rate_limiter: TokenBucketRateLimiter, optional
+
+        :param quota_scheduler: Scheduler that keeps the requests under the hourly quota of the api key, sending
+            real-time requests ahead of bulk requests. Defaults to no hourly limit.
+        :type quota_scheduler: HourlyQuotaScheduler, optional
+
+        :param cache: Cache for the responses, keyed on the endpoint and its parameters without the api key.
+            Defaults to no caching.
+        :type cache: ResponseCache or SQLiteResponseCache, optional
+
+        :param conditional_requests: If True, the ETag and Last-Modified headers of the responses are remembered per
+            URL and sent back as If-None-Match and If-Modified-Since, so that an unchanged response is answered with
+            304 Not Modified and the remembered body is returned. Defaults to False.
+        :type conditional_requests: bool
+
+        :param conditional_max_bytes: Maximum size of the bodies remembered by conditional_requests, measured as the
+            length of the response content as in ResponseCache. The least recently used bodies are dropped first.
+        :type conditional_max_bytes: int
+
+        :param json_decoder: Decoder used to parse the responses: "json", "orjson", "msgspec", "auto" to pick the
+            fastest one installed, or a function that parses bytes or a memoryview. Defaults to "json".
+        :type json_decoder: str or function
+
+        :param coalesce_requests: If True, a request identical to one in flight, same endpoint and parameters, waits
+            for that request and shares its result or exception instead of being sent again. The shared result must
+            not be modified. Defaults to False.
+        :type coalesce_requests: bool
+
+        :param retry_policy: Decides whether and when failed requests are retried. Defaults to a RetryPolicy whose
+            deadline is retry_timeout.
+        :type retry_policy: RetryPolicy, optional
+
+        :param endpoint_retry_policies: Retry policies of specific endpoints, keyed on the endpoint path, e.g.
+            {"timetable": RetryPolicy(max_attempts=2)}. Other endpoints use retry_policy.
+        :type endpoint_retry_policies: dict, optional
+
+        :param retry_budget: Budget shared by the retries of all the requests. Pass the same budget to several
+            clients to share it between them. Defaults to a RetryBudget permitting 20% retries.
+        :type retry_budget: RetryBudget, optional
+
+        :param circuit_breakers: Circuit breakers of the endpoints. While the circuit of an endpoint is open its
+            requests are answered with the last response kept by the cache, see the stale_ttl of the caches, or by
+            conditional_requests, and raise CircuitOpen if there is none. Defaults to no circuit breakers.
+        :type circuit_breakers: CircuitBreakers, optional
+
+        :param metrics_sink: Sink receiving the request latencies, response sizes before and after decompression,
+            decompression and decode times, retries and time spent waiting for the rate limiter, the quota and between
+            retries, labelled by endpoint. Defaults to recording nothing.
+        :type metrics_sink: PrometheusSink or CallbackSink, optional
+
+        :param hooks: Functions called before each attempt, after each response, before each retry and when a request
+            fails, with the endpoint, the parameters without the api key and the timing of each phase of the attempt.
+            The session created by the client measures the connection time; pass a requests_session with a
+            TimedHTTPAdapter mounted to measure it on your own session.
+        :type hooks: RequestHooks, optional
+
+        :param cassette: Adapter mounted on the session for base_url: a RecordingAdapter appending every response to a
+            cassette file, or a ReplayAdapter answering the requests from one without network access. Defaults to
+            sending the requests to 511.org.
+        :type cassette: RecordingAdapter or ReplayAdapter, optional
+
+        :param transport: Adapter mounted on the session for http and https URLs, e.g. an HTTPXAdapter to send the
+            requests over HTTP/2. Defaults to a PooledHTTPAdapter on the session created by the client, and to the
+            adapters of requests_session otherwise.
+        :type transport: PooledHTTPAdapter or HTTPXAdapter, optional
+
+        :param accept_encoding: Accept-Encoding header sent with the requests. The responses are decompressed as they
+            are read from the connection. Defaults to gzip and deflate, and brotli when brotli or brotlicffi is
+            installed. None leaves the header to the session; encodings it advertises that the client cannot decode,
+            e.g. zstd, are decoded by urllib3.
+        :type accept_encoding: str, optional
+
         """
         if not api_key:
             raise ValueError("Must provide transit api key.")
         self.base_url = base_url
         self.api_key = api_key
         self.session = requests_session or requests.Session()
+        if transport is None and requests_session is None:
+            transport = PooledHTTPAdapter()
+        self.transport = transport
+        if transport is not None:
+            self.session.mount("http://", transport)
+            self.session.mount("https://", transport)
+        if cassette is not None:
+            cassette.mount(self.session, base_url)
         self.retry_timeout = dt.timedelta(seconds=retry_timeout)
         self.queries_per_second = queries_per_second
         self.retry_over_query_limit = retry_over_query_limit
-        # double ended queue. elements can be added to or removed from either the front (head) or back (tail)
-        self.sent_times = collections.deque([0.0], maxlen=queries_per_second)
+        self.rate_limiter = rate_limiter or TokenBucketRateLimiter(queries_per_second)
+        self.quota_scheduler = quota_scheduler
+        self.cache = cache
+        self.conditional_requests = conditional_requests
+        self.conditional_max_bytes = conditional_max_bytes
+        self._conditional_entries = collections.OrderedDict()
+        self._conditional_size = 0
+        self._conditional_lock = threading.Lock()
+        self.json_loads = get_decoder(json_decoder)
+        self.single_flight = SingleFlight() if coalesce_requests else None
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.endpoint_retry_policies = dict(endpoint_retry_policies or {})
+        self.retry_budget = retry_budget or RetryBudget()
+        self.circuit_breakers = circuit_breakers
+        self.metrics_sink = metrics_sink
+        self.hooks = hooks
+        self.accept_encoding = accept_encoding
         self.requests_kwargs = requests_kwargs or {}
 
     def _request(
         self,
         url: str,
         params: dict,
-        first_request_time: datetime.datetime = None,
-        retry_counter: int = 0,
         base_url: str = None,
         extract_body=None,
         requests_kwargs: dict = None,
     ) -> dict:
 
         """
-        Performs HTTP GET/POST with credentials, returning the body as
-        JSON.
+        Performs HTTP GET with credentials, returning the body as
+        JSON. Failed requests are retried as the retry policy of the endpoint
+        permits.
 
         :param url: URL path for the request. Should begin with a slash.
         :type url: string
@@ -96,13 +227,6 @@ class SiriClient:
         :param params: HTTP GET parameters.
         :type params: dict or list of key/value tuples
 
-        :param first_request_time: The time of the first request (None if no
-            retries have occurred).
-        :type first_request_time: datetime.datetime
-
-        :param retry_counter: The number of this retry, or zero for first attempt.
-        :type retry_counter: int
-
         :param base_url: The base URL for the request. Defaults to the Maps API
             server. Should not have a trailing slash.
         :type base_url: string
@@ -118,6 +242,9 @@ class SiriClient:
         :type requests_kwargs: dict
 
         :raises ApiError: when the API returns an error.
+        :raises OverQueryLimit: when the API answers 429 Too Many Requests and
+            the request is not retried, or when the hourly quota scheduler
+            rejects the request.
         :raises Timeout: if the request timed out.
         :raises TransportError: when something went wrong while trying to
             execute a request.
@@ -125,76 +252,376 @@ class SiriClient:
         if base_url is None:
             base_url = self.base_url
 
-        if not first_request_time:
-            first_request_time = dt.datetime.now()
+        cache_key = None
+        if (self.cache is not None or self.conditional_requests) and extract_body is None:
+            cache_key = self._generate_cache_key(url, params, base_url)
+        if self.cache is not None and cache_key is not None:
+            cached_body = self._get_cached_body(cache_key)
+            if cached_body is not None:
+                return cached_body
+
+        if self.single_flight is not None and not extract_body and not requests_kwargs:
+            # the thread that sends the request also runs its retries, the others wait for the outcome
+            return self.single_flight.do(
+                base_url + self._generate_auth_url(url, params),
+                self._send_request,
+                url,
+                params,
+                base_url,
+                cache_key=cache_key,
+            )
+        return self._send_request(url, params, base_url, extract_body, requests_kwargs, cache_key)
 
-        elapsed = dt.datetime.now() - first_request_time
-        if elapsed > self.retry_timeout:
-            raise siri_transit_api_client.exceptions.Timeout()
+    def _send_request(
+        self,
+        url: str,
+        params: dict,
+        base_url: str,
+        extract_body=None,
+        requests_kwargs: dict = None,
+        cache_key: str = None,
+    ) -> dict:
+        if self.hooks is None:
+            return self._send_attempts(url, params, base_url, extract_body, requests_kwargs, cache_key)
 
-        if retry_counter > 0:
-            # implement full jitter algorithm
-            cap = 1e3
-            exp_base = 2
-            multiple = 1
-            delay_seconds = min(cap, multiple * exp_base ** retry_counter) * random.random()
-            time.sleep(delay_seconds)
+        event = RequestEvent(url, dict(params or {}), self._generate_cache_key(url, params, base_url))
+        try:
+            return self._send_attempts(url, params, base_url, extract_body, requests_kwargs, cache_key, event)
+        except Exception as e:
+            event.error = e
+            self.hooks.error(event)
+            raise
 
+    def _send_attempts(
+        self,
+        url: str,
+        params: dict,
+        base_url: str,
+        extract_body=None,
+        requests_kwargs: dict = None,
+        cache_key: str = None,
+        event: RequestEvent = None,
+    ) -> dict:
         authed_url = self._generate_auth_url(url, params)
 
         # Default to the client-level self.requests_kwargs, with method-level
         # requests_kwargs arg overriding.
         requests_kwargs = requests_kwargs or {}
         final_requests_kwargs = dict(self.requests_kwargs, **requests_kwargs)
+        streamed = final_requests_kwargs.get("stream", False)
+        # the body is read by the client, to decompress it as it is received and to time the transfer
+        final_requests_kwargs["stream"] = True
+        if self.accept_encoding is not None:
+            final_requests_kwargs["headers"] = dict(
+                {"Accept-Encoding": self.accept_encoding}, **(final_requests_kwargs.get("headers") or {})
+            )
 
-        requests_method = self.session.get
+        policy = self._retry_policy(url)
+        timeout = self.retry_timeout.total_seconds() if policy.deadline is None else policy.deadline
+        deadline = time.monotonic() + timeout
+        breaker = self.circuit_breakers.breaker(url) if self.circuit_breakers is not None else None
+        sink = self.metrics_sink
+        labels = {"endpoint": url}
+        timed = sink is not None or event is not None
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            if attempt > 0 and time.monotonic() > deadline:
+                raise siri_transit_api_client.exceptions.Timeout()
+            attempt += 1
+            if breaker is not None and not breaker.allow():
+                # nothing is sent, so on_request is not called; the CircuitOpen raised reaches on_error
+                stale_body = self._get_stale_body(cache_key)
+                if stale_body is not None:
+                    return stale_body
+                raise siri_transit_api_client.exceptions.CircuitOpen(url, breaker.retry_in())
+
+            if event is not None:
+                event.start_attempt(attempt)
+                self.hooks.request(event)
+
+            conditional_entry = None
+            if self.conditional_requests and cache_key is not None:
+                conditional_entry = self._get_conditional_entry(cache_key)
+                if conditional_entry is not None:
+                    final_requests_kwargs["headers"] = self._conditional_headers(
+                        conditional_entry, final_requests_kwargs.get("headers")
+                    )
+
+            queue_start = time.perf_counter() if timed else 0.0
+            if self.quota_scheduler is not None:
+                try:
+                    self.quota_scheduler.acquire(url)
+                except siri_transit_api_client.exceptions.OverQueryLimit:
+                    if breaker is not None:
+                        breaker.cancel()
+                    raise
+                if sink is not None:
+                    sink.observe(metrics.QUOTA_WAIT, time.perf_counter() - queue_start, labels)
+            wait = self.rate_limiter.acquire()
+            if timed:
+                send_start = time.perf_counter()
+                if event is not None:
+                    event.timings.queue = send_start - queue_start
+                if sink is not None and wait:
+                    sink.observe(metrics.RATE_LIMIT_WAIT, wait, labels)
+            try:
+                if event is None:
+                    response = self.session.get(base_url + authed_url, **final_requests_kwargs)
+                    if not streamed:
+                        self._read_content(response, labels)
+                else:
+                    response = self._timed_get(
+                        base_url + authed_url, final_requests_kwargs, streamed, event, send_start, labels
+                    )
+            except requests.exceptions.Timeout:
+                self._record_outcome(breaker, siri_transit_api_client.exceptions.Timeout())
+                if sink is not None:
+                    duration = time.perf_counter() - send_start
+                    sink.observe(metrics.REQUEST_DURATION, duration, dict(labels, status="timeout"))
+                raise siri_transit_api_client.exceptions.Timeout()
+            except Exception as e:
+                self._record_outcome(breaker, siri_transit_api_client.exceptions.TransportError(e))
+                if sink is not None:
+                    duration = time.perf_counter() - send_start
+                    sink.observe(metrics.REQUEST_DURATION, duration, dict(labels, status="error"))
+                raise siri_transit_api_client.exceptions.TransportError(e)
+            if sink is not None:
+                sink.observe(
+                    metrics.REQUEST_DURATION, time.perf_counter() - send_start,
+                    dict(labels, status=str(response.status_code)),
+                )
+            if event is not None:
+                event.status = response.status_code
+
+            error = None
+            retry_after = None
+            if response.status_code in policy.retry_statuses:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    error = siri_transit_api_client.exceptions.OverQueryLimit(429, response.text)
+                else:
+                    error = siri_transit_api_client.exceptions.HTTPError(response.status_code)
+                response.close()
+                self._record_outcome(breaker, error)
+                self._hook_response(event, error)
+                if response.status_code == 429 and not self.retry_over_query_limit:
+                    raise error
+            elif response.status_code == 304 and conditional_entry is not None:
+                self._record_outcome(breaker)
+                self._hook_response(event)
+                if self.cache is not None:
+                    # the remembered response is still current, cache it again for its ttl
+                    self.cache.set(cache_key, url, conditional_entry.body, conditional_entry.content)
+                return conditional_entry.body
+            else:
+                try:
+                    result = self._extract_body(response, extract_body, labels, event)
+                except siri_transit_api_client.exceptions.RetriableRequest as e:
+                    error = e
+                    self._record_outcome(breaker, e)
+                    self._hook_response(event, e)
+                except Exception as e:
+                    self._record_outcome(breaker, e)
+                    self._hook_response(event, e)
+                    raise
+                else:
+                    self._record_outcome(breaker)
+                    self._hook_response(event)
+                    if self.cache is not None and cache_key is not None:
+                        self.cache.set(cache_key, url, result, response.content)
+                    if self.conditional_requests and cache_key is not None:
+                        self._set_conditional_entry(cache_key, response, result)
+                    return result
+
+            delay = policy.next_delay(attempt, deadline - time.monotonic(), retry_after)
+            if delay is None or not self.retry_budget.withdraw():
+                if type(error) is siri_transit_api_client.exceptions.RetriableRequest:
+                    # a Status "false" body is reported as a timeout once it is no longer retried, as it always was
+                    raise siri_transit_api_client.exceptions.Timeout() from error
+                raise error
+            if sink is not None:
+                sink.observe(metrics.RETRIES, 1, dict(labels, status=str(response.status_code)))
+                sink.observe(metrics.BACKOFF, delay, labels)
+            if event is not None:
+                event.delay = delay
+                self.hooks.retry(event)
+            time.sleep(delay)
+
+    def _timed_get(
+        self, url: str, requests_kwargs: dict, streamed: bool, event: RequestEvent, send_start: float, labels: dict
+    ) -> requests.Response:
+        timings = event.timings
+        with measure_connect(timings):
+            response = self.session.get(url, **requests_kwargs)
+        headers_received = time.perf_counter()
+        timings.ttfb = headers_received - send_start - (timings.connect or 0.0)
+        if not streamed:
+            self._read_content(response, labels, timings)
+            timings.transfer = time.perf_counter() - headers_received - timings.decompress
+        return response
+
+    def _read_content(self, response: requests.Response, labels: dict, timings: RequestTimings = None) -> None:
+        """
+        Reads the whole content of a response, which requests keeps for later use, decompressing it as it is
+        received.
+        """
+        decoder = ContentDecoder(response.headers.get("Content-Encoding"))
+        read_content(response, decoder)
+        if timings is not None:
+            timings.decompress = decoder.duration
+        self._observe_content(decoder, labels)
+
+    def _observe_content(self, decoder: ContentDecoder, labels: dict) -> None:
+        if self.metrics_sink is None:
+            return
+        self.metrics_sink.observe(metrics.RESPONSE_BYTES, decoder.content_bytes, labels)
+        self.metrics_sink.observe(metrics.WIRE_BYTES, decoder.wire_bytes, labels)
+        if decoder.compressed:
+            self.metrics_sink.observe(metrics.DECOMPRESS_DURATION, decoder.duration, labels)
+
+    def _hook_response(self, event: RequestEvent, error: Exception = None) -> None:
+        if event is not None:
+            event.error = error
+            self.hooks.response(event)
+
+    def _extract_body(self, response: requests.Response, extract_body, labels: dict, event: RequestEvent = None):
+        timings = event.timings if event is not None and extract_body is None else None
+        extract_body = extract_body or self._get_body
+        if self.metrics_sink is None:
+            return extract_body(response) if timings is None else extract_body(response, timings)
+        start = time.perf_counter()
         try:
-            response = requests_method(base_url + authed_url, **final_requests_kwargs)
-        except requests.exceptions.Timeout:
-            raise siri_transit_api_client.exceptions.Timeout()
-        except Exception as e:
-            raise siri_transit_api_client.exceptions.TransportError(e)
+            return extract_body(response) if timings is None else extract_body(response, timings)
+        finally:
+            self.metrics_sink.observe(metrics.DECODE_DURATION, time.perf_counter() - start, labels)
+
+    @staticmethod
+    def _record_outcome(breaker, error: Exception = None) -> None:
+        if breaker is None:
+            return
+        if error is not None and is_throttled(error):
+            # a throttled trial neither closes the circuit nor counts as a failure
+            breaker.cancel()
+        elif error is not None and is_failure(error):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
 
-        if response.status_code in _RETRIABLE_STATUSES:
-            # Retry request.
-            return self._request(
-                url,
-                params,
-                first_request_time,
-                retry_counter + 1,
-                base_url,
-                extract_body,
-                requests_kwargs,
-            )
+    def _get_stale_body(self, cache_key: str):
+        """
+        Returns the last response kept for a request by the cache or by conditional requests, even if it has expired,
+        or None.
+        """
+        if cache_key is None:
+            return None
+        if getattr(self.cache, "get_stale", None) is not None:
+            body = self._get_cached_body(cache_key, stale=True)
+            if body is not None:
+                return body
+        if self.conditional_requests:
+            entry = self._get_conditional_entry(cache_key)
+            if entry is not None:
+                return entry.body
+        return None
+
+    def _get_cached_body(self, cache_key: str, stale: bool = False):
+        """
+        Returns the body cached for a request, or None. The raw content of a cache that has no loads of its own is
+        parsed with the json_decoder of this client, so clients with different decoders can share the cache.
+        """
+        if getattr(self.cache, "get_content", None) is None or self.cache.loads is not None:
+            return self.cache.get_stale(cache_key) if stale else self.cache.get(cache_key)
+        content = self.cache.get_content(cache_key, stale=stale)
+        if content is None:
+            return None
+        return self.json_loads(strip_bom(content))
+
+    def _retry_policy(self, endpoint: str) -> RetryPolicy:
+        return self.endpoint_retry_policies.get(endpoint, self.retry_policy)
+
+    def _stream_request(self, url: str, params: dict, key: str, chunk_size: int = _STREAM_CHUNK_SIZE):
+        """
+        Performs HTTP GET with credentials and yields the records stored under key as the body is downloaded.
+
+        :param url: URL path for the request.
+        :type url: string
 
-        # Check if the time of the nth previous query (where n is
-        # queries_per_second) is under a second ago - if so, sleep for
-        # the difference.
-        if self.sent_times and len(self.sent_times) == self.queries_per_second:
-            elapsed_since_earliest = time.time() - self.sent_times[0]
-            if elapsed_since_earliest < 1:
-                time.sleep(1 - elapsed_since_earliest)
+        :param params: HTTP GET parameters.
+        :type params: dict
+
+        :param key: Name of the object member holding the array of records.
+        :type key: string
+
+        :param chunk_size: Number of bytes read from the connection at a time.
+        :type chunk_size: int
 
+        :raises ApiError: when the API returns an error.
+        :raises Timeout: if the request timed out.
+        :raises TransportError: when something went wrong while trying to
+            execute a request.
+        """
+        response = self._request(url, params, extract_body=self._get_stream, requests_kwargs={"stream": True})
+        decoder = ContentDecoder(response.headers.get("Content-Encoding"))
         try:
-            if extract_body:
-                result = extract_body(response)
-            else:
-                result = self._get_body(response)
-            self.sent_times.append(time.time())
-            return result
-        except siri_transit_api_client.exceptions.RetriableRequest as e:
-            # Retry request.
-            return self._request(
-                url,
-                params,
-                first_request_time,
-                retry_counter + 1,
-                base_url,
-                extract_body,
-                requests_kwargs,
-            )
+            yield from iter_array_items(iter_decoded(response, chunk_size, decoder), key)
+        except requests.exceptions.RequestException as e:
+            raise siri_transit_api_client.exceptions.TransportError(e)
+        finally:
+            response.close()
+            self._observe_content(decoder, {"endpoint": url})
+
+    def _get_stream(self, response: requests.Response) -> requests.Response:
+        if response.status_code != 200:
+            # reads the whole body to raise the matching exception
+            self._get_body(response)
+        return response
+
+    def _get_conditional_entry(self, key: str):
+        with self._conditional_lock:
+            entry = self._conditional_entries.get(key)
+            if entry is not None:
+                self._conditional_entries.move_to_end(key)
+            return entry
+
+    def _set_conditional_entry(self, key: str, response: requests.Response, body) -> None:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        size = len(response.content)
+        with self._conditional_lock:
+            previous = self._conditional_entries.pop(key, None)
+            if previous is not None:
+                self._conditional_size -= previous.size
+            if (etag is None and last_modified is None) or size > self.conditional_max_bytes:
+                return
+            # the raw content is only needed to store the body again in the cache after a 304
+            content = response.content if self.cache is not None else None
+            self._conditional_entries[key] = _ConditionalEntry(etag, last_modified, body, content, size)
+            self._conditional_size += size
+            while self._conditional_size > self.conditional_max_bytes:
+                self._conditional_size -= self._conditional_entries.popitem(last=False)[1].size
+
+    @staticmethod
+    def _conditional_headers(entry: _ConditionalEntry, headers: dict = None) -> dict:
+        """
+        Returns the request headers with the validators of a previous response added.
+
+        :param entry: Validators and body remembered from the previous response.
+        :type entry: _ConditionalEntry
 
-    def _get_body(self, response: requests.Response) -> dict:
+        :param headers: Headers already set for the request.
+        :type headers: dict
+
+        :rtype: dict
+        """
+        headers = dict(headers or {})
+        if entry.etag is not None:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified is not None:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def _get_body(self, response: requests.Response, timings: RequestTimings = None) -> dict:
         status_code = response.status_code
         if status_code == 400:
             raise siri_transit_api_client.exceptions.ApiError("error", response.text)
@@ -205,8 +632,15 @@ class SiriClient:
         elif status_code != 200:
             raise siri_transit_api_client.exceptions.HTTPError(response.status_code)
 
-        decoded_data = response.content.decode("utf-8-sig")
-        body = json.loads(decoded_data)
+        if timings is None:
+            body = self.json_loads(strip_bom(response.content))
+        else:
+            start = time.perf_counter()
+            content = strip_bom(response.content)
+            stripped = time.perf_counter()
+            body = self.json_loads(content)
+            timings.bom = stripped - start
+            timings.parse = time.perf_counter() - stripped
         if body and type(body) is list:
             return body
         if body and type(body) is dict:
@@ -242,6 +676,26 @@ class SiriClient:
         else:
             return start_str
 
+    def _generate_cache_key(self, path: str, params: dict, base_url: str = None) -> str:
+        """
+        Returns the key identifying a request in the response cache: the full request URL without the api key.
+
+        :param path: The path portion of the URL.
+        :type path: string
+
+        :param params: URL parameters.
+        :type params: dict
+
+        :param base_url: The base URL for the request. Defaults to the client base url.
+        :type base_url: string
+
+        :rtype: string
+        """
+        key = (base_url or self.base_url) + path + "?Format=json"
+        if params:
+            return key + "&" + urllib.parse.urlencode(params)
+        return key
+
     def holidays(self, operator_id: str, accept_language: str = None) -> dict:
         """
         Query the 511 api to get the holidays for a transit operator.
@@ -394,6 +848,31 @@ class SiriClient:
 
         return self._request("StopMonitoring", params)
 
+    def iter_stop_monitoring(
+        self, agency: str, stop_code: str = None, chunk_size: int = _STREAM_CHUNK_SIZE
+    ) -> typing.Iterator[dict]:
+        """
+        Stream the stop monitoring information of an agency, yielding each MonitoredStopVisit as soon as it has been
+        downloaded. Only one visit is held in memory at a time, which keeps agency wide queries cheap.
+
+        :param agency: agency ID to be monitored
+        :type agency: str
+
+        :param stop_code:  stop ID to be monitored
+        :type stop_code: str, optional
+
+        :param chunk_size: Number of bytes read from the connection at a time.
+        :type chunk_size: int, optional
+
+        :return: MonitoredStopVisit records
+        :rtype: iterator of dict
+        """
+        params = {"agency": agency}
+        if stop_code:
+            params["stopCode"] = stop_code
+
+        return self._stream_request("StopMonitoring", params, "MonitoredStopVisit", chunk_size)
+
     def stop_places(
         self, operator_id: str, accept_language: str = None, stop_id: str = None):
         """
@@ -573,3 +1052,86 @@ class SiriClient:
             params["vehicleID"] = vehicle_id
 
         return self._request("VehicleMonitoring", params)
+
+    def iter_vehicle_monitoring(
+        self, agency: str, vehicle_id: str = None, chunk_size: int = _STREAM_CHUNK_SIZE
+    ) -> typing.Iterator[dict]:
+        """
+        Stream the vehicle monitoring information of an agency, yielding each VehicleActivity as soon as it has been
+        downloaded. Only one activity is held in memory at a time, which keeps agency wide queries cheap.
+
+        :param agency: agency ID to be monitored
+        :type agency: str
+
+        :param vehicle_id:  vehicle ID to be monitored
+        :type vehicle_id: str, optional
+
+        :param chunk_size: Number of bytes read from the connection at a time.
+        :type chunk_size: int, optional
+
+        :return: VehicleActivity records
+        :rtype: iterator of dict
+        """
+        params = {"agency": agency}
+        if vehicle_id:
+            params["vehicleID"] = vehicle_id
+
+        return self._stream_request("VehicleMonitoring", params, "VehicleActivity", chunk_size)
+
+    def map(
+        self, endpoint: str, param_sets: typing.Iterable[dict], max_workers: int = 8
+    ) -> typing.Iterator[MapResult]:
+        """
+        Query an endpoint once per parameter set on a pool of threads, yielding the results as they finish. The
+        threads share the session, so its connections are reused, and the rate limiter, quota scheduler and cache of
+        the client, so the queries run at the permitted rate instead of one latency after the other. The session
+        created by the client keeps up to 32 connections per host; pass a PooledHTTPAdapter with a larger
+        pool_maxsize as transport to use more workers.
+
+        Closing the iterator early cancels the queries that have not started yet.
+
+        :param endpoint: Name of the endpoint method, e.g. "patterns"
+        :type endpoint: str
+
+        :param param_sets: Keyword arguments of each query, e.g. [{"operator_id": "SF", "line_id": "14"}]
+        :type param_sets: iterable of dict
+
+        :param max_workers: Number of queries run at the same time.
+        :type max_workers: int
+
+        :return: The parameters of each query with its result, or with the exception it raised
+        :rtype: iterator of MapResult
+        """
+        if endpoint not in _MAP_ENDPOINTS:
+            raise ValueError("Unknown endpoint: %s" % endpoint)
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        # the arguments are checked here, the queries start on the first next() of the returned iterator
+        return self._map(getattr(self, endpoint), param_sets, max_workers)
+
+    def _map(
+        self, method: typing.Callable, param_sets: typing.Iterable[dict], max_workers: int
+    ) -> typing.Iterator[MapResult]:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix="SiriClient")
+        pending = {}
+        try:
+            for params in param_sets:
+                # bound the queued queries so that a long iterable is not submitted all at once
+                if len(pending) >= 2 * max_workers:
+                    yield from self._completed(pending)
+                pending[executor.submit(method, **params)] = params
+            while pending:
+                yield from self._completed(pending)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def _completed(pending: dict) -> typing.Iterator[MapResult]:
+        done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            params = pending.pop(future)
+            error = future.exception()
+            if error is None:
+                yield MapResult(params, future.result(), None)
+            else:
+                yield MapResult(params, None, error)
@@ -0,0 +1,316 @@
+"""
+Description: This file contains a spatial index of stops for nearest stop, radius and bounding box queries. The stops
+are bucketed in a uniform grid of square cells laid over an equirectangular projection, so a query only measures the
+distance to the stops of the few cells around it instead of scanning every stop. Distances are great circle distances
+in meters.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import collections
+import heapq
+import math
+import threading
+import typing
+
+from siri_transit_api_client.poller import SnapshotDiff
+
+EARTH_RADIUS = 6371008.8
+_METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+NearbyStop = collections.namedtuple("NearbyStop", ["distance", "stop"])
+
+
+def haversine(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """
+    Great circle distance between two points in meters.
+
+    :rtype: float
+    """
+    phi1 = math.radians(latitude1)
+    phi2 = math.radians(latitude2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(longitude2 - longitude1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def stop_key(stop) -> typing.Hashable:
+    """
+    Identify a stop by its id.
+    """
+    return stop.id
+
+
+class StopIndex:
+    def __init__(self, stops: typing.Iterable = (), cell_size: float = 500, key: typing.Callable = None,
+                 reference_latitude: float = None):
+        """
+        Grid index of stops. Any record with latitude and longitude attributes can be indexed, e.g. the Stop records
+        built by models.stops and models.stop_places; records without a location are left out. The index is safe to
+        query from several threads while it is refreshed.
+
+        :param stops: Stops to index
+        :type stops: iterable of Stop
+
+        :param cell_size: Side of the grid cells in meters. About the typical query radius, or the distance holding a
+            handful of stops, works best.
+        :type cell_size: float
+
+        :param key: Function identifying a stop, used to update or remove it. Defaults to the stop id; use e.g.
+            lambda stop: (operator_id, stop.id) when indexing the stops of several operators whose ids overlap.
+        :type key: function, optional
+
+        :param reference_latitude: Latitude where the cells are square. Defaults to the latitude of the first stop
+            indexed. The cells stay usable hundreds of kilometers away from it.
+        :type reference_latitude: float, optional
+        """
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive.")
+        self.cell_size = cell_size
+        self.key = key or stop_key
+        self._lock = threading.RLock()
+        # key -> (latitude, longitude, cell, stop)
+        self._entries = {}
+        # cell -> {key: (latitude, longitude, stop)}
+        self._cells = collections.defaultdict(dict)
+        # only grows, it bounds how much narrower than cell_size the cells can be
+        self._max_abs_latitude = 0.0
+        self._set_reference(reference_latitude)
+        self.update(stops)
+
+    def _set_reference(self, latitude: typing.Optional[float]) -> None:
+        self.reference_latitude = latitude
+        if latitude is not None:
+            self._cos_reference = math.cos(math.radians(latitude))
+            self._cell_degrees = self.cell_size / _METERS_PER_DEGREE
+
+    def _cell(self, latitude: float, longitude: float) -> typing.Tuple[int, int]:
+        return (math.floor(longitude * self._cos_reference / self._cell_degrees),
+                math.floor(latitude / self._cell_degrees))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key):
+        """
+        Return the stop indexed under key, or None.
+        """
+        entry = self._entries.get(key)
+        return None if entry is None else entry[3]
+
+    def _add(self, key, stop) -> None:
+        if self.reference_latitude is None:
+            self._set_reference(stop.latitude)
+        self._max_abs_latitude = max(self._max_abs_latitude, abs(stop.latitude))
+        cell = self._cell(stop.latitude, stop.longitude)
+        self._entries[key] = (stop.latitude, stop.longitude, cell, stop)
+        self._cells[cell][key] = (stop.latitude, stop.longitude, stop)
+
+    def _discard(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        cell = self._cells[entry[2]]
+        del cell[key]
+        if not cell:
+            del self._cells[entry[2]]
+
+    def update(self, stops: typing.Iterable) -> None:
+        """
+        Add stops, replacing the stops indexed under the same keys.
+
+        :param stops: Stops to add or replace
+        :type stops: iterable of Stop
+        """
+        with self._lock:
+            for stop in stops:
+                key = self.key(stop)
+                self._discard(key)
+                if stop.latitude is not None and stop.longitude is not None:
+                    self._add(key, stop)
+
+    def remove(self, keys: typing.Iterable) -> None:
+        """
+        Remove the stops indexed under keys. Keys that are not indexed are ignored.
+        """
+        with self._lock:
+            for key in keys:
+                self._discard(key)
+
+    def refresh(self, stops: typing.Iterable) -> SnapshotDiff:
+        """
+        Make the index hold exactly the given stops, touching only the stops that were added, changed or removed,
+        e.g. after downloading the stops of an operator again.
+
+        :param stops: Current stops
+        :type stops: iterable of Stop
+
+        :return: Stops added, stops whose record changed and stops removed
+        :rtype: SnapshotDiff
+        """
+        current = {}
+        for stop in stops:
+            if stop.latitude is not None and stop.longitude is not None:
+                current[self.key(stop)] = stop
+        added = []
+        changed = []
+        with self._lock:
+            removed = [entry[3] for key, entry in self._entries.items() if key not in current]
+            for stop in removed:
+                self._discard(self.key(stop))
+            for key, stop in current.items():
+                entry = self._entries.get(key)
+                if entry is None:
+                    added.append(stop)
+                elif entry[3] != stop:
+                    changed.append(stop)
+                else:
+                    continue
+                self._discard(key)
+                self._add(key, stop)
+        return SnapshotDiff(added, changed, removed)
+
+    def _cell_range(self, min_latitude: float, min_longitude: float, max_latitude: float, max_longitude: float):
+        low_x, low_y = self._cell(min_latitude, min_longitude)
+        high_x, high_y = self._cell(max_latitude, max_longitude)
+        if (high_x - low_x + 1) * (high_y - low_y + 1) > len(self._cells):
+            # a box larger than the populated area is cheaper to answer from the populated cells
+            return [cell for cell in self._cells if low_x <= cell[0] <= high_x and low_y <= cell[1] <= high_y]
+        return [(x, y) for x in range(low_x, high_x + 1) for y in range(low_y, high_y + 1) if (x, y) in self._cells]
+
+    def within_bounds(self, min_latitude: float, min_longitude: float, max_latitude: float,
+                      max_longitude: float) -> list:
+        """
+        Stops inside a bounding box, e.g. the area shown on a map.
+
+        :rtype: list of Stop
+        """
+        with self._lock:
+            if not self._entries:
+                return []
+            return [stop for cell in self._cell_range(min_latitude, min_longitude, max_latitude, max_longitude)
+                    for latitude, longitude, stop in self._cells[cell].values()
+                    if min_latitude <= latitude <= max_latitude and min_longitude <= longitude <= max_longitude]
+
+    def within(self, latitude: float, longitude: float, radius: float) -> typing.List[NearbyStop]:
+        """
+        Stops at most radius meters away from a point, nearest first.
+
+        :param latitude: Latitude of the point
+        :type latitude: float
+
+        :param longitude: Longitude of the point
+        :type longitude: float
+
+        :param radius: Distance in meters
+        :type radius: float
+
+        :rtype: list of NearbyStop
+        """
+        latitude_span = radius / _METERS_PER_DEGREE
+        # the longitude span of the circle is widest on its side nearest to the pole
+        cos_latitude = math.cos(math.radians(min(89.9, abs(latitude) + latitude_span)))
+        longitude_span = min(180.0, latitude_span / cos_latitude)
+        with self._lock:
+            if not self._entries:
+                return []
+            cells = self._cell_range(latitude - latitude_span, longitude - longitude_span,
+                                     latitude + latitude_span, longitude + longitude_span)
+            found = []
+            for cell in cells:
+                for stop_latitude, stop_longitude, stop in self._cells[cell].values():
+                    distance = haversine(latitude, longitude, stop_latitude, stop_longitude)
+                    if distance <= radius:
+                        found.append(NearbyStop(distance, stop))
+        found.sort(key=lambda nearby: nearby.distance)
+        return found
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1,
+                max_distance: float = None) -> typing.List[NearbyStop]:
+        """
+        The k stops nearest to a point, nearest first.
+
+        :param latitude: Latitude of the point
+        :type latitude: float
+
+        :param longitude: Longitude of the point
+        :type longitude: float
+
+        :param k: Number of stops
+        :type k: int
+
+        :param max_distance: Distance in meters beyond which stops are not returned, even if fewer than k are found.
+        :type max_distance: float, optional
+
+        :rtype: list of NearbyStop
+        """
+        if k < 1:
+            return []
+        with self._lock:
+            if not self._entries:
+                return []
+            center_x, center_y = self._cell(latitude, longitude)
+            # the cells are narrower than cell_size east to west poleward of the reference latitude
+            poleward = math.radians(max(abs(latitude), self._max_abs_latitude))
+            shrink = min(1.0, math.cos(poleward) / self._cos_reference)
+            # max heap of the k nearest stops found so far, the counter keeps stops from being compared
+            best = []
+            counter = 0
+
+            def visit(cell):
+                nonlocal counter
+                for stop_latitude, stop_longitude, stop in self._cells[cell].values():
+                    distance = haversine(latitude, longitude, stop_latitude, stop_longitude)
+                    counter += 1
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, counter, stop))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, counter, stop))
+
+            def done(reach):
+                return (len(best) == k and -best[0][0] <= reach) or (max_distance is not None and reach > max_distance)
+
+            ring = 0
+            while (2 * ring + 1) ** 2 <= len(self._cells):
+                for cell in self._ring(center_x, center_y, ring):
+                    if cell in self._cells:
+                        visit(cell)
+                # the stops in the cells beyond this ring are at least this far away
+                if done(ring * self.cell_size * shrink * 0.99):
+                    break
+                ring += 1
+            else:
+                # the next rings hold more cells than are populated, e.g. far away from the stops: visit the populated
+                # cells left nearest first instead, by the distance to their center less the reach of their corners
+                corner = 0.5 * self.cell_size * (1 + 1 / self._cos_reference)
+                remaining = sorted(
+                    (haversine(latitude, longitude, *self._cell_center(cell)) - corner, cell) for cell in self._cells
+                    if max(abs(cell[0] - center_x), abs(cell[1] - center_y)) >= ring
+                )
+                for bound, cell in remaining:
+                    if done(bound):
+                        break
+                    visit(cell)
+        nearest = [NearbyStop(-distance, stop) for distance, _, stop in sorted(best, reverse=True)]
+        if max_distance is not None:
+            nearest = [nearby for nearby in nearest if nearby.distance <= max_distance]
+        return nearest
+
+    def _cell_center(self, cell: typing.Tuple[int, int]) -> typing.Tuple[float, float]:
+        latitude = (cell[1] + 0.5) * self._cell_degrees
+        longitude = (cell[0] + 0.5) * self._cell_degrees / self._cos_reference
+        return latitude, longitude
+
+    @staticmethod
+    def _ring(center_x: int, center_y: int, ring: int) -> typing.Iterator[typing.Tuple[int, int]]:
+        if ring == 0:
+            yield center_x, center_y
+            return
+        for x in range(center_x - ring, center_x + ring + 1):
+            yield x, center_y - ring
+            yield x, center_y + ring
+        for y in range(center_y - ring + 1, center_y + ring):
+            yield center_x - ring, y
+            yield center_x + ring, y
@@ -0,0 +1,139 @@
+"""
+Description: This file contains an incremental JSON parser that yields the records of a large response one at a time
+while the response is still being downloaded. Only the record being parsed is held in memory, so the memory used stays
+flat however large the response is.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import codecs
+import json
+import re
+import typing
+
+_STRUCTURE = re.compile(rb'["\[]')
+_STRING_END = re.compile(rb'["\\]')
+_WHITESPACE = b" \t\r\n"
+_SEPARATOR = re.compile(r"[\s,]*")
+_DECODER = json.JSONDecoder()
+
+
+def _find_array(chunks: typing.Iterator[bytes], target: bytes) -> typing.Optional[bytearray]:
+    """
+    Read chunks until the array stored under target has been opened, returning what was read after the opening
+    bracket, or None if the document ends first.
+    """
+    buffer = bytearray()
+    pos = 0
+    in_string = False
+    string_start = None
+    # the last string that has been read, as (start, end) offsets in the buffer
+    last_string = None
+    first_chunk = True
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer += chunk
+        if first_chunk:
+            if len(buffer) < len(codecs.BOM_UTF8) and codecs.BOM_UTF8.startswith(bytes(buffer)):
+                continue
+            if buffer.startswith(codecs.BOM_UTF8):
+                del buffer[:len(codecs.BOM_UTF8)]
+            first_chunk = False
+
+        while True:
+            if in_string:
+                match = _STRING_END.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                if match.group() == b"\\":
+                    if match.end() >= len(buffer):
+                        # the escaped character is in the next chunk
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                in_string = False
+                pos = match.end()
+                last_string = (string_start, pos)
+                continue
+
+            match = _STRUCTURE.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            pos = match.end()
+            if match.group() == b'"':
+                in_string = True
+                string_start = match.start()
+            elif match.group() == b"[" and last_string is not None and \
+                    buffer[last_string[0]:last_string[1]] == target and \
+                    buffer[last_string[1]:match.start()].strip(_WHITESPACE) == b":":
+                return buffer[pos:]
+
+        # drop the part of the buffer that is no longer needed
+        if in_string:
+            # the string being read replaces the last string as the candidate key
+            keep_from = string_start
+            last_string = None
+        else:
+            keep_from = last_string[0] if last_string is not None else pos
+        if keep_from:
+            del buffer[:keep_from]
+            pos -= keep_from
+            if in_string:
+                string_start -= keep_from
+            if last_string is not None:
+                last_string = (last_string[0] - keep_from, last_string[1] - keep_from)
+    return None
+
+
+def iter_array_items(chunks: typing.Iterable[bytes], key: str) -> typing.Iterator:
+    """
+    Parse the JSON document delivered in chunks and yield the items of the first array stored under key, e.g. the
+    VehicleActivity records of a VehicleMonitoring response. The items of the array must be objects or arrays.
+
+    :param chunks: Consecutive pieces of the UTF-8 encoded JSON document, optionally starting with a byte order mark.
+    :type chunks: iterable of bytes
+
+    :param key: Name of the object member holding the array.
+    :type key: str
+
+    :return: Parsed items of the array, in order.
+    :rtype: iterator
+
+    :raises json.JSONDecodeError: if the document ends inside the array.
+    """
+    chunks = iter(chunks)
+    rest = _find_array(chunks, json.dumps(key).encode("utf-8"))
+    if rest is None:
+        return
+
+    # the items are parsed by the C decoder as soon as they are complete; the decoder raises on an item that is cut
+    # off by the end of the text read so far, in which case the item is parsed again once more text has arrived
+    utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+    text = utf8_decoder.decode(bytes(rest))
+    pos = 0
+    error = None
+    while True:
+        while True:
+            pos = _SEPARATOR.match(text, pos).end()
+            if pos == len(text):
+                break
+            if text[pos] == "]":
+                return
+            try:
+                item, pos = _DECODER.raw_decode(text, pos)
+            except json.JSONDecodeError as e:
+                error = e
+                break
+            error = None
+            yield item
+        chunk = next(chunks, None)
+        if chunk is None:
+            if error is None:
+                error = json.JSONDecodeError("Unterminated array", text, pos)
+            raise error
+        text = text[pos:] + utf8_decoder.decode(chunk)
+        pos = 0
@@ -0,0 +1,325 @@
+"""
+Description: This file contains the transport adapters SiriClient can send its requests with: PooledHTTPAdapter, a
+requests adapter with a connection pool sized for parallel requests and TCP keep-alive, and HTTPXAdapter, which sends
+the requests with httpx so that they can be multiplexed over HTTP/2 connections. Both count the requests they send,
+the connections they open and the TLS handshakes they make, to compare them.
+
+@author: Robert Hennessy (robertghennessy@gmail.com)
+"""
+import collections
+import io
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import DEFAULT_POOLBLOCK, BaseAdapter, HTTPAdapter
+from urllib3 import PoolManager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.response import HTTPResponse
+from urllib3.util import Timeout as Urllib3Timeout
+
+from siri_transit_api_client.hooks import (
+    TimedHTTPAdapter,
+    _add_connect,
+    _TimedHTTPConnection,
+    _TimedHTTPConnectionPool,
+    _TimedHTTPSConnection,
+    _TimedHTTPSConnectionPool,
+)
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - exercised only when the optional dependency is missing
+    httpx = None
+
+TransportStats = collections.namedtuple("TransportStats", ["requests", "connections", "tls_handshakes"])
+
+# headers describing the framing of the content, which httpx has already removed
+_WIRE_HEADERS = {"content-length", "transfer-encoding"}
+
+
+class _TransportCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+
+    def add(self, sent: int = 0, connections: int = 0, tls_handshakes: int = 0) -> None:
+        with self._lock:
+            self.requests += sent
+            self.connections += connections
+            self.tls_handshakes += tls_handshakes
+
+    def stats(self) -> TransportStats:
+        with self._lock:
+            return TransportStats(self.requests, self.connections, self.tls_handshakes)
+
+
+def keep_alive_options(idle: float, interval: float = None, count: int = 4) -> list:
+    """
+    Socket options enabling TCP keep-alive probes, so that idle pooled connections are kept open by middleboxes and
+    dead ones are detected. The timing options are only set on platforms that support them.
+
+    :param idle: Seconds a connection is idle before the first probe
+    :type idle: float
+
+    :param interval: Seconds between probes. Defaults to a quarter of idle.
+    :type interval: float, optional
+
+    :param count: Number of unanswered probes after which the connection is dropped
+    :type count: int
+
+    :rtype: list of tuple
+    """
+    interval = idle / 4 if interval is None else interval
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    # macOS names TCP_KEEPIDLE TCP_KEEPALIVE
+    idle_option = getattr(socket, "TCP_KEEPIDLE", getattr(socket, "TCP_KEEPALIVE", None))
+    for option, value in ((idle_option, idle), (getattr(socket, "TCP_KEEPINTVL", None), interval),
+                          (getattr(socket, "TCP_KEEPCNT", None), count)):
+        if option is not None:
+            options.append((socket.IPPROTO_TCP, option, max(1, int(value))))
+    return options
+
+
+class _CountingConnectMixin:
+    counter = None
+
+    def connect(self):
+        super().connect()
+        if self.counter is not None:
+            self.counter.add(connections=1, tls_handshakes=int(isinstance(self, HTTPSConnection)))
+
+
+class _CountingHTTPConnection(_CountingConnectMixin, _TimedHTTPConnection):
+    pass
+
+
+class _CountingHTTPSConnection(_CountingConnectMixin, _TimedHTTPSConnection):
+    pass
+
+
+class _CountingPoolMixin:
+    counter = None
+
+    def _new_conn(self):
+        conn = super()._new_conn()
+        conn.counter = self.counter
+        return conn
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, _TimedHTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, _TimedHTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _CountingPoolManager(PoolManager):
+    def __init__(self, counter: _TransportCounter, **kwargs):
+        super().__init__(**kwargs)
+        self.counter = counter
+        self.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.counter = self.counter
+        return pool
+
+
+class PooledHTTPAdapter(TimedHTTPAdapter):
+    __attrs__ = TimedHTTPAdapter.__attrs__ + ["keep_alive"]
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 32,
+        pool_block: bool = DEFAULT_POOLBLOCK,
+        keep_alive: float = 60,
+        max_retries: int = 0,
+    ):
+        """
+        Requests adapter keeping enough connections open for parallel requests. SiriClient mounts one on the session it
+        creates. Like TimedHTTPAdapter, it measures the connection time reported to the request hooks.
+
+        :param pool_connections: Number of hosts whose connection pools are kept.
+        :type pool_connections: int
+
+        :param pool_maxsize: Maximum number of connections kept open per host. Set it to at least the number of
+            threads sharing the client, otherwise the connections opened beyond it are closed after each request.
+        :type pool_maxsize: int
+
+        :param pool_block: If True, no more than pool_maxsize connections are opened per host and requests wait for
+            a free one. Otherwise the extra connections are opened and discarded after use.
+        :type pool_block: bool
+
+        :param keep_alive: Seconds a connection is idle before TCP keep-alive probes are sent, None to disable them.
+        :type keep_alive: float, optional
+
+        :param max_retries: Retries of failed connections done by urllib3. The client retries the requests itself.
+        :type max_retries: int
+        """
+        self.keep_alive = keep_alive
+        self._counter = _TransportCounter()
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries,
+                         pool_block=pool_block)
+
+    def init_poolmanager(self, connections, maxsize, block=DEFAULT_POOLBLOCK, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        if self.keep_alive is not None:
+            pool_kwargs.setdefault(
+                "socket_options", HTTPConnection.default_socket_options + keep_alive_options(self.keep_alive)
+            )
+        self.poolmanager = _CountingPoolManager(self._counter, num_pools=connections, maxsize=maxsize, block=block,
+                                                **pool_kwargs)
+
+    def __setstate__(self, state):
+        self._counter = _TransportCounter()
+        super().__setstate__(state)
+
+    def send(self, request, **kwargs):
+        self._counter.add(sent=1)
+        return super().send(request, **kwargs)
+
+    def stats(self) -> TransportStats:
+        """
+        Requests sent, connections opened and TLS handshakes made since the adapter was created.
+
+        :rtype: TransportStats
+        """
+        return self._counter.stats()
+
+
+class _ChunkReader(io.RawIOBase):
+    """
+    File object reading the content of an httpx response as it is received, still compressed.
+    """
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = response.iter_raw()
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            self._pending = next(self._chunks, None)
+            if self._pending is None:
+                self._pending = b""
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self) -> None:
+        self._response.close()
+        super().close()
+
+
+def _httpx_timeout(timeout):
+    if isinstance(timeout, Urllib3Timeout):
+        return httpx.Timeout(timeout.read_timeout, connect=timeout.connect_timeout)
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+class HTTPXAdapter(BaseAdapter):
+    def __init__(self, http2: bool = True, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 60, verify=True):
+        """
+        Requests adapter sending the requests with httpx. With http2, the requests to a host supporting HTTP/2 are
+        multiplexed over a single connection instead of each needing a connection of its own. Requires httpx with
+        HTTP/2 support: pip install siri-transit-api-client[http2]
+
+        :param http2: If True, HTTP/2 is negotiated with the hosts supporting it.
+        :type http2: bool
+
+        :param max_connections: Maximum number of connections open at once.
+        :type max_connections: int
+
+        :param max_keepalive_connections: Maximum number of idle connections kept open.
+        :type max_keepalive_connections: int
+
+        :param keepalive_expiry: Seconds an idle connection is kept open.
+        :type keepalive_expiry: float
+
+        :param verify: Certificate verification, as the verify argument of httpx.Client. The verify and cert
+            arguments of each request are ignored.
+        :type verify: bool or str or ssl.SSLContext
+        """
+        if httpx is None:
+            raise ImportError("HTTPXAdapter requires httpx: pip install siri-transit-api-client[http2]")
+        super().__init__()
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections,
+                              keepalive_expiry=keepalive_expiry)
+        self.client = httpx.Client(http2=http2, limits=limits, verify=verify, follow_redirects=False)
+        self._counter = _TransportCounter()
+        self._started = threading.local()
+
+    def _trace(self, name: str, info: dict) -> None:
+        # called by httpcore in the thread sending the request, so the connection time goes to its request hooks
+        if name in ("connection.connect_tcp.started", "connection.start_tls.started"):
+            self._started.at = time.perf_counter()
+        elif name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            if name == "connection.connect_tcp.complete":
+                self._counter.add(connections=1)
+            else:
+                self._counter.add(tls_handshakes=1)
+            _add_connect(time.perf_counter() - self._started.at)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        self._counter.add(sent=1)
+        httpx_request = self.client.build_request(
+            request.method,
+            request.url,
+            headers=request.headers,
+            content=request.body,
+            timeout=_httpx_timeout(timeout),
+            extensions={"trace": self._trace},
+        )
+        try:
+            response = self.client.send(httpx_request, stream=True)
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(e, request=request)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+        raw = HTTPResponse(
+            body=_ChunkReader(response),
+            headers=[(name, value) for name, value in response.headers.multi_items()
+                     if name.lower() not in _WIRE_HEADERS],
+            status=response.status_code,
+            version=20 if response.http_version == "HTTP/2" else 11,
+            reason=response.reason_phrase,
+            preload_content=False,
+            decode_content=False,
+        )
+        # builds the requests response exactly as HTTPAdapter does for a urllib3 response
+        adapted = HTTPAdapter.build_response(self, request, raw)
+        adapted.http_version = response.http_version
+        return adapted
+
+    def stats(self) -> TransportStats:
+        """
+        Requests sent, connections opened and TLS handshakes made since the adapter was created.
+
+        :rtype: TransportStats
+        """
+        return self._counter.stats()
+
+    def close(self) -> None:
+        self.client.close()
@@ -0,0 +1,63 @@
+"""Shared fixtures for the tests."""
+import http.server
+import threading
+import urllib.parse
+
+import pytest
+
+
+class StandInServer:
+    """
+    Local HTTP server that stands in for the 511 api. Each path is answered by a list of (status, body, headers)
+    replies; the last reply of a path is repeated once the others are used up.
+    """
+
+    def __init__(self):
+        self.replies = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # the headers and the body are written separately, without this every response waits for a delayed ack
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                parsed = urllib.parse.urlsplit(self.path)
+                with server._lock:
+                    server.requests.append((parsed.path, dict(urllib.parse.parse_qsl(parsed.query)),
+                                            dict(self.headers)))
+                    queue = server.replies.get(parsed.path, [(404, b"Not Found", {})])
+                    status, body, headers = queue.pop(0) if len(queue) > 1 else queue[0]
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = "http://127.0.0.1:%d/Transit/" % self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def add(self, path: str, body, status: int = 200, headers: dict = None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.replies.setdefault("/Transit/" + path, []).append((status, body, headers or {}))
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def stand_in_server():
+    server = StandInServer()
+    yield server
+    server.close()
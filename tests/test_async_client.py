@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from siri_transit_api_client import AsyncSiriClient
+from siri_transit_api_client.async_client import AsyncRateLimiter
+from siri_transit_api_client.exceptions import ApiError, HTTPError, Timeout
+
+STOP_MONITORING_BODY = ('{"ServiceDelivery":{"ResponseTimestamp":"2022-05-20T22:27:30Z","ProducerRef":"CT",'
+                        '"Status":"true","StopMonitoringDelivery":{}}}')
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestAsyncSiriClient:
+    def test_no_api_key(self):
+        with pytest.raises(ValueError):
+            AsyncSiriClient()
+
+    def test_stop_monitoring(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", STOP_MONITORING_BODY)
+
+        async def query():
+            async with AsyncSiriClient(api_key="fake-key", base_url=stand_in_server.base_url) as client:
+                return await client.stop_monitoring("CT", "1234")
+
+        body = run(query())
+        assert body["ServiceDelivery"]["ProducerRef"] == "CT"
+        path, params, _ = stand_in_server.requests[0]
+        assert path == "/Transit/StopMonitoring"
+        assert params == {"api_key": "fake-key", "Format": "json", "agency": "CT", "stopCode": "1234"}
+
+    def test_endpoint_params(self, stand_in_server):
+        stand_in_server.add("timetable", "[1]")
+        stand_in_server.add("patterns", "[1]")
+
+        async def query():
+            async with AsyncSiriClient(api_key="fake-key", base_url=stand_in_server.base_url) as client:
+                await client.timetable("CT", "L5")
+                await client.patterns("CT", "L5", pattern_id="7")
+
+        run(query())
+        assert stand_in_server.requests[0][1] == {"api_key": "fake-key", "Format": "json", "Operator_id": "CT",
+                                                  "Line_id": "L5", "IncludeSpecialService": "False"}
+        assert stand_in_server.requests[1][1] == {"api_key": "fake-key", "Format": "json", "Operator_id": "CT",
+                                                  "Line_id": "L5", "Pattern_id": "7"}
+
+    def test_body_with_bom(self, stand_in_server):
+        stand_in_server.add("Operators", b'\xef\xbb\xbf[{"Id":"CT"}]')
+
+        async def query():
+            async with AsyncSiriClient(api_key="fake-key", base_url=stand_in_server.base_url) as client:
+                return await client.operators()
+
+        assert run(query()) == [{"Id": "CT"}]
+
+    def test_retry_status_then_success(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", "", status=503)
+        stand_in_server.add("StopMonitoring", '{"ServiceDelivery": { "Status": "false"}}')
+        stand_in_server.add("StopMonitoring", STOP_MONITORING_BODY)
+
+        async def query():
+            async with AsyncSiriClient(api_key="fake-key", base_url=stand_in_server.base_url) as client:
+                return await client.stop_monitoring("CT")
+
+        run(query())
+        assert len(stand_in_server.requests) == 3
+
+    def test_retry_timeout(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", "", status=500)
+
+        async def query():
+            async with AsyncSiriClient(api_key="fake-key", base_url=stand_in_server.base_url,
+                                       retry_timeout=1) as client:
+                return await client.stop_monitoring("CT")
+
+        with pytest.raises(Timeout):
+            run(query())
+
+    def test_api_errors(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", "400 Error", status=400)
+        stand_in_server.add("VehicleMonitoring", "", status=408)
+
+        async def query():
+            async with AsyncSiriClient(api_key="fake-key", base_url=stand_in_server.base_url) as client:
+                with pytest.raises(ApiError) as api_error:
+                    await client.stop_monitoring("CT")
+                with pytest.raises(HTTPError) as http_error:
+                    await client.vehicle_monitoring("CT")
+                return api_error, http_error
+
+        api_error, http_error = run(query())
+        assert str(api_error.value) == "error (400 Error)"
+        assert str(http_error.value) == "HTTP Error: 408"
+
+    def test_concurrent_requests(self, stand_in_server):
+        stand_in_server.add("stops", '{"Contents": {}}')
+
+        async def query():
+            async with AsyncSiriClient(api_key="fake-key", base_url=stand_in_server.base_url,
+                                       queries_per_second=100) as client:
+                return await asyncio.gather(*(client.stops("CT", line_id=str(i)) for i in range(20)))
+
+        results = run(query())
+        assert len(results) == 20
+        assert sorted(int(params["Line_id"]) for _, params, _ in stand_in_server.requests) == list(range(20))
+
+
+class TestAsyncRateLimiter:
+    def test_queries_per_second(self):
+        async def acquire_all():
+            limiter = AsyncRateLimiter(queries_per_second=3)
+            start = time.monotonic()
+            await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+            return time.monotonic() - start
+
+        assert 1 <= run(acquire_all()) < 2
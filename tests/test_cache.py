@@ -0,0 +1,199 @@
+import json
+import time
+
+import responses
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.cache import ResponseCache, SQLiteResponseCache
+
+STOPS_URL = "https://api.511.org/Transit/stops?api_key=fake-key&Format=json&Operator_id=CT"
+STOP_MONITORING_URL = "https://api.511.org/Transit/StopMonitoring?api_key=fake-key&Format=json&agency=CT"
+
+
+class TestResponseCache:
+    def test_ttl(self):
+        cache = ResponseCache(ttls={"StopMonitoring": 15}, default_ttl=5)
+        assert cache.ttl("StopMonitoring") == 15
+        assert cache.ttl("stops") == 6 * 3600
+        assert cache.ttl("unknown") == 5
+
+    def test_hit_and_miss(self):
+        cache = ResponseCache()
+        assert cache.get("stops?Format=json") is None
+        cache.set("stops?Format=json", "stops", {"a": 1}, b"x" * 10)
+        assert cache.get("stops?Format=json") == {"a": 1}
+        assert cache.stats() == (1, 1, 0, 1, 10)
+
+    def test_not_cached_without_ttl(self):
+        cache = ResponseCache()
+        cache.set("StopMonitoring?Format=json", "StopMonitoring", {"a": 1}, b"x" * 10)
+        assert cache.get("StopMonitoring?Format=json") is None
+
+    def test_expiry(self):
+        cache = ResponseCache(ttls={"StopMonitoring": 0.05})
+        cache.set("key", "StopMonitoring", {"a": 1}, b"x" * 10)
+        time.sleep(0.1)
+        assert cache.get("key") is None
+        assert cache.stats().size_bytes == 0
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_bytes=25)
+        cache.set("first", "stops", 1, b"x" * 10)
+        cache.set("second", "stops", 2, b"x" * 10)
+        # using the first entry makes the second the least recently used
+        cache.get("first")
+        cache.set("third", "stops", 3, b"x" * 10)
+        assert cache.get("second") is None
+        assert cache.get("first") == 1
+        assert cache.get("third") == 3
+        stats = cache.stats()
+        assert stats.evictions == 1
+        assert stats.size_bytes == 20
+
+    def test_too_large(self):
+        cache = ResponseCache(max_bytes=5)
+        cache.set("key", "stops", 1, b"x" * 10)
+        assert cache.stats().entries == 0
+
+    def test_clear(self):
+        cache = ResponseCache()
+        cache.set("key", "stops", 1, b"x" * 10)
+        cache.clear()
+        assert cache.stats().entries == 0
+        assert cache.get("key") is None
+
+
+class TestSQLiteResponseCache:
+    def test_round_trip(self, tmp_path):
+        cache = SQLiteResponseCache(str(tmp_path / "cache.db"))
+        assert cache.get("key") is None
+        cache.set("key", "stops", {"a": 1}, b'\xef\xbb\xbf{"a": 1}')
+        assert cache.get_content("key") == b'\xef\xbb\xbf{"a": 1}'
+        assert cache.get("key") == {"a": 1}
+        assert cache.stats() == (2, 1, 0, 1, 11)
+
+    def test_compressed(self, tmp_path):
+        cache = SQLiteResponseCache(str(tmp_path / "cache.db"), compress=True)
+        content = b'{"Contents": [' + b'"abc",' * 1000 + b'"abc"]}'
+        cache.set("key", "timetable", None, content)
+        assert cache.get_content("key") == content
+        assert cache.stats().size_bytes == len(content)
+
+    def test_not_cached_without_ttl(self, tmp_path):
+        cache = SQLiteResponseCache(str(tmp_path / "cache.db"))
+        cache.set("key", "VehicleMonitoring", {"a": 1}, b'{"a": 1}')
+        assert cache.get("key") is None
+
+    def test_expiry_and_purge(self, tmp_path):
+        cache = SQLiteResponseCache(str(tmp_path / "cache.db"), ttls={"stops": 0.05})
+        cache.set("key", "stops", {"a": 1}, b'{"a": 1}')
+        time.sleep(0.1)
+        assert cache.get("key") is None
+        assert cache.purge_expired() == 1
+        assert cache.stats().entries == 0
+
+    def test_shared_between_instances(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        SQLiteResponseCache(path).set("key", "stops", {"a": 1}, b'{"a": 1}')
+        assert SQLiteResponseCache(path).get("key") == {"a": 1}
+
+    @responses.activate
+    def test_survives_client_restart(self, tmp_path):
+        responses.add(responses.GET, STOPS_URL, body='{"Contents": {"a": 1}}', status=200)
+        path = str(tmp_path / "cache.db")
+        SiriClient(api_key="fake-key", cache=SQLiteResponseCache(path)).stops("CT")
+        body = SiriClient(api_key="fake-key", cache=SQLiteResponseCache(path)).stops("CT")
+        assert body == {"Contents": {"a": 1}}
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_hits_parsed_with_client_decoder(self, tmp_path):
+        responses.add(responses.GET, STOPS_URL, body='\ufeff{"Contents": {"a": 1}}', status=200)
+        parsed = {"first": [], "second": []}
+
+        def decoder(name):
+            def loads(content):
+                parsed[name].append(bytes(content))
+                return json.loads(bytes(content))
+            return loads
+
+        cache = SQLiteResponseCache(str(tmp_path / "cache.db"))
+        first = SiriClient(api_key="fake-key", cache=cache, json_decoder=decoder("first"))
+        second = SiriClient(api_key="fake-key", cache=SQLiteResponseCache(str(tmp_path / "cache.db")),
+                            json_decoder=decoder("second"))
+        shared = SiriClient(api_key="fake-key", cache=cache)
+        assert first.stops("CT") == second.stops("CT") == shared.stops("CT") == {"Contents": {"a": 1}}
+        assert len(responses.calls) == 1
+        # each client parses the hits with its own decoder, after the byte order mark is stripped
+        assert parsed == {"first": [b'{"Contents": {"a": 1}}'], "second": [b'{"Contents": {"a": 1}}']}
+        assert cache.loads is None
+
+        explicit = SQLiteResponseCache(str(tmp_path / "cache.db"), loads=lambda content: "explicit")
+        assert SiriClient(api_key="fake-key", cache=explicit, json_decoder=decoder("first")).stops("CT") == "explicit"
+
+    def test_stale_hit_parsed_with_client_decoder(self, tmp_path):
+        cache = SQLiteResponseCache(str(tmp_path / "cache.db"), ttls={"stops": 0.05}, stale_ttl=60)
+        client = SiriClient(api_key="fake-key", cache=cache, json_decoder=lambda content: ("parsed", bytes(content)))
+        key = client._generate_cache_key("stops", {"Operator_id": "CT"})
+        cache.set(key, "stops", None, b'\xef\xbb\xbf{"a": 1}')
+        time.sleep(0.06)
+        assert client._get_cached_body(key) is None
+        assert client._get_stale_body(key) == ("parsed", b'{"a": 1}')
+
+
+class TestSiriClientCache:
+    def test_cache_key(self):
+        client = SiriClient(api_key="fake-key")
+        key = client._generate_cache_key("stops", {"Operator_id": "CT"})
+        assert key == "https://api.511.org/Transit/stops?Format=json&Operator_id=CT"
+
+    @responses.activate
+    def test_cached_response(self):
+        responses.add(responses.GET, STOPS_URL, body='{"Contents": {"a": 1}}', status=200)
+        cache = ResponseCache()
+        client = SiriClient(api_key="fake-key", cache=cache)
+        first = client.stops("CT")
+        second = client.stops("CT")
+        assert first == second == {"Contents": {"a": 1}}
+        assert len(responses.calls) == 1
+        assert cache.stats().hits == 1
+
+    @responses.activate
+    def test_realtime_not_cached_by_default(self):
+        responses.add(
+            responses.GET,
+            STOP_MONITORING_URL,
+            body='{"ServiceDelivery":{"Status":"true","StopMonitoringDelivery":{}}}',
+            status=200,
+        )
+        client = SiriClient(api_key="fake-key", cache=ResponseCache())
+        client.stop_monitoring("CT")
+        client.stop_monitoring("CT")
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_cache_shared_between_api_keys(self):
+        responses.add(responses.GET, STOPS_URL, body='{"Contents": {"a": 1}}', status=200)
+        cache = ResponseCache()
+        SiriClient(api_key="fake-key", cache=cache).stops("CT")
+        assert SiriClient(api_key="other-key", cache=cache).stops("CT") == {"Contents": {"a": 1}}
+        assert len(responses.calls) == 1
+
+
+class TestStaleEntries:
+    def test_memory_cache(self):
+        cache = ResponseCache(ttls={"stops": 0.05}, stale_ttl=60)
+        cache.set("key", "stops", {"a": 1}, b"x" * 10)
+        time.sleep(0.06)
+        assert cache.get("key") is None
+        assert cache.get_stale("key") == {"a": 1}
+        assert ResponseCache().get_stale("key") is None
+
+    def test_sqlite_cache(self, tmp_path):
+        cache = SQLiteResponseCache(str(tmp_path / "cache.db"), ttls={"stops": 0.05}, stale_ttl=60)
+        cache.set("key", "stops", {"a": 1}, b'{"a": 1}')
+        time.sleep(0.06)
+        assert cache.get("key") is None
+        assert cache.get_stale("key") == {"a": 1}
+        assert cache.purge_expired() == 0
+        assert cache.stats().misses == 1
@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.cassette import CassetteReader, CassetteWriter, RecordingAdapter, ReplayAdapter
+from siri_transit_api_client.exceptions import ApiError, TransportError
+
+BODY = '\ufeff{"ServiceDelivery":{"Status":"true"}}'
+
+
+def record(stand_in_server, path, calls):
+    recorder = RecordingAdapter(path)
+    client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, cassette=recorder)
+    try:
+        return [call(client) for call in calls]
+    finally:
+        recorder.close()
+
+
+class TestCassette:
+    def test_record_and_replay(self, stand_in_server, tmp_path):
+        path = str(tmp_path / "responses.cassette")
+        stand_in_server.add("StopMonitoring", BODY, headers={"ETag": '"1"'})
+        stand_in_server.add("lines", '[{"Id": "14"}]')
+        recorded = record(stand_in_server, path, [
+            lambda client: client.stop_monitoring("SF", "15551"),
+            lambda client: client.lines("SF"),
+        ])
+        stand_in_server.close()
+
+        with CassetteReader(path) as reader:
+            assert len(reader) == 2
+            assert all("secret-key" not in url for url in reader.urls())
+            record_ = reader.find(stand_in_server.base_url + "StopMonitoring?Format=json&agency=SF&stopCode=15551"
+                                  "&api_key=other-key")[0]
+            assert record_.status == 200
+            assert record_.headers["ETag"] == '"1"'
+            assert record_.elapsed > 0
+            assert reader.content(record_) == BODY.encode("utf-8")
+
+        client = SiriClient(api_key="other-key", base_url=stand_in_server.base_url, cassette=ReplayAdapter(path))
+        assert client.stop_monitoring("SF", "15551") == recorded[0]
+        assert client.lines("SF") == recorded[1]
+
+    def test_responses_replayed_in_order(self, stand_in_server, tmp_path):
+        path = str(tmp_path / "responses.cassette")
+        stand_in_server.add("lines", "[1]")
+        stand_in_server.add("lines", "Invalid operator", status=404)
+        stand_in_server.add("lines", "[2]")
+        record(stand_in_server, path, [
+            lambda client: client.lines("SF"),
+            lambda client: pytest.raises(ApiError, client.lines, "SF"),
+            lambda client: client.lines("SF"),
+        ])
+
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, cassette=ReplayAdapter(path))
+        assert client.lines("SF") == [1]
+        with pytest.raises(ApiError):
+            client.lines("SF")
+        assert client.lines("SF") == [2]
+        with pytest.raises(TransportError):
+            client.lines("SF")
+        with pytest.raises(TransportError):
+            client.lines("AC")
+
+        looped = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url,
+                            cassette=ReplayAdapter(path, loop=True))
+        assert looped.lines("SF") == [1]
+        pytest.raises(ApiError, looped.lines, "SF")
+        assert looped.lines("SF") == [2]
+        assert looped.lines("SF") == [1]
+
+    def test_original_timing(self, tmp_path):
+        path = str(tmp_path / "responses.cassette")
+        url = "http://511.test/Transit/lines?Format=json&Operator_id=SF"
+        with CassetteWriter(path) as writer:
+            writer.write(url, 200, {}, b"[1]", elapsed=0.05, recorded_at=1000.0)
+            writer.write(url, 200, {}, b"[2]", elapsed=0.01, recorded_at=1000.3)
+        client = SiriClient(api_key="secret-key", base_url="http://511.test/Transit/",
+                            cassette=ReplayAdapter(path, speed=2.0))
+
+        start = time.monotonic()
+        assert client.lines("SF") == [1]
+        assert time.monotonic() - start >= 0.025
+        assert client.lines("SF") == [2]
+        assert time.monotonic() - start >= 0.15
+
+        fast = SiriClient(api_key="secret-key", base_url="http://511.test/Transit/", cassette=ReplayAdapter(path))
+        start = time.monotonic()
+        fast.lines("SF")
+        fast.lines("SF")
+        assert time.monotonic() - start < 0.1
+
+    def test_truncated_record_ignored(self, tmp_path):
+        path = tmp_path / "responses.cassette"
+        with CassetteWriter(str(path)) as writer:
+            writer.write("http://511.test/Transit/lines?api_key=k", 200, {}, b"[1]", elapsed=0.0)
+            writer.write("http://511.test/Transit/lines?api_key=k", 200, {}, b"[2]", elapsed=0.0)
+        path.write_bytes(path.read_bytes()[:-2])
+        with CassetteReader(str(path)) as reader:
+            assert reader.urls() == ["http://511.test/Transit/lines"]
+            assert len(reader) == 1
+
+    def test_not_a_cassette(self, tmp_path):
+        path = tmp_path / "responses.json"
+        path.write_bytes(b"{}")
+        with pytest.raises(ValueError):
+            CassetteReader(str(path))
@@ -0,0 +1,151 @@
+import time
+
+import pytest
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.cache import ResponseCache
+from siri_transit_api_client.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakers,
+    is_failure,
+    is_throttled,
+)
+from siri_transit_api_client.exceptions import (
+    ApiError,
+    CircuitOpen,
+    HTTPError,
+    OverQueryLimit,
+    Timeout,
+    TransportError,
+)
+from siri_transit_api_client.hooks import RequestHooks
+from siri_transit_api_client.retry import RetryPolicy
+
+BODY = '[{"Id": "14"}]'
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert 59 < breaker.retry_in() <= 60
+        assert breaker.stats().rejected == 1
+
+    def test_half_open_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+        time.sleep(0.06)
+        assert breaker.allow()
+        breaker.cancel()
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_is_failure(self):
+        assert is_failure(Timeout())
+        assert is_failure(TransportError(OSError()))
+        assert is_failure(HTTPError(503))
+        assert not is_failure(HTTPError(408))
+        assert not is_failure(ApiError("error", "Invalid operator"))
+        assert is_throttled(OverQueryLimit(429, "Too many requests"))
+        assert not is_throttled(HTTPError(503))
+
+    def test_registry(self):
+        breakers = CircuitBreakers(endpoint_settings={"StopMonitoring": {"failure_threshold": 1}})
+        assert breakers.breaker("lines") is breakers.breaker("lines")
+        assert breakers.breaker("lines").failure_threshold == 5
+        breakers.breaker("StopMonitoring").record_failure()
+        assert breakers.states() == {"lines": CLOSED, "StopMonitoring": OPEN}
+        assert breakers.stats()["StopMonitoring"].failures == 1
+
+
+class TestClientCircuitBreaker:
+    def client(self, server, **kwargs):
+        return SiriClient(api_key="fake-key", base_url=server.base_url, queries_per_second=100,
+                          retry_policy=RetryPolicy(max_attempts=1),
+                          circuit_breakers=CircuitBreakers(failure_threshold=2, recovery_timeout=60), **kwargs)
+
+    def test_fails_fast_while_open(self, stand_in_server):
+        stand_in_server.add("lines", "Service Unavailable", status=503)
+        client = self.client(stand_in_server)
+        for _ in range(2):
+            with pytest.raises(HTTPError):
+                client.lines("SF")
+        with pytest.raises(CircuitOpen) as e_info:
+            client.lines("SF")
+        assert e_info.value.endpoint == "lines"
+        assert len(stand_in_server.requests) == 2
+        assert client.circuit_breakers.states() == {"lines": OPEN}
+
+    def test_client_errors_do_not_open(self, stand_in_server):
+        stand_in_server.add("lines", "Invalid operator", status=404)
+        client = self.client(stand_in_server)
+        for _ in range(3):
+            with pytest.raises(ApiError):
+                client.lines("XX")
+        assert client.circuit_breakers.states() == {"lines": CLOSED}
+
+    def test_serves_stale_response_while_open(self, stand_in_server):
+        stand_in_server.add("lines", BODY)
+        stand_in_server.add("lines", "Service Unavailable", status=503)
+        client = self.client(stand_in_server, cache=ResponseCache(ttls={"lines": 0.05}, stale_ttl=60))
+        assert client.lines("SF") == [{"Id": "14"}]
+        time.sleep(0.06)
+        for _ in range(2):
+            with pytest.raises(HTTPError):
+                client.lines("SF")
+        assert client.lines("SF") == [{"Id": "14"}]
+        assert len(stand_in_server.requests) == 3
+
+    def test_throttled_trial_keeps_circuit_half_open(self, stand_in_server):
+        for status in (503, 503, 429):
+            stand_in_server.add("lines", "Service Unavailable" if status == 503 else "Too many requests", status=status)
+        stand_in_server.add("lines", BODY)
+        client = SiriClient(api_key="fake-key", base_url=stand_in_server.base_url, queries_per_second=100,
+                            retry_policy=RetryPolicy(max_attempts=1), retry_over_query_limit=False,
+                            circuit_breakers=CircuitBreakers(failure_threshold=2, recovery_timeout=0.05))
+        for _ in range(2):
+            with pytest.raises(HTTPError):
+                client.lines("SF")
+        time.sleep(0.06)
+        with pytest.raises(OverQueryLimit):
+            client.lines("SF")
+        # the trial slot is given back without closing the circuit or forgetting the failures
+        breaker = client.circuit_breakers.breaker("lines")
+        assert breaker.stats().state == HALF_OPEN
+        assert breaker.stats().failures == 2
+        assert client.lines("SF") == [{"Id": "14"}]
+        assert breaker.state == CLOSED
+
+    def test_hooks_while_open(self, stand_in_server):
+        stand_in_server.add("lines", "Service Unavailable", status=503)
+        calls = []
+        hooks = RequestHooks(on_request=lambda event: calls.append("request"),
+                             on_response=lambda event: calls.append("response"),
+                             on_error=lambda event: calls.append(type(event.error).__name__))
+        client = self.client(stand_in_server, hooks=hooks)
+        for _ in range(2):
+            with pytest.raises(HTTPError):
+                client.lines("SF")
+        calls.clear()
+        with pytest.raises(CircuitOpen):
+            client.lines("SF")
+        # the request is not sent, so only the error is reported
+        assert calls == ["CircuitOpen"]
@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+from siri_transit_api_client import SiriClient, exceptions
+
+
+class TestClientMap:
+    def test_results_and_errors_per_item(self, stand_in_server):
+        stand_in_server.add("patterns", "[1]")
+        client = SiriClient(api_key="fake-key", base_url=stand_in_server.base_url, retry_over_query_limit=False)
+        param_sets = [{"operator_id": "SF", "line_id": str(line)} for line in range(5)]
+        param_sets.append({"operator_id": "SF"})
+
+        results = list(client.map("patterns", param_sets, max_workers=3))
+        assert len(results) == 6
+        succeeded = [result for result in results if result.error is None]
+        assert sorted(result.params["line_id"] for result in succeeded) == ["0", "1", "2", "3", "4"]
+        assert all(result.result == [1] for result in succeeded)
+        failed = [result for result in results if result.error is not None]
+        assert failed[0].params == {"operator_id": "SF"}
+        assert isinstance(failed[0].error, TypeError)
+        assert len(stand_in_server.requests) == 5
+
+    def test_api_error_reported(self, stand_in_server):
+        stand_in_server.add("lines", "Invalid operator", status=404)
+        client = SiriClient(api_key="fake-key", base_url=stand_in_server.base_url)
+        (result,) = client.map("lines", [{"operator_id": "XX"}])
+        assert result.result is None
+        assert isinstance(result.error, exceptions.ApiError)
+
+    def test_runs_concurrently(self):
+        client = SiriClient(api_key="fake-key", queries_per_second=1000)
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_lines(operator_id):
+            with lock:
+                running.append(operator_id)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(operator_id)
+            return operator_id
+
+        client.lines = slow_lines
+        results = list(client.map("lines", ({"operator_id": str(n)} for n in range(12)), max_workers=4))
+        assert sorted(result.result for result in results) == sorted(str(n) for n in range(12))
+        assert max(peak) == 4
+
+    def test_invalid_arguments(self):
+        client = SiriClient(api_key="fake-key")
+        with pytest.raises(ValueError):
+            client.map("_request", [{}])
+        with pytest.raises(ValueError):
+            client.map("lines", [{}], max_workers=0)
@@ -0,0 +1,71 @@
+import math
+
+import pytest
+
+from siri_transit_api_client import columnar
+
+VEHICLE_MONITORING = {
+    "Siri": {
+        "ServiceDelivery": {
+            "VehicleMonitoringDelivery": {
+                "VehicleActivity": [
+                    {
+                        "RecordedAtTime": "2022-05-20T22:27:30Z",
+                        "MonitoredVehicleJourney": {
+                            "LineRef": "14",
+                            "VehicleRef": "1234",
+                            "VehicleLocation": {"Longitude": "-122.41", "Latitude": "37.76"},
+                            "Bearing": "90.0",
+                            "MonitoredCall": {
+                                "AimedArrivalTime": "2022-05-20T22:30:00Z",
+                                "ExpectedArrivalTime": "2022-05-20T22:29:00Z",
+                            },
+                        },
+                    },
+                    {
+                        "RecordedAtTime": "",
+                        "MonitoredVehicleJourney": {"LineRef": "J", "VehicleRef": "5678", "Bearing": ""},
+                    },
+                ]
+            }
+        }
+    }
+}
+
+
+class TestVehiclePositions:
+    def test_array_fallback(self):
+        positions = columnar.vehicle_positions(VEHICLE_MONITORING, use_numpy=False)
+        assert positions.vehicle_ref == ["1234", "5678"]
+        assert positions.line_ref == ["14", "J"]
+        assert positions.latitude.typecode == "d"
+        assert positions.latitude[0] == 37.76
+        assert positions.longitude[0] == -122.41
+        assert positions.bearing[0] == 90.0
+        assert positions.recorded_at[0] == 1653085650.0
+        assert positions.delay[0] == -60
+        assert all(math.isnan(column[1]) for column in positions[2:])
+
+    def test_numpy(self):
+        numpy = pytest.importorskip("numpy")
+        positions = columnar.vehicle_positions(VEHICLE_MONITORING, use_numpy=True)
+        assert isinstance(positions.latitude, numpy.ndarray)
+        assert list(positions.vehicle_ref) == ["1234", "5678"]
+        assert positions.delay[0] == -60
+        assert numpy.isnan(positions.bearing[1])
+
+    def test_numpy_missing(self, monkeypatch):
+        monkeypatch.setattr(columnar, "numpy", None)
+        with pytest.raises(ImportError):
+            columnar.vehicle_positions(VEHICLE_MONITORING, use_numpy=True)
+        assert isinstance(columnar.vehicle_positions(VEHICLE_MONITORING).vehicle_ref, list)
+
+    def test_from_records(self):
+        records = VEHICLE_MONITORING["Siri"]["ServiceDelivery"]["VehicleMonitoringDelivery"]["VehicleActivity"]
+        positions = columnar.vehicle_positions_from_records(iter(records), use_numpy=False)
+        assert len(positions.latitude) == 2
+
+    def test_empty(self):
+        positions = columnar.vehicle_positions({"Siri": {"ServiceDelivery": {}}}, use_numpy=False)
+        assert len(positions.vehicle_ref) == 0
+        assert len(positions.delay) == 0
@@ -0,0 +1,121 @@
+import gzip
+import json
+import zlib
+
+import pytest
+
+from siri_transit_api_client import SiriClient, compression, metrics
+from siri_transit_api_client.compression import ACCEPT_ENCODING, ContentDecoder
+from siri_transit_api_client.exceptions import TransportError
+from siri_transit_api_client.hooks import RequestHooks
+from siri_transit_api_client.metrics import PrometheusSink
+from siri_transit_api_client.transport import HTTPXAdapter, httpx
+
+CONTENT = json.dumps({"VehicleActivity": [{"VehicleRef": str(index)} for index in range(2000)]}).encode("utf-8")
+
+
+def decode_in_chunks(decoder, data, size=7):
+    chunks = [decoder.decompress(data[start:start + size]) for start in range(0, len(data), size)]
+    return b"".join(chunks) + decoder.flush()
+
+
+class TestContentDecoder:
+    def test_gzip(self):
+        decoder = ContentDecoder("gzip")
+        assert decode_in_chunks(decoder, gzip.compress(CONTENT)) == CONTENT
+        assert decoder.compressed
+        assert decoder.wire_bytes == len(gzip.compress(CONTENT))
+        assert decoder.content_bytes == len(CONTENT)
+        assert decoder.duration > 0
+
+    def test_gzip_members(self):
+        assert decode_in_chunks(ContentDecoder("gzip"), gzip.compress(b"[1,") + gzip.compress(b"2]")) == b"[1,2]"
+
+    def test_deflate(self):
+        assert decode_in_chunks(ContentDecoder("deflate"), zlib.compress(CONTENT)) == CONTENT
+        raw = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        assert decode_in_chunks(ContentDecoder("deflate"), raw.compress(CONTENT) + raw.flush()) == CONTENT
+
+    def test_several_encodings(self):
+        assert decode_in_chunks(ContentDecoder("deflate, gzip"), gzip.compress(zlib.compress(CONTENT))) == CONTENT
+
+    def test_identity(self):
+        decoder = ContentDecoder(None)
+        assert decode_in_chunks(decoder, CONTENT) == CONTENT
+        assert not decoder.compressed
+        assert decoder.wire_bytes == decoder.content_bytes == len(CONTENT)
+
+    def test_delegated(self):
+        assert ContentDecoder("zstd").delegated
+        assert ContentDecoder("gzip, zstd").delegated
+        assert not ContentDecoder("identity").delegated
+        assert not ContentDecoder("gzip").delegated
+
+    def test_accept_encoding(self):
+        assert ACCEPT_ENCODING.startswith("gzip, deflate")
+
+
+class TestCompressedResponses:
+    def test_gzip_response(self, stand_in_server):
+        stand_in_server.add("VehicleMonitoring", gzip.compress(CONTENT), headers={"Content-Encoding": "gzip"})
+        sink = PrometheusSink()
+        responses = []
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, metrics_sink=sink,
+                            hooks=RequestHooks(on_response=responses.append))
+        assert client.vehicle_monitoring("SF") == json.loads(CONTENT)
+        assert stand_in_server.requests[0][2]["Accept-Encoding"] == ACCEPT_ENCODING
+
+        assert sink.get(metrics.RESPONSE_BYTES, endpoint="VehicleMonitoring") == len(CONTENT)
+        assert sink.get(metrics.WIRE_BYTES, endpoint="VehicleMonitoring") == len(gzip.compress(CONTENT))
+        assert sink.get(metrics.DECOMPRESS_DURATION, endpoint="VehicleMonitoring") == 1
+        assert responses[0].timings.decompress > 0
+
+    def test_streamed_gzip_response(self, stand_in_server):
+        stand_in_server.add("VehicleMonitoring", gzip.compress(CONTENT), headers={"Content-Encoding": "gzip"})
+        sink = PrometheusSink()
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, metrics_sink=sink)
+        assert list(client.iter_vehicle_monitoring("SF", chunk_size=512)) == json.loads(CONTENT)["VehicleActivity"]
+        assert sink.get(metrics.RESPONSE_BYTES, endpoint="VehicleMonitoring") == len(CONTENT)
+        assert sink.get(metrics.WIRE_BYTES, endpoint="VehicleMonitoring") == len(gzip.compress(CONTENT))
+
+    def test_uncompressed_response(self, stand_in_server):
+        stand_in_server.add("lines", "[1]")
+        sink = PrometheusSink()
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, metrics_sink=sink,
+                            accept_encoding="identity")
+        assert client.lines("SF") == [1]
+        assert stand_in_server.requests[0][2]["Accept-Encoding"] == "identity"
+        assert sink.get(metrics.WIRE_BYTES, endpoint="lines") == 3
+        assert sink.get(metrics.DECOMPRESS_DURATION, endpoint="lines") == 0
+
+    def test_encoding_decoded_by_urllib3(self, stand_in_server, monkeypatch):
+        # stands in for an encoding such as zstd, advertised by urllib3 when accept_encoding is None
+        monkeypatch.delitem(compression._DECODERS, "gzip")
+        stand_in_server.add("VehicleMonitoring", gzip.compress(CONTENT), headers={"Content-Encoding": "gzip"})
+        sink = PrometheusSink()
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, metrics_sink=sink,
+                            accept_encoding=None)
+        assert client.vehicle_monitoring("SF") == json.loads(CONTENT)
+        assert sink.get(metrics.RESPONSE_BYTES, endpoint="VehicleMonitoring") == len(CONTENT)
+        assert sink.get(metrics.WIRE_BYTES, endpoint="VehicleMonitoring") == len(gzip.compress(CONTENT))
+        assert list(client.iter_vehicle_monitoring("SF")) == json.loads(CONTENT)["VehicleActivity"]
+
+    def test_unknown_encoding_left_as_is(self, stand_in_server):
+        stand_in_server.add("lines", "[1]", headers={"Content-Encoding": "x-unknown"})
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url)
+        assert client.lines("SF") == [1]
+
+    def test_corrupt_response(self, stand_in_server):
+        stand_in_server.add("lines", b"not gzip", headers={"Content-Encoding": "gzip"})
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url)
+        with pytest.raises(TransportError):
+            client.lines("SF")
+
+    @pytest.mark.skipif(httpx is None, reason="httpx is not installed")
+    def test_httpx_transport(self, stand_in_server):
+        stand_in_server.add("VehicleMonitoring", gzip.compress(CONTENT), headers={"Content-Encoding": "gzip"})
+        sink = PrometheusSink()
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, metrics_sink=sink,
+                            transport=HTTPXAdapter())
+        assert client.vehicle_monitoring("SF") == json.loads(CONTENT)
+        assert sink.get(metrics.WIRE_BYTES, endpoint="VehicleMonitoring") == len(gzip.compress(CONTENT))
@@ -0,0 +1,124 @@
+import time
+
+import pytest
+import responses
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.cache import ResponseCache, SQLiteResponseCache
+from siri_transit_api_client.exceptions import HTTPError
+
+LINES_URL = "https://api.511.org/Transit/lines?api_key=fake-key&Format=json&Operator_id=CT"
+
+
+class ConditionalCallback:
+    """Answers with 304 when the request carries the validators of the previous response."""
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.request_headers = []
+
+    def __call__(self, request):
+        self.request_headers.append(dict(request.headers))
+        if "If-None-Match" in request.headers or "If-Modified-Since" in request.headers:
+            return 304, {}, ""
+        return 200, self.headers, '[{"Id": "L5"}]'
+
+
+class TestConditionalRequests:
+    @responses.activate
+    def test_etag(self):
+        callback = ConditionalCallback({"ETag": '"v1"'})
+        responses.add_callback(responses.GET, LINES_URL, callback=callback)
+        client = SiriClient(api_key="fake-key", conditional_requests=True)
+
+        assert client.lines("CT") == [{"Id": "L5"}]
+        assert client.lines("CT") == [{"Id": "L5"}]
+        assert "If-None-Match" not in callback.request_headers[0]
+        assert callback.request_headers[1]["If-None-Match"] == '"v1"'
+
+    @responses.activate
+    def test_last_modified(self):
+        callback = ConditionalCallback({"Last-Modified": "Fri, 20 May 2022 22:27:30 GMT"})
+        responses.add_callback(responses.GET, LINES_URL, callback=callback)
+        client = SiriClient(api_key="fake-key", conditional_requests=True)
+
+        client.lines("CT")
+        assert client.lines("CT") == [{"Id": "L5"}]
+        assert callback.request_headers[1]["If-Modified-Since"] == "Fri, 20 May 2022 22:27:30 GMT"
+
+    @responses.activate
+    def test_extra_headers_kept(self):
+        callback = ConditionalCallback({"ETag": '"v1"'})
+        responses.add_callback(responses.GET, LINES_URL, callback=callback)
+        client = SiriClient(api_key="fake-key", conditional_requests=True,
+                            requests_kwargs={"headers": {"Accept-Language": "en"}})
+
+        client.lines("CT")
+        client.lines("CT")
+        assert callback.request_headers[1]["If-None-Match"] == '"v1"'
+        assert callback.request_headers[1]["Accept-Language"] == "en"
+
+    @responses.activate
+    def test_no_validators(self):
+        callback = ConditionalCallback({})
+        responses.add_callback(responses.GET, LINES_URL, callback=callback)
+        client = SiriClient(api_key="fake-key", conditional_requests=True)
+
+        client.lines("CT")
+        client.lines("CT")
+        assert "If-None-Match" not in callback.request_headers[1]
+
+    @responses.activate
+    def test_disabled_by_default(self):
+        callback = ConditionalCallback({"ETag": '"v1"'})
+        responses.add_callback(responses.GET, LINES_URL, callback=callback)
+        client = SiriClient(api_key="fake-key")
+
+        client.lines("CT")
+        client.lines("CT")
+        assert "If-None-Match" not in callback.request_headers[1]
+
+    @responses.activate
+    def test_unexpected_not_modified(self):
+        responses.add(responses.GET, LINES_URL, status=304)
+        client = SiriClient(api_key="fake-key", conditional_requests=True)
+
+        with pytest.raises(HTTPError):
+            client.lines("CT")
+
+    @pytest.mark.parametrize("make_cache", [
+        lambda path: ResponseCache(ttls={"lines": 0.2}),
+        lambda path: SQLiteResponseCache(str(path / "cache.db"), ttls={"lines": 0.2}),
+    ])
+    @responses.activate
+    def test_not_modified_cached_again(self, tmp_path, make_cache):
+        callback = ConditionalCallback({"ETag": '"v1"'})
+        responses.add_callback(responses.GET, LINES_URL, callback=callback)
+        cache = make_cache(tmp_path)
+        client = SiriClient(api_key="fake-key", cache=cache, conditional_requests=True)
+
+        assert client.lines("CT") == [{"Id": "L5"}]
+        time.sleep(0.25)
+        assert client.lines("CT") == [{"Id": "L5"}]
+        assert callback.request_headers[1]["If-None-Match"] == '"v1"'
+        # the revalidated response is served by the cache until it expires again
+        assert client.lines("CT") == [{"Id": "L5"}]
+        assert len(callback.request_headers) == 2
+        assert cache.stats().hits == 1
+        assert cache.stats().entries == 1
+
+    @responses.activate
+    def test_max_bytes(self):
+        for operator in ("AC", "CT", "SF"):
+            responses.add(responses.GET, LINES_URL.replace("CT", operator), json=[{"Id": operator}],
+                          headers={"ETag": '"%s"' % operator})
+        size = len(b'[{"Id": "CT"}]')
+        client = SiriClient(api_key="fake-key", conditional_requests=True, conditional_max_bytes=2 * size)
+
+        client.lines("AC")
+        client.lines("CT")
+        client.lines("SF")
+        # the least recently used body was dropped to stay within conditional_max_bytes
+        assert len(client._conditional_entries) == 2
+        assert client._conditional_size == 2 * size
+        assert [entry.etag for entry in client._conditional_entries.values()] == ['"CT"', '"SF"']
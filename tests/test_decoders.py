@@ -0,0 +1,68 @@
+import pytest
+import responses
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.decoders import available_decoders, get_decoder, loads_content, loads_json, strip_bom
+
+OPERATORS_URL = "https://api.511.org/Transit/Operators?api_key=fake-key&Format=json"
+
+
+class TestDecoders:
+    def test_strip_bom_without_copy(self):
+        content = b'\xef\xbb\xbf{"a": 1}'
+        stripped = strip_bom(content)
+        assert isinstance(stripped, memoryview)
+        assert stripped.obj is content
+        assert bytes(stripped) == b'{"a": 1}'
+
+    def test_no_bom(self):
+        content = b'{"a": 1}'
+        assert strip_bom(content) is content
+
+    def test_loads_content(self):
+        assert loads_content(b'\xef\xbb\xbf{"a": "\xc3\xa9"}') == {"a": "é"}
+
+    def test_get_decoder(self):
+        assert get_decoder("json") is loads_json
+        assert "json" in available_decoders()
+
+    def test_callable_decoder(self):
+        def loads(data):
+            return data
+
+        assert get_decoder(loads) is loads
+
+    def test_unknown_decoder(self):
+        with pytest.raises(ValueError):
+            get_decoder("yaml")
+
+    @pytest.mark.parametrize("name", ["orjson", "msgspec"])
+    def test_optional_decoder(self, name):
+        pytest.importorskip(name)
+        assert get_decoder(name)(strip_bom(b'\xef\xbb\xbf[1, {"a": null}]')) == [1, {"a": None}]
+
+    def test_auto(self):
+        decoder = get_decoder("auto")
+        assert decoder(b'{"a": 1}') == {"a": 1}
+
+
+class TestSiriClientDecoder:
+    @responses.activate
+    def test_custom_decoder_receives_bytes(self):
+        responses.add(responses.GET, OPERATORS_URL, body=b'\xef\xbb\xbf[{"Id": "CT"}]', status=200)
+        received = []
+
+        def loads(data):
+            received.append(data)
+            return loads_json(data)
+
+        client = SiriClient(api_key="fake-key", json_decoder=loads)
+        assert client.operators() == [{"Id": "CT"}]
+        assert bytes(received[0]) == b'[{"Id": "CT"}]'
+
+    @responses.activate
+    def test_orjson(self):
+        pytest.importorskip("orjson")
+        responses.add(responses.GET, OPERATORS_URL, body=b'\xef\xbb\xbf[{"Id": "CT"}]', status=200)
+        client = SiriClient(api_key="fake-key", json_decoder="orjson")
+        assert client.operators() == [{"Id": "CT"}]
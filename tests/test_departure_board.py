@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+
+import pytest
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.departure_board import DepartureBoard
+
+
+def visit(stop_code, vehicle_ref, expected_departure):
+    return {
+        "RecordedAtTime": "2022-05-20T22:27:30Z",
+        "MonitoringRef": stop_code,
+        "MonitoredVehicleJourney": {
+            "LineRef": "14",
+            "VehicleRef": vehicle_ref,
+            "MonitoredCall": {"StopPointRef": stop_code, "ExpectedDepartureTime": expected_departure},
+        },
+    }
+
+
+def feed(*visits):
+    return json.dumps({"ServiceDelivery": {"StopMonitoringDelivery": {"MonitoredStopVisit": list(visits)}}})
+
+
+class SlowClient:
+    """Stands in for SiriClient, taking delay seconds per StopMonitoring query and failing while failing is set."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.failing = False
+        self.calls = 0
+
+    def iter_stop_monitoring(self, agency):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.failing:
+            raise ConnectionError("feed unavailable")
+        return iter([visit("15551", str(self.calls), "2022-05-20T22:30:00Z")])
+
+
+def look_up_concurrently(board, count=5):
+    durations = []
+
+    def look_up():
+        start = time.monotonic()
+        try:
+            board.visits("15551")
+        except ConnectionError:
+            pass
+        durations.append(time.monotonic() - start)
+
+    threads = [threading.Thread(target=look_up) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return durations
+
+
+class TestDepartureBoard:
+    def test_one_request_serves_every_stop(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", feed(
+            visit("15551", "2", "2022-05-20T22:40:00Z"),
+            visit("15552", "3", "2022-05-20T22:31:00Z"),
+            visit("15551", "1", "2022-05-20T22:30:00Z"),
+        ))
+        client = SiriClient(api_key="fake-key", base_url=stand_in_server.base_url)
+        board = DepartureBoard(client, "SF")
+
+        assert [v.vehicle_ref for v in board.visits("15551")] == ["1", "2"]
+        assert [v.vehicle_ref for v in board["15552"]] == ["3"]
+        assert board.visits("99999") == ()
+        assert "15552" in board
+        assert sorted(board.stop_codes()) == ["15551", "15552"]
+        assert len(stand_in_server.requests) == 1
+        path, params, _ = stand_in_server.requests[0]
+        assert path == "/Transit/StopMonitoring"
+        assert "stopCode" not in params
+
+    def test_refresh_when_stale(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", feed(visit("15551", "1", "2022-05-20T22:30:00Z")))
+        stand_in_server.add("StopMonitoring", feed(visit("15551", "2", "2022-05-20T22:40:00Z")))
+        client = SiriClient(api_key="fake-key", base_url=stand_in_server.base_url)
+
+        board = DepartureBoard(client, "SF", max_age=None)
+        assert board.visits("15551")[0].vehicle_ref == "1"
+        assert board.visits("15551")[0].vehicle_ref == "1"
+        board.refresh()
+        assert board.visits("15551")[0].vehicle_ref == "2"
+        assert len(stand_in_server.requests) == 2
+
+        board = DepartureBoard(client, "SF", max_age=0)
+        board.visits("15551")
+        board.visits("15551")
+        assert len(stand_in_server.requests) == 4
+
+    def test_concurrent_lookups_share_refresh(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", feed(visit("15551", "1", "2022-05-20T22:30:00Z")))
+        client = SiriClient(api_key="fake-key", base_url=stand_in_server.base_url)
+        board = DepartureBoard(client, "SF")
+
+        threads = [threading.Thread(target=board.visits, args=("15551",)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(stand_in_server.requests) == 1
+
+    def test_stale_lookups_do_not_wait_for_refresh(self):
+        client = SlowClient()
+        board = DepartureBoard(client, "SF", max_age=0)
+        assert board.visits("15551")[0].vehicle_ref == "1"
+
+        client.delay = 0.3
+        durations = look_up_concurrently(board)
+        assert client.calls == 2
+        # only the lookup that refreshed the index waited for the feed
+        assert sorted(durations)[-2] < 0.1
+        assert board.visits("15551")[0].vehicle_ref in ("2", "3")
+
+    def test_failed_refresh_serves_previous_index(self):
+        client = SlowClient()
+        errors = []
+        board = DepartureBoard(client, "SF", max_age=0, retry_interval=60, on_error=errors.append)
+        board.visits("15551")
+
+        client.failing = True
+        client.delay = 0.1
+        durations = look_up_concurrently(board)
+        assert client.calls == 2
+        assert max(durations) < 0.3
+        assert len(errors) == 1
+        # the failure is not retried before retry_interval
+        assert board.visits("15551")[0].vehicle_ref == "1"
+        assert client.calls == 2
+
+    def test_failed_first_refresh_is_not_repeated(self):
+        client = SlowClient(delay=0.1)
+        client.failing = True
+        board = DepartureBoard(client, "SF", retry_interval=60)
+        durations = look_up_concurrently(board)
+        assert client.calls == 1
+        assert max(durations) < 0.3
+        with pytest.raises(ConnectionError):
+            board.visits("15551")
+        assert client.calls == 1
+
+        board.retry_interval = 0
+        client.failing = False
+        assert board.visits("15551")[0].vehicle_ref == "2"
@@ -0,0 +1,81 @@
+import dataclasses
+
+import pytest
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.exceptions import ApiError
+from siri_transit_api_client.hooks import RequestHooks
+from siri_transit_api_client.retry import RetryPolicy
+
+BODY = '\ufeff{"ServiceDelivery":{"Status":"true"}}'
+
+
+def recording_hooks(calls):
+    def record(name):
+        def hook(event):
+            calls.append((name, event.attempt, event.status, event.error, event.delay,
+                          dataclasses.replace(event.timings)))
+            event.context.setdefault("hooks", []).append(name)
+        return hook
+
+    return RequestHooks(record("request"), record("response"), record("retry"), record("error"))
+
+
+class TestHooks:
+    def test_success_with_retry(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", "Service Unavailable", status=503)
+        stand_in_server.add("StopMonitoring", BODY)
+        calls = []
+        events = []
+        hooks = recording_hooks(calls)
+        on_response = hooks.on_response
+        hooks.on_response = lambda event: (events.append(event), on_response(event))
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, hooks=hooks,
+                            retry_policy=RetryPolicy(base_delay=0.01))
+        client.stop_monitoring("SF", "15551")
+
+        assert [(name, attempt, status) for name, attempt, status, *_ in calls] == [
+            ("request", 1, None), ("response", 1, 503), ("retry", 1, 503),
+            ("request", 2, None), ("response", 2, 200),
+        ]
+        assert calls[2][4] is not None
+        event = events[-1]
+        assert event.endpoint == "StopMonitoring"
+        assert event.params == {"agency": "SF", "stopCode": "15551"}
+        assert "secret-key" not in event.url
+        assert event.context["hooks"] == ["request", "response", "retry", "request", "response"]
+
+        timings = calls[-1][5]
+        assert timings.queue >= 0
+        assert timings.connect is not None and timings.connect >= 0
+        assert timings.ttfb > 0
+        assert timings.transfer >= 0
+        assert timings.bom >= 0
+        assert timings.parse > 0
+        assert timings.total >= timings.ttfb
+
+    def test_error(self, stand_in_server):
+        stand_in_server.add("lines", "Invalid operator", status=404)
+        calls = []
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, hooks=recording_hooks(calls))
+        with pytest.raises(ApiError):
+            client.lines("XX")
+        assert [name for name, *_ in calls] == ["request", "response", "error"]
+        assert isinstance(calls[-1][3], ApiError)
+
+    def test_stream_not_read_ahead(self, stand_in_server):
+        stand_in_server.add("VehicleMonitoring", '{"VehicleActivity": [{"a": 1}, {"a": 2}]}')
+        calls = []
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, hooks=recording_hooks(calls))
+        assert list(client.iter_vehicle_monitoring("SF")) == [{"a": 1}, {"a": 2}]
+        timings = calls[-1][5]
+        assert timings.ttfb is not None
+        assert timings.transfer is None and timings.parse is None
+
+    def test_partial_hooks(self, stand_in_server):
+        stand_in_server.add("lines", "[1]")
+        responses = []
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url,
+                            hooks=RequestHooks(on_response=responses.append))
+        assert client.lines("SF") == [1]
+        assert responses[0].status == 200
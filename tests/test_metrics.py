@@ -0,0 +1,57 @@
+from siri_transit_api_client import SiriClient, metrics
+from siri_transit_api_client.metrics import CallbackSink, PrometheusSink
+from siri_transit_api_client.retry import RetryPolicy
+
+BODY = '{"ServiceDelivery":{"Status":"true"}}'
+
+
+class TestPrometheusSink:
+    def test_render(self):
+        sink = PrometheusSink(buckets=(0.1, 1))
+        sink.observe(metrics.REQUEST_DURATION, 0.05, {"endpoint": "lines", "status": "200"})
+        sink.observe(metrics.REQUEST_DURATION, 0.5, {"endpoint": "lines", "status": "200"})
+        sink.observe(metrics.RESPONSE_BYTES, 100, {"endpoint": "lines"})
+        sink.observe(metrics.RESPONSE_BYTES, 50, {"endpoint": "lines"})
+        text = sink.render()
+        assert "# TYPE siri_request_duration_seconds histogram" in text
+        assert 'siri_request_duration_seconds_bucket{endpoint="lines",status="200",le="0.1"} 1' in text
+        assert 'siri_request_duration_seconds_bucket{endpoint="lines",status="200",le="1"} 2' in text
+        assert 'siri_request_duration_seconds_bucket{endpoint="lines",status="200",le="+Inf"} 2' in text
+        assert 'siri_request_duration_seconds_count{endpoint="lines",status="200"} 2' in text
+        assert 'siri_response_bytes_total{endpoint="lines"} 150' in text
+        assert "siri_retries_total" not in text
+        assert sink.get(metrics.RESPONSE_BYTES, endpoint="lines") == 150
+
+    def test_empty(self):
+        assert PrometheusSink().render() == ""
+
+
+class TestClientMetrics:
+    def test_request_metrics(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", "Service Unavailable", status=503)
+        stand_in_server.add("StopMonitoring", BODY)
+        sink = PrometheusSink()
+        client = SiriClient(api_key="fake-key", base_url=stand_in_server.base_url, metrics_sink=sink,
+                            retry_policy=RetryPolicy(base_delay=0.01))
+        client.stop_monitoring("SF")
+
+        assert sink.get(metrics.REQUEST_DURATION, endpoint="StopMonitoring", status="503") == 1
+        assert sink.get(metrics.REQUEST_DURATION, endpoint="StopMonitoring", status="200") == 1
+        assert sink.get(metrics.RETRIES, endpoint="StopMonitoring", status="503") == 1
+        assert sink.get(metrics.RESPONSE_BYTES, endpoint="StopMonitoring") == len("Service Unavailable") + len(BODY)
+        assert sink.get(metrics.DECODE_DURATION, endpoint="StopMonitoring") == 1
+        assert 0 <= sink.get(metrics.BACKOFF, endpoint="StopMonitoring") <= 0.01
+
+    def test_rate_limit_wait_and_callback(self, stand_in_server):
+        stand_in_server.add("lines", "[1]")
+        observations = []
+        client = SiriClient(api_key="fake-key", base_url=stand_in_server.base_url, queries_per_second=20,
+                            metrics_sink=CallbackSink(lambda *observation: observations.append(observation)))
+        for _ in range(25):
+            client.lines("SF")
+        names = {name for name, _, _ in observations}
+        assert {metrics.REQUEST_DURATION, metrics.RESPONSE_BYTES, metrics.DECODE_DURATION,
+                metrics.RATE_LIMIT_WAIT} <= names
+        waited = sum(value for name, value, _ in observations if name == metrics.RATE_LIMIT_WAIT)
+        assert 0.1 < waited < 0.5
+        assert all(labels["endpoint"] == "lines" for _, _, labels in observations)
@@ -0,0 +1,113 @@
+import dataclasses
+
+import pytest
+
+from siri_transit_api_client import models
+
+
+def journey(line_ref="14", vehicle_ref="1234"):
+    return {
+        "LineRef": line_ref,
+        "DirectionRef": "IB",
+        "FramedVehicleJourneyRef": {"DataFrameRef": "2022-05-20", "DatedVehicleJourneyRef": "11010534"},
+        "PublishedLineName": "MISSION",
+        "OperatorRef": "SF",
+        "DestinationName": "Downtown",
+        "VehicleLocation": {"Longitude": "-122.41", "Latitude": "37.76"},
+        "Bearing": "90.0",
+        "Occupancy": "seatsAvailable",
+        "VehicleRef": vehicle_ref,
+        "MonitoredCall": {
+            "StopPointRef": "15551",
+            "AimedArrivalTime": "2022-05-20T22:30:00Z",
+            "ExpectedArrivalTime": "2022-05-20T22:32:30Z",
+            "AimedDepartureTime": "2022-05-20T22:30:00Z",
+            "ExpectedDepartureTime": "",
+        },
+    }
+
+
+STOP_MONITORING = {
+    "ServiceDelivery": {
+        "Status": True,
+        "StopMonitoringDelivery": {
+            "MonitoredStopVisit": [
+                {"RecordedAtTime": "2022-05-20T22:27:30Z", "MonitoringRef": "15551",
+                 "MonitoredVehicleJourney": journey()},
+                {"RecordedAtTime": "2022-05-20T22:27:31Z", "MonitoringRef": "15551",
+                 "MonitoredVehicleJourney": journey(vehicle_ref="5678")},
+            ]
+        },
+    }
+}
+
+VEHICLE_MONITORING = {
+    "Siri": {
+        "ServiceDelivery": {
+            "VehicleMonitoringDelivery": {
+                "VehicleActivity": [{"RecordedAtTime": "2022-05-20T22:27:30Z", "MonitoredVehicleJourney": journey()}]
+            }
+        }
+    }
+}
+
+
+class TestModels:
+    def test_stop_visits(self):
+        visits = models.stop_visits(STOP_MONITORING)
+        assert len(visits) == 2
+        visit = visits[0]
+        assert visit.monitoring_ref == "15551"
+        assert visit.line_ref == "14"
+        assert visit.vehicle_ref == "1234"
+        assert visit.dated_vehicle_journey_ref == "11010534"
+        assert visit.recorded_at_time == 1653085650.0
+        assert visit.expected_departure_time is None
+        assert visit.arrival_delay == 150
+        assert (visit.latitude, visit.longitude) == (37.76, -122.41)
+
+    def test_strings_interned(self):
+        first, second = models.stop_visits(STOP_MONITORING)
+        assert first.operator_ref is second.operator_ref
+        assert first.destination_name is second.destination_name
+
+    def test_records_are_compact_and_frozen(self):
+        visit = models.stop_visits(STOP_MONITORING)[0]
+        assert not hasattr(visit, "__dict__")
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            visit.line_ref = "1"
+
+    def test_single_record_not_in_list(self):
+        body = {"ServiceDelivery": {"StopMonitoringDelivery": {"MonitoredStopVisit": {"MonitoringRef": "1"}}}}
+        assert [visit.monitoring_ref for visit in models.stop_visits(body)] == ["1"]
+
+    def test_empty_delivery(self):
+        assert models.stop_visits({"ServiceDelivery": {"StopMonitoringDelivery": {}}}) == []
+
+    def test_vehicle_activities(self):
+        activity = models.vehicle_activities(VEHICLE_MONITORING)[0]
+        assert activity.vehicle_ref == "1234"
+        assert activity.bearing == 90.0
+        assert activity.occupancy == "seatsAvailable"
+        assert activity.stop_point_ref == "15551"
+        assert activity.delay == 150
+
+    def test_lines(self):
+        body = [{"Id": "14", "Name": "MISSION", "TransportMode": "bus", "PublicCode": "14", "SiriLineRef": "14",
+                 "Monitored": True, "OperatorRef": "SF"}]
+        assert models.lines(body) == [models.Line("14", "MISSION", "bus", "14", "14", True, "SF")]
+
+    def test_stops(self):
+        body = {"Contents": {"dataObjects": {"ScheduledStopPoint": [
+            {"id": "13008", "Name": "Mission St & 16th St", "Location": {"Longitude": "-122.41", "Latitude": "37.76"},
+             "StopType": "onstreetBus"}
+        ]}}}
+        assert models.stops(body) == [models.Stop("13008", "Mission St & 16th St", 37.76, -122.41, "onstreetBus")]
+
+    def test_stop_places(self):
+        body = {"Siri": {"ServiceDelivery": {"DataObjectDelivery": {"dataObjects": {"SiteFrame": {"stopPlaces": {
+            "StopPlace": {"@id": "70011", "Name": "San Francisco Caltrain", "StopPlaceType": "railStation",
+                          "Centroid": {"Location": {"Longitude": "-122.39", "Latitude": "37.78"}}}
+        }}}}}}}
+        assert models.stop_places(body) == [models.Stop("70011", "San Francisco Caltrain", 37.78, -122.39,
+                                                         "railStation")]
@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import urllib.parse
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.cassette import CassetteWriter, ReplayAdapter
+from siri_transit_api_client.exceptions import ApiError
+from siri_transit_api_client.hooks import RequestHooks
+from siri_transit_api_client.network_loader import StaticNetworkLoader
+
+BASE_URL = "http://511.test/Transit/"
+
+
+def url(path, **params):
+    return BASE_URL + path + "?Format=json&" + urllib.parse.urlencode(params)
+
+
+def stop(stop_id, latitude):
+    return {"id": stop_id, "Name": "Stop %s" % stop_id, "Location": {"Latitude": latitude, "Longitude": "-122.4"}}
+
+
+def pattern(pattern_id, stop_ids):
+    points = [{"Order": str(order), "ScheduledStopPointRef": stop_id} for order, stop_id in enumerate(stop_ids, 1)]
+    return {
+        "serviceJourneyPatternRef": pattern_id,
+        "Name": "Pattern %s" % pattern_id,
+        "DirectionRef": "IB",
+        "DestinationDisplayView": {"FontText": "Downtown"},
+        "PointsInSequence": {"StopPointInJourneyPattern": points[1:], "TimingPointInJourneyPattern": points[:1]},
+    }
+
+
+def timetable(journey_id, stop_ids):
+    calls = [{"Order": str(order), "ScheduledStopPointRef": {"ref": stop_id},
+              "Arrival": {"Time": "07:0%d:00" % order, "DaysOffset": "0"},
+              "Departure": {"Time": "07:0%d:30" % order, "DaysOffset": "0"}}
+             for order, stop_id in enumerate(stop_ids, 1)]
+    journey = {"id": journey_id, "JourneyPatternView": {"RouteRef": "1", "DirectionRef": "IB"}, "calls": {"Call": calls}}
+    return {"Content": {"TimetableFrame": [{"Name": "Weekday", "vehicleJourneys": {"ServiceJourney": [journey]}}]}}
+
+
+RESPONSES = {
+    url("Operators"): [{"Id": "SF", "Name": "San Francisco Municipal Transportation Agency", "Monitored": True},
+                       {"Id": "AC", "Name": "AC Transit", "Monitored": True}],
+    url("lines", Operator_id="SF"): [{"Id": "1", "Name": "California", "PublicCode": "1"},
+                                     {"Id": "2", "Name": "Sutter", "PublicCode": "2"}],
+    url("stops", Operator_id="SF"): {"Contents": {"dataObjects": {
+        "ScheduledStopPoint": [stop("100", "37.1"), stop("101", "37.2")]}}},
+    url("stops", Operator_id="SF", Line_id="2"): {"Contents": {"dataObjects": {
+        "ScheduledStopPoint": [stop("101", "37.2"), stop("102", "37.3")]}}},
+    url("patterns", Operator_id="SF", Line_id="1"): {"journeyPatterns": [pattern("P1", ["100", "101"])]},
+    url("patterns", Operator_id="SF", Line_id="2"): {"journeyPatterns": [pattern("P2", ["101", "102"])]},
+    url("timetable", Operator_id="SF", Line_id="1", IncludeSpecialService=False): timetable("J1", ["100", "101"]),
+    url("timetable", Operator_id="SF", Line_id="2", IncludeSpecialService=False): timetable("J2", ["101", "102"]),
+}
+
+
+def write_cassette(path, failing=()):
+    with CassetteWriter(path) as writer:
+        for response_url, body in RESPONSES.items():
+            if response_url in failing:
+                writer.write(response_url, 404, {}, b"No timetable found", elapsed=0.0)
+            else:
+                writer.write(response_url, 200, {}, json.dumps(body).encode("utf-8"), elapsed=0.0)
+
+
+def make_client(cassette, sent):
+    hooks = RequestHooks(on_request=lambda event: sent.append((event.endpoint, tuple(event.params.values()))))
+    return SiriClient(api_key="secret-key", base_url=BASE_URL, cassette=ReplayAdapter(cassette, loop=True), hooks=hooks,
+                      queries_per_second=10 ** 6)
+
+
+class TestStaticNetworkLoader:
+    def test_load(self, tmp_path):
+        cassette = str(tmp_path / "network.cassette")
+        write_cassette(cassette)
+        sent = []
+        with StaticNetworkLoader(make_client(cassette, sent), str(tmp_path / "network.db")) as loader:
+            assert loader.load(operator_ids=["SF"]) == (8, 0, 0)
+            assert loader.stats() == {"operators": 2, "lines": 2, "stops": 3, "patterns": 2, "pattern_stops": 4,
+                                      "journeys": 2, "stop_times": 4}
+        # the stops of line 1 were all in the stops of the operator
+        assert ("stops", ("SF", "1")) not in sent
+        assert ("stops", ("SF", "2")) in sent
+
+        connection = sqlite3.connect(str(tmp_path / "network.db"))
+        assert connection.execute(
+            "SELECT stop_id, timing_point FROM pattern_stops WHERE pattern_id = 'P2' ORDER BY stop_order"
+        ).fetchall() == [("101", 1), ("102", 0)]
+        assert connection.execute(
+            "SELECT journey_id, departure_time FROM stop_times WHERE stop_id = '102'"
+        ).fetchall() == [("J2", "07:02:30")]
+        assert connection.execute("SELECT latitude FROM stops WHERE id = '102'").fetchone() == (37.3,)
+        indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"patterns_by_line", "pattern_stops_by_stop", "journeys_by_line", "stop_times_by_stop"} <= indexes
+
+    def test_resume(self, tmp_path):
+        database = str(tmp_path / "network.db")
+        failing = str(tmp_path / "failing.cassette")
+        write_cassette(failing, failing=[url("timetable", Operator_id="SF", Line_id="2", IncludeSpecialService=False)])
+        with StaticNetworkLoader(make_client(failing, []), database) as loader:
+            assert loader.load(operator_ids=["SF"]) == (8, 0, 1)
+            assert isinstance(loader.errors[0].error, ApiError)
+            assert loader.errors[0].params == {"operator_id": "SF", "line_id": "2"}
+
+        cassette = str(tmp_path / "network.cassette")
+        write_cassette(cassette)
+        sent = []
+        with StaticNetworkLoader(make_client(cassette, sent), database) as loader:
+            assert loader.load(operator_ids=["SF"]) == (1, 6, 0)
+            assert sent == [("timetable", ("SF", "2", False))]
+            assert loader.stats()["stop_times"] == 4
+
+            sent.clear()
+            assert loader.load(operator_ids=["SF"], refresh=True) == (8, 0, 0)
+            assert loader.stats()["stop_times"] == 4
+
+    def test_without_timetables(self, tmp_path):
+        cassette = str(tmp_path / "network.cassette")
+        write_cassette(cassette)
+        sent = []
+        with StaticNetworkLoader(make_client(cassette, sent), str(tmp_path / "network.db")) as loader:
+            assert loader.load(operator_ids=["SF"], timetables=False) == (6, 0, 0)
+        assert not [endpoint for endpoint, _ in sent if endpoint == "timetable"]
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from siri_transit_api_client import poller
+
+
+def activity(vehicle_ref, recorded_at="2022-05-20T22:27:30Z"):
+    return {"RecordedAtTime": recorded_at, "MonitoredVehicleJourney": {"VehicleRef": vehicle_ref}}
+
+
+class FakeClient:
+    def __init__(self, snapshots):
+        self.snapshots = list(snapshots)
+        self.calls = []
+
+    def iter_vehicle_monitoring(self, **params):
+        self.calls.append(params)
+        snapshot = self.snapshots.pop(0) if len(self.snapshots) > 1 else self.snapshots[0]
+        if isinstance(snapshot, Exception):
+            raise snapshot
+        return iter(snapshot)
+
+
+class TestSiriPoller:
+    def test_diff(self):
+        client = FakeClient([
+            [activity("1"), activity("2")],
+            [activity("1", "2022-05-20T22:28:00Z"), activity("3")],
+        ])
+        diffs = []
+        siri_poller = poller.SiriPoller(client, "vehicle_monitoring", agency="SF")
+        siri_poller.subscribe(diffs.append)
+
+        first = siri_poller.poll_once()
+        assert [len(records) for records in first] == [2, 0, 0]
+        second = siri_poller.poll_once()
+        assert second.added == [activity("3")]
+        assert second.changed == [activity("1", "2022-05-20T22:28:00Z")]
+        assert second.removed == [activity("2")]
+        assert diffs == [first, second]
+        assert client.calls == [{"agency": "SF"}, {"agency": "SF"}]
+
+    def test_unchanged_snapshot_not_published(self):
+        client = FakeClient([[activity("1")]])
+        diffs = []
+        siri_poller = poller.SiriPoller(client, "vehicle_monitoring", agency="SF")
+        siri_poller.subscribe(diffs.append)
+        siri_poller.poll_once()
+        assert siri_poller.poll_once() == poller.SnapshotDiff([], [], [])
+        assert len(diffs) == 1
+        siri_poller.unsubscribe(diffs.append)
+        client.snapshots = [[]]
+        siri_poller.poll_once()
+        assert len(diffs) == 1
+
+    def test_stop_visit_key(self):
+        visit = {
+            "MonitoringRef": "15551",
+            "MonitoredVehicleJourney": {
+                "VehicleRef": "1234",
+                "FramedVehicleJourneyRef": {"DataFrameRef": "2022-05-20", "DatedVehicleJourneyRef": "11010534"},
+            },
+        }
+        assert poller.stop_visit_key(visit) == ("15551", "2022-05-20", "11010534", "1234")
+        no_vehicle = {"MonitoredVehicleJourney": {"FramedVehicleJourneyRef": {"DatedVehicleJourneyRef": "1"}}}
+        assert poller.vehicle_activity_key(no_vehicle) == (None, "1")
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            poller.SiriPoller(FakeClient([[]]), "lines")
+        with pytest.raises(ValueError):
+            poller.SiriPoller(FakeClient([[]]), "vehicle_monitoring", interval=0)
+
+    def test_background_thread(self):
+        client = FakeClient([RuntimeError("boom"), [activity("1")]])
+        errors = []
+        published = threading.Event()
+        siri_poller = poller.SiriPoller(client, "vehicle_monitoring", interval=0.01, on_error=errors.append)
+        siri_poller.subscribe(lambda diff: published.set())
+        siri_poller.start()
+        try:
+            assert published.wait(5)
+            with pytest.raises(RuntimeError):
+                siri_poller.start()
+        finally:
+            siri_poller.stop(5)
+        assert [str(error) for error in errors] == ["boom"]
+        assert siri_poller._thread is None
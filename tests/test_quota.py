@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+import responses
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.exceptions import OverQueryLimit
+from siri_transit_api_client.quota import HourlyQuotaScheduler, PRIORITY_BULK, PRIORITY_REALTIME
+
+
+class TestHourlyQuotaScheduler:
+    def test_priorities(self):
+        scheduler = HourlyQuotaScheduler()
+        assert scheduler.priority("StopMonitoring") == PRIORITY_REALTIME
+        assert scheduler.priority("shapes") == PRIORITY_BULK
+        assert scheduler.priority("stops") == 1
+
+    def test_remaining(self):
+        scheduler = HourlyQuotaScheduler(requests_per_hour=10)
+        for _ in range(3):
+            scheduler.acquire("stops")
+        assert scheduler.remaining() == 7
+        assert scheduler.stats() == (7, 3, 0, 0)
+
+    def test_bulk_rejected_at_reserve(self):
+        scheduler = HourlyQuotaScheduler(requests_per_hour=5, bulk_reserve=0.4, defer_bulk=False)
+        for _ in range(3):
+            scheduler.acquire("timetable")
+        with pytest.raises(OverQueryLimit):
+            scheduler.acquire("timetable")
+        # the reserve is still available to real-time requests
+        scheduler.acquire("StopMonitoring")
+        scheduler.acquire("StopMonitoring")
+        assert scheduler.remaining() == 0
+        assert scheduler.stats().rejected == 1
+
+    def test_bulk_deferred_at_reserve(self):
+        scheduler = HourlyQuotaScheduler(requests_per_hour=5, bulk_reserve=0.4, period=0.5)
+        start = time.monotonic()
+        for _ in range(4):
+            scheduler.acquire("patterns")
+        assert time.monotonic() - start >= 0.5
+
+    def test_max_wait(self):
+        scheduler = HourlyQuotaScheduler(requests_per_hour=1, max_wait=0.1)
+        scheduler.acquire("StopMonitoring")
+        with pytest.raises(OverQueryLimit):
+            scheduler.acquire("StopMonitoring")
+
+    def test_realtime_served_before_bulk(self):
+        scheduler = HourlyQuotaScheduler(requests_per_hour=1, bulk_reserve=0, period=0.3)
+        scheduler.acquire("stops")
+        order = []
+
+        def send(endpoint):
+            scheduler.acquire(endpoint)
+            order.append(endpoint)
+
+        bulk = threading.Thread(target=send, args=("shapes",))
+        bulk.start()
+        time.sleep(0.05)
+        realtime = threading.Thread(target=send, args=("VehicleMonitoring",))
+        realtime.start()
+        bulk.join()
+        realtime.join()
+        assert order == ["VehicleMonitoring", "shapes"]
+
+    @responses.activate
+    def test_client_rejects_bulk(self):
+        responses.add(
+            responses.GET,
+            "https://api.511.org/Transit/timetable?api_key=fake-key&Format=json&Operator_id=CT&Line_id=L5"
+            "&IncludeSpecialService=False",
+            body='{"Content": {}}',
+            status=200,
+        )
+        scheduler = HourlyQuotaScheduler(requests_per_hour=2, bulk_reserve=0.5, defer_bulk=False)
+        client = SiriClient(api_key="fake-key", quota_scheduler=scheduler)
+        client.timetable("CT", "L5")
+        with pytest.raises(OverQueryLimit):
+            client.timetable("CT", "L5")
+        assert len(responses.calls) == 1
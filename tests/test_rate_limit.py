@@ -0,0 +1,115 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+import responses
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.rate_limit import SQLiteRateLimiter, TokenBucketRateLimiter
+
+
+def acquire_from_process(path, count, sent_times):
+    limiter = SQLiteRateLimiter(path, queries_per_second=10, burst=2)
+    for _ in range(count):
+        limiter.acquire()
+        sent_times.put(time.time())
+
+
+class TestTokenBucketRateLimiter:
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucketRateLimiter(0)
+
+    def test_burst_does_not_wait(self):
+        limiter = TokenBucketRateLimiter(queries_per_second=5)
+        start = time.monotonic()
+        for _ in range(5):
+            limiter.acquire()
+        assert time.monotonic() - start < 0.1
+        assert limiter.stats().waited == 0
+
+    def test_shared_between_threads(self):
+        # 20 tokens per second with a burst of 5: 25 acquisitions need at least one second
+        limiter = TokenBucketRateLimiter(queries_per_second=20, burst=5)
+
+        def worker():
+            for _ in range(5):
+                limiter.acquire()
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+
+        assert 1 <= elapsed < 1.5
+        stats = limiter.stats()
+        assert stats.acquired == 25
+        assert stats.waited == 20
+        assert 0 < stats.max_wait_seconds <= 1
+        assert stats.total_wait_seconds > stats.max_wait_seconds
+
+    @responses.activate
+    def test_shared_between_clients(self):
+        responses.add(
+            responses.GET,
+            "https://api.511.org/Transit/StopMonitoring?api_key=fake-key&Format=json&agency=CT",
+            body='{"ServiceDelivery":{"Status":"true","StopMonitoringDelivery":{}}}',
+            status=200,
+            content_type="application/json",
+        )
+        limiter = TokenBucketRateLimiter(queries_per_second=3)
+        clients = [SiriClient(api_key="fake-key", rate_limiter=limiter) for _ in range(2)]
+        start = time.time()
+        for _ in range(3):
+            for client in clients:
+                client.stop_monitoring("CT")
+        end = time.time()
+        assert start + 1 < end < start + 2
+        assert limiter.stats().acquired == 6
+
+
+class TestSQLiteRateLimiter:
+    def test_burst_does_not_wait(self, tmp_path):
+        limiter = SQLiteRateLimiter(str(tmp_path / "limit.db"), queries_per_second=5)
+        for _ in range(5):
+            assert limiter.acquire() == 0
+
+    def test_shared_between_instances(self, tmp_path):
+        path = str(tmp_path / "limit.db")
+        first = SQLiteRateLimiter(path, queries_per_second=10, burst=2)
+        second = SQLiteRateLimiter(path, queries_per_second=10, burst=2)
+        first.acquire()
+        first.acquire()
+        # the bucket is empty for every instance using the file
+        assert second.acquire() > 0
+        assert second.stats().waited == 1
+        assert first.stats().waited == 0
+
+    def test_separate_names(self, tmp_path):
+        path = str(tmp_path / "limit.db")
+        first = SQLiteRateLimiter(path, queries_per_second=1, burst=1, name="key-1")
+        second = SQLiteRateLimiter(path, queries_per_second=1, burst=1, name="key-2")
+        assert first.acquire() == 0
+        assert second.acquire() == 0
+
+    def test_shared_between_processes(self, tmp_path):
+        # 4 processes share 10 queries per second with a burst of 2: 12 acquisitions need at least one second
+        path = str(tmp_path / "limit.db")
+        SQLiteRateLimiter(path)._connect()
+        context = multiprocessing.get_context("spawn")
+        sent_times = context.Queue()
+        processes = [context.Process(target=acquire_from_process, args=(path, 3, sent_times)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        times = sorted(sent_times.get(timeout=30) for _ in range(12))
+        for process in processes:
+            process.join()
+        assert all(process.exitcode == 0 for process in processes)
+        # at most burst + queries_per_second * elapsed queries may be sent. The first process reads the time in
+        # _reserve before its COMMIT is synced to disk, so the first send time lags the reserved slot by the commit
+        # latency, a few milliseconds
+        assert times[-1] - times[0] >= (12 - 2) / 10 - 0.05
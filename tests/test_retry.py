@@ -0,0 +1,128 @@
+import email.utils
+import time
+
+import pytest
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.exceptions import HTTPError, OverQueryLimit, Timeout
+from siri_transit_api_client.retry import RetryBudget, RetryPolicy, parse_retry_after
+
+BODY = '{"ServiceDelivery":{"Status":"true"}}'
+FALSE_STATUS_BODY = '{"ServiceDelivery":{"Status":"false"}}'
+
+
+class TestParseRetryAfter:
+    def test_seconds(self):
+        assert parse_retry_after("120") == 120.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+    def test_http_date(self):
+        now = time.time()
+        value = email.utils.formatdate(now + 30, usegmt=True)
+        assert 28 <= parse_retry_after(value, now) <= 31
+        assert parse_retry_after(email.utils.formatdate(now - 30, usegmt=True), now) == 0.0
+
+
+class TestRetryPolicy:
+    def test_backoff_capped(self):
+        policy = RetryPolicy(base_delay=1, max_delay=4)
+        assert all(0 <= policy.backoff(retry) <= 4 for retry in range(1, 50))
+
+    def test_next_delay(self):
+        policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=10)
+        assert policy.next_delay(1, remaining=0.5) <= 0.5
+        assert policy.next_delay(3, remaining=60) is None
+        assert policy.next_delay(1, remaining=0) is None
+        assert policy.next_delay(1, remaining=60, retry_after=20) == 20
+        assert policy.next_delay(1, remaining=10, retry_after=20) is None
+        assert RetryPolicy(respect_retry_after=False, base_delay=1).next_delay(1, 60, retry_after=20) <= 1
+
+    def test_invalid_max_attempts(self):
+        with pytest.raises(ValueError):
+            RetryPolicy(max_attempts=0)
+
+
+class TestRetryBudget:
+    def test_retries_limited_to_ratio(self):
+        budget = RetryBudget(ratio=0.5, min_retries_per_second=0, max_balance=1)
+        assert budget.withdraw()
+        assert not budget.withdraw()
+        budget.deposit()
+        budget.deposit()
+        assert budget.withdraw()
+        assert not budget.withdraw()
+        stats = budget.stats()
+        assert (stats.requests, stats.retries, stats.exhausted) == (2, 2, 2)
+
+
+class TestClientRetries:
+    def client(self, server, **kwargs):
+        kwargs.setdefault("retry_policy", RetryPolicy(base_delay=0.01))
+        kwargs.setdefault("queries_per_second", 100)
+        return SiriClient(api_key="fake-key", base_url=server.base_url, **kwargs)
+
+    def test_retry_after_followed(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", "Too Many Requests", status=429, headers={"Retry-After": "1"})
+        stand_in_server.add("StopMonitoring", BODY)
+        start = time.monotonic()
+        assert self.client(stand_in_server).stop_monitoring("SF")["ServiceDelivery"]["Status"] == "true"
+        assert time.monotonic() - start >= 1
+        assert len(stand_in_server.requests) == 2
+
+    def test_over_query_limit(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", "Too Many Requests", status=429)
+        with pytest.raises(OverQueryLimit):
+            self.client(stand_in_server, retry_over_query_limit=False).stop_monitoring("SF")
+        assert len(stand_in_server.requests) == 1
+
+    def test_retry_after_past_deadline_gives_up(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", "Too Many Requests", status=429, headers={"Retry-After": "3600"})
+        start = time.monotonic()
+        with pytest.raises(OverQueryLimit):
+            self.client(stand_in_server, retry_timeout=5).stop_monitoring("SF")
+        assert time.monotonic() - start < 1
+
+    def test_endpoint_policy(self, stand_in_server):
+        stand_in_server.add("timetable", "Bad Gateway", status=502)
+        client = self.client(stand_in_server, endpoint_retry_policies={"timetable": RetryPolicy(max_attempts=3,
+                                                                                                base_delay=0)})
+        with pytest.raises(HTTPError) as e_info:
+            client.timetable("SF", "14")
+        assert e_info.value.status_code == 502
+        assert len(stand_in_server.requests) == 3
+
+    def test_budget_stops_retries(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", "Service Unavailable", status=503)
+        budget = RetryBudget(ratio=0.5, min_retries_per_second=0, max_balance=2)
+        client = self.client(stand_in_server, retry_budget=budget)
+        for _ in range(3):
+            with pytest.raises(HTTPError):
+                client.stop_monitoring("SF")
+        # two saved retries and half a retry per request allow 3 retries for 3 requests
+        assert len(stand_in_server.requests) == 6
+        assert budget.stats().exhausted == 3
+
+    def test_false_status_exhausted(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", FALSE_STATUS_BODY)
+        client = self.client(stand_in_server, retry_policy=RetryPolicy(max_attempts=2, base_delay=0))
+        with pytest.raises(Timeout):
+            client.stop_monitoring("SF")
+        assert len(stand_in_server.requests) == 2
+
+    def test_false_status_budget_exhausted(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", FALSE_STATUS_BODY)
+        budget = RetryBudget(ratio=0, min_retries_per_second=0, max_balance=0)
+        with pytest.raises(Timeout):
+            self.client(stand_in_server, retry_budget=budget).stop_monitoring("SF")
+        assert len(stand_in_server.requests) == 1
+        assert budget.stats().exhausted == 1
+
+    def test_many_retries_do_not_recurse(self, stand_in_server):
+        # more attempts than the default recursion limit of 1000
+        stand_in_server.add("StopMonitoring", "Service Unavailable", status=503)
+        client = self.client(stand_in_server, retry_policy=RetryPolicy(max_attempts=1200, base_delay=0),
+                             retry_budget=RetryBudget(max_balance=2000), queries_per_second=100000)
+        with pytest.raises(HTTPError):
+            client.stop_monitoring("SF")
+        assert len(stand_in_server.requests) == 1200
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.singleflight import AsyncSingleFlight, SingleFlight, SingleFlightStats
+
+STOP_MONITORING_BODY = '{"ServiceDelivery":{"Status":"true","StopMonitoringDelivery":{}}}'
+
+
+def run_threads(count, target):
+    results = [None] * count
+
+    def worker(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSingleFlight:
+    def test_identical_calls_coalesced(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        def slow(value):
+            calls.append(value)
+            time.sleep(0.2)
+            return {"value": value}
+
+        results = run_threads(8, lambda: single_flight.do("key", slow, 1))
+        assert calls == [1]
+        assert all(result is results[0] for result in results)
+        assert single_flight.stats() == SingleFlightStats(1, 7, 0)
+
+        single_flight.do("key", slow, 2)
+        assert calls == [1, 2]
+
+    def test_exception_shared(self):
+        single_flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.2)
+            raise ValueError("boom")
+
+        results = run_threads(4, lambda: single_flight.do("key", fail))
+        assert all(isinstance(result, ValueError) for result in results)
+        assert single_flight.stats().calls == 1
+
+    def test_async(self):
+        single_flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            return value
+
+        async def main():
+            return await asyncio.gather(*(single_flight.do("key", slow, 1) for _ in range(5)),
+                                        single_flight.do("other", slow, 2))
+
+        assert asyncio.run(main()) == [1, 1, 1, 1, 1, 2]
+        assert calls == [1, 2]
+        assert single_flight.stats() == SingleFlightStats(2, 4, 0)
+
+    def test_async_cancelled_caller_does_not_cancel_others(self):
+        single_flight = AsyncSingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def main():
+            first = asyncio.ensure_future(single_flight.do("key", slow))
+            second = asyncio.ensure_future(single_flight.do("key", slow))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(main()) == "done"
+
+
+class TestClientCoalescing:
+    def test_sync_client(self, stand_in_server):
+        stand_in_server.add("StopMonitoring", STOP_MONITORING_BODY)
+        client = SiriClient(api_key="fake-key", base_url=stand_in_server.base_url, coalesce_requests=True)
+        send = client.session.get
+
+        def slow_get(*args, **kwargs):
+            time.sleep(0.2)
+            return send(*args, **kwargs)
+
+        client.session.get = slow_get
+        results = run_threads(6, lambda: client.stop_monitoring("SF", "15551"))
+        assert all(result["ServiceDelivery"]["Status"] == "true" for result in results)
+        assert len(stand_in_server.requests) == 1
+
+        client.stop_monitoring("SF", "15552")
+        assert len(stand_in_server.requests) == 2
+
+    def test_async_client(self, stand_in_server):
+        pytest.importorskip("httpx")
+        from siri_transit_api_client import AsyncSiriClient
+
+        stand_in_server.add("StopMonitoring", STOP_MONITORING_BODY)
+
+        async def query():
+            async with AsyncSiriClient(api_key="fake-key", base_url=stand_in_server.base_url,
+                                       coalesce_requests=True) as client:
+                return await asyncio.gather(*(client.stop_monitoring("SF", "15551") for _ in range(5)))
+
+        results = asyncio.run(query())
+        assert all(result is results[0] for result in results)
+        assert len(stand_in_server.requests) == 1
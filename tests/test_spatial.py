@@ -0,0 +1,95 @@
+import random
+import time
+
+import pytest
+
+from siri_transit_api_client.models import Stop
+from siri_transit_api_client.spatial import StopIndex, haversine
+
+
+def random_stops(count, seed=1):
+    generator = random.Random(seed)
+    return [Stop(id=str(index), name="Stop %d" % index, latitude=generator.uniform(37.2, 38.0),
+                 longitude=generator.uniform(-122.6, -121.7), stop_type=None) for index in range(count)]
+
+
+def brute_force(stops, latitude, longitude):
+    return sorted((haversine(latitude, longitude, stop.latitude, stop.longitude), stop.id) for stop in stops)
+
+
+class TestHaversine:
+    def test_distance(self):
+        # San Francisco Ferry Building to Oakland City Hall
+        assert haversine(37.7955, -122.3937, 37.8053, -122.2725) == pytest.approx(10700, rel=0.01)
+        assert haversine(37.7955, -122.3937, 37.7955, -122.3937) == 0
+
+
+class TestStopIndex:
+    def test_nearest(self):
+        stops = random_stops(2000)
+        index = StopIndex(stops, cell_size=300)
+        generator = random.Random(2)
+        for _ in range(50):
+            latitude, longitude = generator.uniform(37.1, 38.1), generator.uniform(-122.7, -121.6)
+            expected = brute_force(stops, latitude, longitude)[:5]
+            assert [(nearby.distance, nearby.stop.id) for nearby in index.nearest(latitude, longitude, k=5)] == expected
+
+    def test_nearest_far_away(self):
+        index = StopIndex(random_stops(100), cell_size=100)
+        # Sacramento, far outside the indexed area
+        assert index.nearest(38.58, -121.49)[0].stop.id == brute_force(random_stops(100), 38.58, -121.49)[0][1]
+        assert index.nearest(38.58, -121.49, max_distance=1000) == []
+        assert len(index.nearest(37.6, -122.2, k=500)) == 100
+
+    def test_nearest_from_another_region(self):
+        stops = random_stops(5000)
+        index = StopIndex(stops, cell_size=100)
+        # Los Angeles and Tokyo, thousands of cells away from the stops
+        for latitude, longitude in ((34.05, -118.24), (35.68, 139.69)):
+            start = time.perf_counter()
+            nearest = index.nearest(latitude, longitude, k=3)
+            assert time.perf_counter() - start < 0.5
+            assert [(nearby.distance, nearby.stop.id) for nearby in nearest] == brute_force(
+                stops, latitude, longitude)[:3]
+
+    def test_within(self):
+        stops = random_stops(2000)
+        index = StopIndex(stops, cell_size=500)
+        for radius in (50, 800, 3000):
+            expected = [entry for entry in brute_force(stops, 37.6, -122.2) if entry[0] <= radius]
+            assert [(nearby.distance, nearby.stop.id) for nearby in index.within(37.6, -122.2, radius)] == expected
+
+    def test_within_bounds(self):
+        stops = random_stops(2000)
+        index = StopIndex(stops)
+        found = index.within_bounds(37.5, -122.3, 37.7, -122.1)
+        assert sorted(stop.id for stop in found) == sorted(
+            stop.id for stop in stops if 37.5 <= stop.latitude <= 37.7 and -122.3 <= stop.longitude <= -122.1
+        )
+        assert len(index.within_bounds(-90, -180, 90, 180)) == 2000
+
+    def test_refresh(self):
+        stops = random_stops(10)
+        index = StopIndex(stops)
+        moved = Stop(id="3", name="Stop 3", latitude=37.0, longitude=-122.0, stop_type=None)
+        new = Stop(id="10", name="Stop 10", latitude=37.5, longitude=-122.5, stop_type=None)
+        diff = index.refresh(stops[:3] + [moved] + stops[5:] + [new])
+        assert diff.added == [new]
+        assert diff.changed == [moved]
+        assert [stop.id for stop in diff.removed] == ["4"]
+        assert len(index) == 10
+        assert "4" not in index
+        assert index.get("3") == moved
+        assert index.nearest(37.0, -122.0)[0] == (0, moved)
+        assert index.refresh(stops[:3] + [moved] + stops[5:] + [new]) == ([], [], [])
+
+    def test_update_and_remove(self):
+        index = StopIndex(key=lambda stop: ("SF", stop.id))
+        assert index.nearest(37.7, -122.4) == []
+        index.update(random_stops(5) + [Stop(id="x", name="No location", latitude=None, longitude=None,
+                                             stop_type=None)])
+        assert len(index) == 5
+        assert ("SF", "0") in index
+        index.remove([("SF", "0"), ("SF", "missing")])
+        assert len(index) == 4
+        assert index.get(("SF", "0")) is None
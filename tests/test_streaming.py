@@ -0,0 +1,99 @@
+import json
+
+import pytest
+import responses
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.exceptions import ApiError
+from siri_transit_api_client.streaming import iter_array_items
+
+VEHICLE_ACTIVITY = [
+    {
+        "RecordedAtTime": "2022-05-20T22:27:%02dZ" % i,
+        "MonitoredVehicleJourney": {
+            "LineRef": "L%d" % i,
+            "PublishedLineName": 'Say "hi" \\ {to} [the] driver',
+            "OnwardCalls": [{"StopPointRef": "1"}, []],
+        },
+    }
+    for i in range(20)
+]
+VEHICLE_MONITORING = {
+    "Siri": {
+        "ServiceDelivery": {
+            "ResponseTimestamp": "2022-05-20T22:27:30Z",
+            "ProducerRef": "VehicleActivity",
+            "Status": True,
+            "VehicleMonitoringDelivery": {"version": "1.4", "VehicleActivity": VEHICLE_ACTIVITY},
+            "Trailer": [1, 2, 3],
+        }
+    }
+}
+CONTENT = b"\xef\xbb\xbf" + json.dumps(VEHICLE_MONITORING).encode("utf-8")
+
+
+def split(content, size):
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+
+class TestIterArrayItems:
+    @pytest.mark.parametrize("size", [1, 2, 3, 7, 256, len(CONTENT)])
+    def test_chunk_boundaries(self, size):
+        assert list(iter_array_items(split(CONTENT, size), "VehicleActivity")) == VEHICLE_ACTIVITY
+
+    def test_missing_key(self):
+        assert list(iter_array_items([b'{"a": "MonitoredStopVisit", "b": [{"c": 1}]}'], "MonitoredStopVisit")) == []
+
+    def test_empty_array(self):
+        assert list(iter_array_items([b'{"MonitoredStopVisit" : [ ] }'], "MonitoredStopVisit")) == []
+
+    def test_truncated(self):
+        items = iter_array_items([b'{"MonitoredStopVisit": [{"a": 1}, {"b": '], "MonitoredStopVisit")
+        assert next(items) == {"a": 1}
+        with pytest.raises(json.JSONDecodeError):
+            next(items)
+
+    def test_first_item_before_end(self):
+        def chunks():
+            yield b'{"MonitoredStopVisit": [{"a": 1}, '
+            raise AssertionError("download not finished")
+
+        items = iter_array_items(chunks(), "MonitoredStopVisit")
+        assert next(items) == {"a": 1}
+
+
+class TestSiriClientStreaming:
+    @responses.activate
+    def test_iter_vehicle_monitoring(self):
+        responses.add(
+            responses.GET,
+            "https://api.511.org/Transit/VehicleMonitoring?api_key=fake-key&Format=json&agency=CT",
+            body=CONTENT,
+            status=200,
+        )
+        client = SiriClient(api_key="fake-key")
+        assert list(client.iter_vehicle_monitoring("CT", chunk_size=100)) == VEHICLE_ACTIVITY
+
+    @responses.activate
+    def test_iter_stop_monitoring(self):
+        responses.add(
+            responses.GET,
+            "https://api.511.org/Transit/StopMonitoring?api_key=fake-key&Format=json&agency=CT&stopCode=1234",
+            body='{"ServiceDelivery": {"StopMonitoringDelivery": {"MonitoredStopVisit": [{"MonitoringRef": "1234"}]}}}',
+            status=200,
+        )
+        client = SiriClient(api_key="fake-key")
+        assert list(client.iter_stop_monitoring("CT", "1234")) == [{"MonitoringRef": "1234"}]
+
+    @responses.activate
+    def test_error_status(self):
+        responses.add(
+            responses.GET,
+            "https://api.511.org/Transit/StopMonitoring?api_key=fake-key&Format=json&agency=CT",
+            body="400 Error",
+            status=400,
+        )
+        client = SiriClient(api_key="fake-key")
+        with pytest.raises(ApiError) as e_info:
+            list(client.iter_stop_monitoring("CT"))
+        assert str(e_info.value) == "error (400 Error)"
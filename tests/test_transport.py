@@ -0,0 +1,86 @@
+import concurrent.futures
+import socket
+
+import pytest
+
+from siri_transit_api_client import SiriClient
+from siri_transit_api_client.exceptions import ApiError, TransportError
+from siri_transit_api_client.hooks import RequestHooks
+from siri_transit_api_client import transport as transport_module
+from siri_transit_api_client.transport import HTTPXAdapter, PooledHTTPAdapter, keep_alive_options
+
+
+class TestPooledHTTPAdapter:
+    def test_default_transport(self, stand_in_server):
+        stand_in_server.add("lines", "[1]")
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url)
+        assert isinstance(client.transport, PooledHTTPAdapter)
+        for _ in range(20):
+            assert client.lines("SF") == [1]
+        assert client.transport.stats() == (20, 1, 0)
+
+    def test_connections_reused_by_threads(self, stand_in_server):
+        stand_in_server.add("lines", "[1]")
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, queries_per_second=10 ** 6)
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda _: client.lines("SF"), range(200)))
+        stats = client.transport.stats()
+        assert stats.requests == 200
+        assert stats.connections <= 8
+
+    def test_keep_alive(self, stand_in_server):
+        stand_in_server.add("lines", "[1]")
+        transport = PooledHTTPAdapter(keep_alive=30)
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, transport=transport)
+        client.lines("SF")
+        pools = [transport.poolmanager.pools[key] for key in transport.poolmanager.pools.keys()]
+        sock = next(conn for pool in pools for conn in pool.pool.queue if conn is not None).sock
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE) == 30
+
+    def test_keep_alive_options(self):
+        options = keep_alive_options(60)
+        assert options[0] == (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if hasattr(socket, "TCP_KEEPINTVL"):
+            assert (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 15) in options
+
+    def test_connect_timed_for_hooks(self, stand_in_server):
+        stand_in_server.add("lines", "[1]")
+        responses = []
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url,
+                            hooks=RequestHooks(on_response=responses.append))
+        client.lines("SF")
+        assert responses[0].timings.connect is not None
+
+
+@pytest.mark.skipif(transport_module.httpx is None, reason="httpx is not installed")
+class TestHTTPXAdapter:
+    def test_requests(self, stand_in_server):
+        stand_in_server.add("lines", '\ufeff[{"Id": "14"}]', headers={"Content-Type": "application/json"})
+        stand_in_server.add("VehicleMonitoring", '{"VehicleActivity": [{"a": 1}, {"a": 2}]}')
+        transport = HTTPXAdapter()
+        responses = []
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, transport=transport,
+                            hooks=RequestHooks(on_response=responses.append))
+        assert client.lines("SF") == [{"Id": "14"}]
+        assert client.lines("SF") == [{"Id": "14"}]
+        assert list(client.iter_vehicle_monitoring("SF")) == [{"a": 1}, {"a": 2}]
+        assert transport.stats() == (3, 1, 0)
+        assert responses[0].timings.connect is not None
+        transport.close()
+
+    def test_error_status(self, stand_in_server):
+        stand_in_server.add("lines", "Invalid operator", status=404)
+        client = SiriClient(api_key="secret-key", base_url=stand_in_server.base_url, transport=HTTPXAdapter())
+        with pytest.raises(ApiError):
+            client.lines("XX")
+
+    def test_connection_refused(self):
+        with socket.socket() as unused:
+            unused.bind(("127.0.0.1", 0))
+            port = unused.getsockname()[1]
+        client = SiriClient(api_key="secret-key", base_url="http://127.0.0.1:%d/Transit/" % port,
+                            transport=HTTPXAdapter(), retry_timeout=0)
+        with pytest.raises(TransportError):
+            client.lines("SF")